@@ -0,0 +1,161 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+import scrape as fss
+
+
+# Saved drivers list pages, one per category
+FIXTURES_DIR = "fixtures/wiki"
+FIXTURE_FILE = "{category}_drivers.html"
+
+CATEGORIES = ["f1", "f2", "f3"]
+
+REPEATS = 5
+
+
+
+def legacy_parse(html: str, table_index: int = fss.WIKI_TABLE_INDEX) -> pd.DataFrame:
+    # The parsing scrape_drivers_wiki did before, the whole page through BeautifulSoup
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    driver_table = soup.find_all('table', {'class': 'wikitable'})[table_index]
+
+    headers = [cell.text.strip() for cell in driver_table.find('tr').find_all('th')]
+
+    data = []
+    for row in driver_table.find_all('tr')[1:]:
+        cells = row.find_all('td')
+        if cells:
+            data.append([cell.text.strip() for cell in cells])
+
+    return pd.DataFrame(data, columns=headers)
+
+
+
+def legacy_clean(df: pd.DataFrame, category: str) -> pd.DataFrame:
+    # The cleaning scrape_drivers_wiki did before, F3 was stored as parsed
+    df = df.rename(columns=fss.WIKI_RENAMES[category])
+
+    if category == "f1":
+        for column in fss.WIKI_NUMERIC_COLUMNS["f1"]:
+            if column in df.columns:
+                if column == "Drivers' Championships":
+                    df[column] = df[column].str.extract(r'(\d)')
+                df[column] = df[column].apply(fss.extract_leading_digits)
+        df["Driver name"] = df["Driver name"].str.replace(r'[~*^]', '', regex=True)
+        df["Driver name"] = df["Driver name"].str.replace(r'\[.*?\]', '', regex=True)
+        df["Driver name"] = df["Driver name"].str.strip()
+
+        for column, dtype in fss.WIKI_NUMERIC_COLUMNS["f1"].items():
+            df[column] = df[column].astype(dtype)
+
+    if category == "f2":
+        for column in fss.WIKI_NUMERIC_COLUMNS["f2"]:
+            if column in df.columns:
+                df[column] = df[column].apply(fss.extract_leading_digits)
+
+    return df
+
+
+
+def compare(legacy: pd.DataFrame, new: pd.DataFrame, category: str) -> list:
+    """
+    Differences between the legacy and the new cleaned table. Legacy F2 numbers were strings and
+    F3 was not cleaned at all, their leading digits are typed the way the new table is before
+    comparing ('' is a missing value).
+
+    Return:
+    - failure messages, empty when the tables match (list)
+    """
+
+    if category in ["f2", "f3"]:
+        for column, dtype in fss.WIKI_NUMERIC_COLUMNS[category].items():
+            numbers = legacy[column].apply(fss.extract_leading_digits)
+            legacy[column] = pd.to_numeric(numbers.where(numbers != "")).astype(dtype)
+
+    try:
+        pd.testing.assert_frame_equal(legacy, new)
+    except AssertionError as error:
+        return [f"{category}: cleaned tables differ: {error}"]
+
+    return []
+
+
+
+def best_time(function, *args, repeats: int = REPEATS) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+
+def benchmark(fixtures_dir: str = FIXTURES_DIR, repeats: int = REPEATS) -> list:
+    """
+    Times the legacy and the new parse and clean on every saved page and checks the outputs match.
+
+    Arguments:
+    - fixtures_dir (str): directory of the saved pages
+    - repeats (int): runs of each step, the best one is reported
+
+    Return:
+    - failure messages, empty when every output matched (list)
+    """
+
+    failures = []
+
+    print(f"{'':<4} {'kB':>6} {'rows':>5} {'legacy parse':>13} {'parse':>8} {'legacy clean':>13} {'clean':>8}")
+    for category in CATEGORIES:
+        with open(f"{fixtures_dir}/{FIXTURE_FILE.format(category=category)}", encoding="utf-8") as file:
+            html = file.read()
+
+        legacy_parsed, parsed = legacy_parse(html), fss.parse_wiki_table(html)
+        try:
+            pd.testing.assert_frame_equal(legacy_parsed, parsed)
+        except AssertionError as error:
+            failures.append(f"{category}: parsed tables differ: {error}")
+
+        failures += compare(legacy_clean(legacy_parsed.copy(), category), fss.clean_drivers_table(parsed.copy(), category), category)
+
+        timings = [
+            best_time(legacy_parse, html, repeats=repeats),
+            best_time(fss.parse_wiki_table, html, repeats=repeats),
+            best_time(lambda: legacy_clean(legacy_parsed.copy(), category), repeats=repeats),
+            best_time(lambda: fss.clean_drivers_table(parsed.copy(), category), repeats=repeats),
+        ]
+        print(f"{category:<4} {len(html) / 1024:6.0f} {len(parsed):5} {timings[0]:12.3f}s {timings[1]:7.3f}s {timings[2]:12.3f}s {timings[3]:7.3f}s")
+
+    return failures
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the drivers list parsing on saved Wikipedia pages and check it matches the legacy parser.")
+    parser.add_argument("--fixtures-dir", default=FIXTURES_DIR)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--regenerate", action="store_true", help="Write the synthetic pages again before benchmarking")
+    args = parser.parse_args()
+
+    if args.regenerate or not os.path.isdir(args.fixtures_dir):
+        import synthetic_data
+
+        synthetic_data.write_wiki_fixtures(args.fixtures_dir)
+
+    failures = benchmark(args.fixtures_dir, args.repeats)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+import matplotlib
+matplotlib.use("Agg")
+
+
+import circuits
+import data_access
+import figures
+import plotting as fsp
+import race_gaps
+import tyres
+
+
+# Rounds of parallel rendering compared against the serial images
+ROUNDS = 3
+
+
+
+def page_builders(dir: str, year: int, event: str, session: str) -> dict:
+    """
+    The figures the dashboard renders together on one page, as builders for figures.render_figures.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - event (str): EventName in the schedule
+    - session (str): session directory name
+
+    Return:
+    - figure name -> builder (dict)
+    """
+
+    session_dir = data_access.find_session_dir(dir, year, event, session)
+
+    teams_colors = fsp.get_teams_colors(dir, year, event, session)
+    df_laps = data_access.read_table(session_dir, "laps", columns=["Driver", "Team", "LapNumber", "LapTime", "Compound", "CompoundColor"], optional=race_gaps.LAP_COLUMNS)
+    df_laps["Lap Time (s)"] = df_laps["LapTime"].dt.total_seconds()
+    df_results = data_access.read_table(session_dir, "results", columns=["Abbreviation", "TeamName"])
+
+    fastest = df_laps.loc[df_laps["LapTime"].idxmin()]
+    driver, lap = fastest["Driver"], int(fastest["LapNumber"])
+    df_telemetry = data_access.read_table(session_dir, "telemetry", columns=fsp.TRACK_MAP_COLUMNS, filters=[("driver", "=", driver), ("lap", "=", lap)])
+    _, df_markers, rotation_angle = circuits.load_circuit(dir, year, event)
+
+    df_gaps = race_gaps.build_gap_matrix(df_laps[race_gaps.LAP_COLUMNS])
+
+    return {
+        "team_lap_time_dist": partial(fsp.plot_team_lap_time_dist, df_laps, year, event, session, teams_colors),
+        "violin_point_scorers": partial(fsp.plot_violin_dist_point_socrers, df_laps, df_results, year, event, session, teams_colors),
+        "drivers_lap_time_dist": partial(fsp.plot_drivers_lap_time_dist, df_laps, df_results, year, event, session, teams_colors),
+        "gear_shifts_on_circuit": partial(fsp.plot_gear_shifts_on_circuit, df_telemetry, df_laps, year, event, session, lap, driver, True, rotation_angle, df_markers),
+        "speed_over_lap": partial(fsp.plot_speed_over_lap, df_telemetry, df_laps, year, event, session, lap, driver, True, rotation_angle, df_markers),
+        "gap_to_leader": partial(fsp.plot_gap_to_leader, df_gaps, year, event, session, teams_colors),
+        "tyre_degradation": partial(fsp.plot_tyre_degradation, tyres.load_degradation(session_dir), df_results, year, event, session, teams_colors, 3),
+    }
+
+
+
+def check_parallel_render(builders: dict, rounds: int = ROUNDS, workers: int = figures.RENDER_WORKERS) -> list:
+    """
+    Renders every figure in the calling thread, then several times concurrently, and compares the
+    PNG bytes. Each round submits every figure twice so the same figure is also drawn twice at once.
+
+    Return:
+    - failure messages, empty when every image was identical (list)
+    """
+
+    names = list(builders)
+
+    start = time.perf_counter()
+    serial = figures.render_figures([builders[name] for name in names], max_workers=1)
+    serial_seconds = time.perf_counter() - start
+
+    failures = []
+    parallel_seconds = []
+    for round in range(rounds):
+        start = time.perf_counter()
+        parallel = figures.render_figures([builders[name] for name in names * 2], max_workers=workers)
+        parallel_seconds.append(time.perf_counter() - start)
+
+        for i, images in enumerate(parallel):
+            name = names[i % len(names)]
+            for kind in ["display", "download"]:
+                if images[kind] != serial[i % len(names)][kind]:
+                    failures.append(f"round {round}: {name} {kind} image differs from the serial render")
+
+    for name, images in zip(names, serial):
+        print(f"{name:<25} {hashlib.sha1(images['display']).hexdigest()[:12]}  {len(images['download']) / 1024:7.0f} kB")
+    print(f"{len(names)} figures: {serial_seconds:.2f}s serial, {min(parallel_seconds) / 2:.2f}s per set on {workers} threads ({os.cpu_count()} CPUs)")
+
+    return failures
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that figures rendered concurrently are identical to serial renders.")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--workers", type=int, default=figures.RENDER_WORKERS)
+    parser.add_argument("--data-dir", default=None, help="Data tree to render from, a synthetic season is generated when omitted")
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--event", default="Chinese Grand Prix")
+    parser.add_argument("--session", default="race")
+    args = parser.parse_args()
+
+    if args.data_dir is None:
+        import synthetic_data
+
+        args.data_dir = tempfile.mkdtemp(prefix="f1_render_")
+        synthetic_data.write_tree(args.data_dir, args.year)
+
+    failures = check_parallel_render(page_builders(args.data_dir, args.year, args.event, args.session), args.rounds, args.workers)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+
+
+# Project modules that must be importable without doing any work
+MODULES = ["plotting", "scrape", "standings", "ingest", "track_status", "tyres", "lap_stats", "race_replay", "race_gaps", "minisectors", "circuits", "driving_events", "lap_telemetry", "season_speed", "data_access", "aggregate_store", "watch_ingest", "figures", "export_plots", "video_export", "synthetic_data", "soak_dashboard", "check_parallel_render", "benchmark_scrape", "load_test", "reads_report", "loading_class"]
+
+# Libraries that only some pages need, none of them may be loaded by importing a project module
+DEFERRED = ["seaborn", "plotly", "rapidfuzz", "unidecode", "requests", "bs4", "lxml", "cv2", "sqlalchemy", "fastf1"]
+
+# Wall time budget for importing one project module, in seconds
+IMPORT_BUDGET = 2.0
+
+# Audit events that count as side effects when raised during an import
+SIDE_EFFECT_EVENTS = ["os.remove", "os.unlink", "os.rename", "os.rmdir", "shutil.rmtree", "socket.connect", "socket.getaddrinfo", "subprocess.Popen"]
+
+PROBE = """
+import json, sys, time
+
+events = []
+
+def audit(event, args):
+    if event in SIDE_EFFECT_EVENTS:
+        events.append([event, repr(args)[:200]])
+    # Files opened for writing
+    elif event == "open" and len(args) > 1 and isinstance(args[1], str) and any(m in args[1] for m in "wax+"):
+        events.append([event, repr(args[0])])
+
+SIDE_EFFECT_EVENTS = {events!r}
+sys.addaudithook(audit)
+
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+
+print(json.dumps({{"seconds": seconds, "modules": sorted(set(sys.modules) - before), "events": events}}))
+"""
+
+
+
+def probe_import(module: str) -> dict:
+    """
+    Imports a module in a fresh interpreter and records what the import did.
+
+    Arguments:
+    - module (str): project module name
+
+    Return:
+    - import time in seconds, newly loaded modules and side effect events (dict)
+    """
+
+    code = PROBE.format(module=module, events=SIDE_EFFECT_EVENTS)
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+
+def dashboard_top_level_imports(path: str = "dashboard_app.py") -> list:
+    # The app is a Streamlit script and can't be imported, so check its module level imports statically
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), path)) as f:
+        tree = ast.parse(f.read())
+
+    imported = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            imported += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imported.append(node.module)
+
+    return imported
+
+
+
+def check_startup(budget: float = IMPORT_BUDGET) -> list:
+    failures = []
+
+    for module in MODULES:
+        result = probe_import(module)
+        loaded = {name.split(".")[0] for name in result["modules"]}
+
+        print(f"{module:<15} {result['seconds']:.3f}s  {len(result['modules'])} modules loaded")
+
+        if result["seconds"] > budget:
+            failures.append(f"{module}: import took {result['seconds']:.2f}s, budget is {budget:.2f}s")
+        for library in sorted(loaded.intersection(DEFERRED)):
+            failures.append(f"{module}: eagerly imports {library}")
+        for event, args in result["events"]:
+            failures.append(f"{module}: side effect on import ({event} {args})")
+
+    for name in dashboard_top_level_imports():
+        if name.split(".")[0] in DEFERRED:
+            failures.append(f"dashboard_app: eagerly imports {name}")
+
+    return failures
+
+
+
+if __name__ == "__main__":
+
+    failures = check_startup(float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_BUDGET)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
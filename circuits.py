@@ -0,0 +1,546 @@
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import data_access
+import ingest
+import minisectors
+
+
+# Circuits live next to the seasons, one directory per venue and one per layout of the venue:
+# {dir}/circuits/{key}/{layout}/, events.json maps every event to the layout it was run on
+CIRCUITS_DIR = "circuits"
+OUTLINE_FILE = "outline.parquet"
+MARKERS_FILE = "markers.parquet"
+EVENTS_FILE = "events.json"
+
+# A lap belongs to a stored layout when its length is within this fraction of the layout's and it
+# never strays further than LAYOUT_TOLERANCE metres from it, more than the racing lines of two
+# sessions differ, less than a removed chicane moves the track
+LAYOUT_LENGTH_TOLERANCE = 0.02
+LAYOUT_TOLERANCE = 30
+
+# Metres between two points of the stored outline
+OUTLINE_SPACING = 10
+
+# Metres between two distance markers
+MARKER_SPACING = 1000
+
+# Metres the heading is smoothed over before looking for corners, removes GPS noise
+CORNER_SMOOTHING = 60
+
+# A corner is a stretch tighter than this radius (m) turning the car by at least MIN_CORNER_ANGLE degrees
+MAX_CORNER_RADIUS = 250
+MIN_CORNER_ANGLE = 20
+
+# Sessions tried in order when building a circuit, qualifying laps are the cleanest
+SESSION_PREFERENCE = ["qualifying", "sprint_qualifying", "sprint_shootout", "race", "sprint", "practice_3", "practice_2", "practice_1"]
+
+# First season with car telemetry
+FIRST_TELEMETRY_YEAR = 2018
+
+
+
+def circuit_key(location: str) -> str:
+    # "Monte Carlo" -> "monte_carlo", the key a circuit is stored under
+    return re.sub(r"\W+", "_", str(location).strip().lower()).strip("_")
+
+
+
+def resample_outline(reference: pd.DataFrame, spacing: float = OUTLINE_SPACING) -> pd.DataFrame:
+    """
+    Decimates a lap to points at equal distance along it.
+
+    Arguments:
+    - reference (pd.DataFrame): X, Y and Distance of one lap
+    - spacing (float): metres between two points
+
+    Return:
+    - X, Y and Distance every spacing metres (pd.DataFrame)
+    """
+
+    reference = reference.dropna(subset=["X", "Y", "Distance"]).sort_values("Distance")
+    distance = reference["Distance"].to_numpy(dtype=float)
+
+    grid = np.arange(distance[0], distance[-1], spacing)
+    grid = np.append(grid, distance[-1])
+
+    return pd.DataFrame({
+        "X": np.interp(grid, distance, reference["X"].to_numpy(dtype=float)).astype(np.float32),
+        "Y": np.interp(grid, distance, reference["Y"].to_numpy(dtype=float)).astype(np.float32),
+        "Distance": (grid - distance[0]).astype(np.float32),
+    })
+
+
+
+def rotation_from_principal_axes(x: np.ndarray, y: np.ndarray) -> float:
+    """
+    Angle (degrees) that turns the longest axis of a track horizontal when passed as
+    rotation_angle to the track maps in plotting.
+
+    Arguments:
+    - x, y (np.ndarray): points of the outline
+
+    Return:
+    - rotation angle in (-90, 90] degrees (float)
+    """
+
+    points = np.column_stack([x, y]).astype(float)
+    points -= points.mean(axis=0)
+
+    # Eigenvector of the largest eigenvalue of the covariance is the direction of most spread
+    eigenvalues, eigenvectors = np.linalg.eigh(np.cov(points, rowvar=False))
+    major = eigenvectors[:, np.argmax(eigenvalues)]
+
+    angle = np.degrees(np.arctan2(major[1], major[0]))
+
+    # The axis has no direction, keep the angle that rotates the least
+    if angle <= -90:
+        angle += 180
+    elif angle > 90:
+        angle -= 180
+
+    return float(angle)
+
+
+
+def find_corners(outline: pd.DataFrame) -> pd.DataFrame:
+    """
+    Corners of an outline from its curvature: every stretch tighter than MAX_CORNER_RADIUS that
+    turns by MIN_CORNER_ANGLE degrees or more is one corner, placed at its tightest point.
+
+    Arguments:
+    - outline (pd.DataFrame): output of resample_outline
+
+    Return:
+    - Number, X, Y, Distance and Angle (degrees turned, positive to the left) of every corner (pd.DataFrame)
+    """
+
+    x, y = outline["X"].to_numpy(dtype=float), outline["Y"].to_numpy(dtype=float)
+    distance = outline["Distance"].to_numpy(dtype=float)
+
+    # The outline is a loop, it is extended by the points on the other side of the start line so the
+    # gradients and the smoothing window run across it
+    window = max(int(CORNER_SMOOTHING / OUTLINE_SPACING), 1)
+    pad = min(window + 1, len(x) - 1)
+    lap_length = distance[-1] + np.hypot(x[0] - x[-1], y[0] - y[-1])
+
+    x_loop, y_loop = np.r_[x[-pad:], x, x[:pad]], np.r_[y[-pad:], y, y[:pad]]
+    distance_loop = np.r_[distance[-pad:] - lap_length, distance, distance[:pad] + lap_length]
+
+    heading = np.unwrap(np.arctan2(np.gradient(y_loop), np.gradient(x_loop)))
+    smoothed = np.convolve(np.gradient(heading), np.ones(window) / window, mode="same")
+    curvature = (smoothed / np.gradient(distance_loop))[pad:-pad]
+    smoothed = smoothed[pad:-pad]
+
+    in_corner = np.abs(curvature) > 1 / MAX_CORNER_RADIUS
+
+    # Stretches of consecutive points in a corner, split where the direction of the turn flips (chicanes)
+    turn = np.sign(curvature) * in_corner
+    edges = np.flatnonzero(np.diff(np.r_[0, turn, 0]) != 0)
+    starts, ends = edges[:-1], edges[1:]
+    starts, ends = starts[turn[starts] != 0], ends[turn[starts] != 0]
+    stretches = [np.arange(start, end) for start, end in zip(starts, ends)]
+
+    # A corner through the start line is a stretch at each end of the lap
+    if len(stretches) > 1 and turn[0] != 0 and turn[0] == turn[-1]:
+        stretches[0] = np.r_[stretches.pop(), stretches[0]]
+
+    corners = []
+    for stretch in stretches:
+        angle = np.degrees(smoothed[stretch].sum())
+        if abs(angle) < MIN_CORNER_ANGLE:
+            continue
+        apex = stretch[np.argmax(np.abs(curvature[stretch]))]
+        corners.append((x[apex], y[apex], distance[apex], angle))
+
+    corners.sort(key=lambda corner: corner[2])
+    df_corners = pd.DataFrame(corners, columns=["X", "Y", "Distance", "Angle"])
+    df_corners.insert(0, "Number", np.arange(1, len(df_corners) + 1))
+
+    return df_corners
+
+
+
+def distance_markers(outline: pd.DataFrame, spacing: float = MARKER_SPACING) -> pd.DataFrame:
+    # A point every spacing metres from the line, the line itself excluded
+    distance = outline["Distance"].to_numpy(dtype=float)
+    marks = np.arange(spacing, distance[-1], spacing)
+
+    return pd.DataFrame({
+        "X": np.interp(marks, distance, outline["X"].to_numpy(dtype=float)),
+        "Y": np.interp(marks, distance, outline["Y"].to_numpy(dtype=float)),
+        "Distance": marks,
+    })
+
+
+
+def build_circuit(reference: pd.DataFrame) -> tuple:
+    """
+    Everything the track maps need about a circuit, from one lap of telemetry.
+
+    Arguments:
+    - reference (pd.DataFrame): X, Y and Distance of one lap, e.g. minisectors.reference_lap
+
+    Return:
+    - outline (pd.DataFrame), markers (pd.DataFrame), rotation angle (float)
+    """
+
+    outline = resample_outline(reference)
+    rotation_angle = rotation_from_principal_axes(outline["X"], outline["Y"])
+
+    corners = find_corners(outline).assign(Kind="Corner")
+    corners["Label"] = corners["Number"].astype(str)
+
+    marks = distance_markers(outline).assign(Kind="Distance")
+    marks["Number"] = np.arange(1, len(marks) + 1)
+    marks["Label"] = [f"{distance / 1000:g} km" for distance in marks["Distance"]]
+
+    markers = pd.concat([corners, marks], ignore_index=True)[["Kind", "Number", "Label", "X", "Y", "Distance"]]
+
+    return outline, markers, rotation_angle
+
+
+
+def circuit_dir(dir: str, location: str) -> str:
+    # Directory of a venue, every layout it had is a subdirectory
+    return f"{dir}/{CIRCUITS_DIR}/{circuit_key(location)}"
+
+
+
+def layouts(dir: str, location: str) -> list:
+    # Layouts stored for a venue, named after the season they were first built from, oldest first
+    path = circuit_dir(dir, location)
+    if not os.path.isdir(path):
+        return []
+    return sorted(name for name in os.listdir(path) if os.path.exists(f"{path}/{name}/{OUTLINE_FILE}"))
+
+
+
+def _event_layouts(dir: str, location: str) -> dict:
+    # "{year}/{dir_name}" of every event matched to a layout, to the layout's name
+    path = f"{circuit_dir(dir, location)}/{EVENTS_FILE}"
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+
+def layout_dir(dir: str, year: int, dir_name: str, location: str) -> str:
+    """
+    Directory of the layout an event was run on. Events not matched yet, e.g. without telemetry,
+    get the venue's most recent layout.
+
+    Return:
+    - path (str), None when the venue has no stored layout
+    """
+
+    name = _event_layouts(dir, location).get(f"{year}/{dir_name}")
+    if name is None:
+        stored = layouts(dir, location)
+        name = stored[-1] if stored else None
+
+    return None if name is None else f"{circuit_dir(dir, location)}/{name}"
+
+
+
+def has_circuit(dir: str, location: str) -> bool:
+    return bool(layouts(dir, location))
+
+
+
+def same_layout(reference: pd.DataFrame, outline: pd.DataFrame) -> bool:
+    """
+    Whether a lap was driven on the layout of a stored outline: about as long, and never further
+    than LAYOUT_TOLERANCE metres from it. Positions are compared in the outline's own units,
+    scaled to metres by its length (FastF1 positions are in 1/10 m).
+
+    Arguments:
+    - reference (pd.DataFrame): X, Y and Distance of one lap
+    - outline (pd.DataFrame): stored outline, see resample_outline
+
+    Return:
+    - bool
+    """
+
+    lap = resample_outline(reference)
+    lap_length, stored_length = float(lap["Distance"].iloc[-1]), float(outline["Distance"].iloc[-1])
+    if abs(lap_length - stored_length) > LAYOUT_LENGTH_TOLERANCE * stored_length:
+        return False
+
+    stored = outline[["X", "Y"]].to_numpy()
+    metres_per_unit = stored_length / np.hypot(*np.diff(stored, axis=0).T).sum()
+
+    # Distance from every point of the lap to the closest point of the outline
+    points = lap[["X", "Y"]].to_numpy()
+    closest = np.sqrt(((points[:, None, :] - stored[None, :, :]) ** 2).sum(axis=2)).min(axis=1)
+
+    return bool(closest.max() * metres_per_unit <= LAYOUT_TOLERANCE)
+
+
+
+def _session_order(event_dir: str) -> list:
+    sessions = [session for session in os.listdir(event_dir) if os.path.exists(f"{event_dir}/{session}/telemetry_data.parquet")]
+    return sorted(sessions, key=lambda session: SESSION_PREFERENCE.index(session) if session in SESSION_PREFERENCE else len(SESSION_PREFERENCE))
+
+
+
+def _event_reference(event_dir: str) -> tuple:
+    # Reference lap of the first session of an event with telemetry, in SESSION_PREFERENCE order
+    if os.path.isdir(event_dir):
+        for session in _session_order(event_dir):
+            reference = minisectors.reference_lap(f"{event_dir}/{session}")
+            if len(reference) > 1:
+                return reference, session
+
+    return None, None
+
+
+
+def update_circuit(dir: str, year: int, dir_name: str, location: str, rebuild: bool = False, session: str = None, session_dir: str = None) -> bool:
+    """
+    Matches an event to the layout of its venue it was run on, from the first session of the
+    event that has telemetry. A lap that fits none of the stored layouts (same_layout) is built
+    into a new one, so venues whose track changed keep one model per layout.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season of the event
+    - dir_name (str): directory of the event
+    - location (str): Location of the event in the schedule, the circuit key
+    - rebuild (bool): build the event's layout again even when the event was matched already
+    - session (str): build from this session of the event instead of the first one with telemetry
+    - session_dir (str): where that session's files are when not in the tree yet, e.g. staged by watch_ingest.py
+
+    Return:
+    - whether a layout was built (bool)
+    """
+
+    event_key = f"{year}/{dir_name}"
+    event_layouts = _event_layouts(dir, location)
+    if event_key in event_layouts and not rebuild:
+        return False
+
+    if session is not None:
+        reference = minisectors.reference_lap(session_dir or f"{dir}/{year}/{dir_name}/{session}")
+        if len(reference) <= 1:
+            return False
+    else:
+        reference, session = _event_reference(f"{dir}/{year}/{dir_name}")
+        if reference is None:
+            return False
+
+    venue = circuit_dir(dir, location)
+    name = next((name for name in layouts(dir, location) if same_layout(reference, data_access.read_parquet(f"{venue}/{name}/{OUTLINE_FILE}"))), None)
+
+    built = name is None or rebuild
+    if built:
+        if name is None:
+            taken = set(layouts(dir, location))
+            name = next(candidate for candidate in [str(year)] + [f"{year}_{n}" for n in range(2, 100)] if candidate not in taken)
+
+        outline, markers, rotation_angle = build_circuit(reference)
+
+        path = f"{venue}/{name}"
+        os.makedirs(path, exist_ok=True)
+
+        with data_access.replacing(f"{path}/{MARKERS_FILE}") as tmp_path:
+            markers.to_parquet(tmp_path, index=False)
+
+        # Outline last, it carries the rotation and marks the layout as built
+        table = pa.Table.from_pandas(outline, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **table.schema.metadata,
+            b"rotation_angle": str(rotation_angle).encode(),
+            b"lap_length": str(float(outline["Distance"].iloc[-1])).encode(),
+            b"source": f"{event_key}/{session}".encode(),
+        })
+        with data_access.replacing(f"{path}/{OUTLINE_FILE}") as tmp_path:
+            pq.write_table(table, tmp_path)
+
+    event_layouts[event_key] = name
+    with data_access.replacing(f"{venue}/{EVENTS_FILE}") as tmp_path:
+        with open(tmp_path, "w") as f:
+            json.dump(event_layouts, f, indent=2, sort_keys=True)
+
+    return built
+
+
+
+def load_circuit(dir: str, year: int, event: str, persist: bool = True) -> tuple:
+    """
+    Returns the stored model of the layout an event was run on, matching or building it on first use.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - event (str): EventName in the schedule
+    - persist (bool): store a layout matched or built on first use, False builds it in memory only (the dashboard)
+
+    Return:
+    - outline (pd.DataFrame), markers (pd.DataFrame), rotation angle (float), all empty/0 when
+      no session of the venue has telemetry
+    """
+
+    df_schedule = data_access.read_table(f"{dir}/{year}", "schedule", columns=["EventName", "Location", "DirName"])
+    location, dir_name = df_schedule[df_schedule["EventName"] == event][["Location", "DirName"]].iloc[0]
+
+    if persist:
+        update_circuit(dir, year, dir_name, location)
+
+    # An event with telemetry that was not matched yet is built from its own lap, its layout may be new
+    if f"{year}/{dir_name}" not in _event_layouts(dir, location):
+        reference, _ = _event_reference(f"{dir}/{year}/{dir_name}")
+        if reference is not None:
+            return build_circuit(reference)
+
+    path = layout_dir(dir, year, dir_name, location)
+    if path is None:
+        return pd.DataFrame(columns=["X", "Y", "Distance"]), pd.DataFrame(columns=["Kind", "Number", "Label", "X", "Y", "Distance"]), 0.0
+
+    rotation_angle = float(pq.read_schema(f"{path}/{OUTLINE_FILE}").metadata[b"rotation_angle"])
+
+    return data_access.read_parquet(f"{path}/{OUTLINE_FILE}"), data_access.read_parquet(f"{path}/{MARKERS_FILE}"), rotation_angle
+
+
+
+def backfill_circuits(dir: str, year: int) -> None:
+    """
+    Builds every circuit of a season that is not stored yet.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    """
+
+    df_schedule = data_access.read_table(f"{dir}/{year}", "schedule", columns=["Location", "DirName"])
+
+    for location, dir_name in zip(df_schedule["Location"], df_schedule["DirName"]):
+        if update_circuit(dir, year, dir_name, location):
+            print(f"Circuit built: {circuit_key(location)}")
+
+
+
+def circuit_events(dir: str, location: str, first_year: int = FIRST_TELEMETRY_YEAR) -> pd.DataFrame:
+    """
+    Every event held at a circuit across the seasons stored in the data tree.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - location (str): Location of any event at the circuit
+    - first_year (int): earliest season to look at
+
+    Return:
+    - Year, EventName and DirName, oldest first (pd.DataFrame)
+    """
+
+    key = circuit_key(location)
+    years = sorted(int(name) for name in os.listdir(dir) if name.isdigit() and int(name) >= first_year and os.path.exists(f"{dir}/{name}/schedule.parquet"))
+
+    events = []
+    for year in years:
+        df_schedule = data_access.read_table(f"{dir}/{year}", "schedule", columns=["EventName", "Location", "DirName"])
+        at_circuit = df_schedule[df_schedule["Location"].map(circuit_key) == key]
+        events.append(at_circuit[["EventName", "DirName"]].assign(Year=year))
+
+    if not events:
+        return pd.DataFrame(columns=["Year", "EventName", "DirName"])
+
+    return pd.concat(events, ignore_index=True)[["Year", "EventName", "DirName"]]
+
+
+
+def load_fastest_laps_across_years(
+        dir: str,
+        location: str,
+        session: str = "qualifying",
+        years: list = None,
+        per_driver: bool = False,
+        persist: bool = True) -> pd.DataFrame:
+    """
+    Fastest lap telemetry of one session at a circuit in every season, read from the fastest lap
+    sidecars. Sessions converted before the sidecar existed get it written on first use, or built
+    in memory when persist is False.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - location (str): Location of any event at the circuit
+    - session (str): session directory name
+    - years (list): seasons to read, all with data when None
+    - per_driver (bool): every driver's fastest lap instead of the fastest lap of the session
+    - persist (bool): write missing sidecars, False builds them in memory only (the dashboard)
+
+    Return:
+    - sidecar rows with Year and EventName added, oldest season first (pd.DataFrame)
+    """
+
+    df_events = circuit_events(dir, location)
+    if years is not None:
+        df_events = df_events[df_events["Year"].isin(years)]
+
+    frames = []
+    for year, event, dir_name in zip(df_events["Year"], df_events["EventName"], df_events["DirName"]):
+        session_dir = f"{dir}/{year}/{dir_name}/{session}"
+        if not os.path.exists(f"{session_dir}/telemetry_data.parquet"):
+            continue
+        if ingest.has_fastest_laps(session_dir):
+            df_laps = data_access.read_table(session_dir, "fastest_laps")
+        elif persist:
+            ingest.materialize_fastest_laps(session_dir)
+            df_laps = data_access.read_table(session_dir, "fastest_laps")
+        else:
+            df_laps = ingest.session_fastest_laps(session_dir)
+
+        if not per_driver and len(df_laps):
+            df_laps = df_laps[df_laps["LapTime"] == df_laps["LapTime"].min()]
+            df_laps = df_laps[df_laps["driver"] == df_laps["driver"].iloc[0]]
+
+        frames.append(df_laps.assign(Year=year, EventName=event))
+
+    if not frames:
+        return pd.DataFrame(columns=ingest.FASTEST_LAP_COLUMNS + ["driver", "lap", "LapTime", "Team", "Year", "EventName"])
+
+    return pd.concat(frames, ignore_index=True)
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    # A rotated ellipse must come back with its rotation, and a square with its four corners
+    t = np.linspace(0, 2 * np.pi, 2000)
+    for tilt in [-60, 0, 35, 80]:
+        x, y = 3000 * np.cos(t), 800 * np.sin(t)
+        c, s = np.cos(np.radians(tilt)), np.sin(np.radians(tilt))
+        angle = rotation_from_principal_axes(c * x - s * y, s * x + c * y)
+        assert abs(angle - tilt) < 0.5, (tilt, angle)
+
+    side = np.linspace(0, 1000, 200, endpoint=False)
+    square = np.concatenate([
+        np.column_stack([side, np.zeros_like(side)]),
+        np.column_stack([np.full_like(side, 1000), side]),
+        np.column_stack([1000 - side, np.full_like(side, 1000)]),
+        np.column_stack([np.zeros_like(side), 1000 - side]),
+    ])
+    reference = pd.DataFrame({"X": square[:, 0], "Y": square[:, 1], "Distance": np.arange(len(square)) * 5.0})
+    outline, markers, rotation_angle = build_circuit(reference)
+    assert (markers["Kind"] == "Corner").sum() == 4, markers
+    print(markers)
+
+    # A racing line a few metres off is the same layout, a chicane cut into one side is not
+    # (positions in 1/10 m like FastF1's)
+    track = reference.assign(X=reference["X"] * 10, Y=reference["Y"] * 10)
+    stored = resample_outline(track)
+    assert same_layout(track.assign(X=track["X"] + 50, Y=track["Y"] - 30), stored)
+    detour = track.assign(Y=np.where((track["Y"] == 0) & track["X"].between(3000, 7000), -600, track["Y"]))
+    assert not same_layout(detour, stored)
+    assert not same_layout(track.assign(Distance=track["Distance"] * 1.05), stored)
+
+    import sys
+    if len(sys.argv) > 2:
+        backfill_circuits(sys.argv[1], int(sys.argv[2]))
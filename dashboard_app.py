@@ -3,28 +3,186 @@ from datetime import datetime
 import pandas as pd
 import plotting as fsp
 import re
-import io
-from rapidfuzz import process
-from scrape import scrape_drivers_wiki
-import unidecode
-import time
-from matplotlib import colormaps
-from matplotlib.collections import LineCollection
+import figures
 import scrape as fss
+import standings as fst
+import ingest as fsi
+import tyres as fsty
+import race_replay as fsrr
+import race_gaps as fsrg
+import minisectors as fsms
+import circuits as fscr
+import watch_ingest as fswi
+import lap_stats as fsls
+import driving_events as fsde
+import track_status as fsts
+import lap_telemetry as fslt
+import season_speed as fsss
+import data_access as fsda
+import aggregate_store as fsag
 import os
+from functools import partial
 
 today = datetime.today()
 
-dir = "/Users/bartosz/f1_data"
+# Root of the parquet data tree, F1_DATA_DIR points the app at another tree
+dir = os.environ.get("F1_DATA_DIR", "/Users/bartosz/f1_data")
 
 def normalize_name(name):
+    import unidecode
     return unidecode.unidecode(name).lower()
 
 def fuzzy_match(name, choices):
+    # Imported on first use, only the drivers list needs it
+    from rapidfuzz import process
+
     # Get the best match with its score
     match, score, _ = process.extractOne(name, choices)
     return match
 
+def select_track_conditions(laps, key):
+    # Only sessions with weather or lap status materialized alongside the laps can be filtered
+    has_weather = "TrackTemp" in laps.columns and not laps["TrackTemp"].isna().all()
+    has_status = "LapStatus" in laps.columns
+    if not has_weather and not has_status:
+        return laps
+
+    with st.expander("Track Conditions"):
+        if has_status:
+            # Neutralised laps are left out unless asked for, pit laps are kept for the outlier filter to judge
+            statuses = [status for status in fsts.LAP_STATUSES if status in set(laps["LapStatus"].dropna())]
+            lap_statuses = st.multiselect("Lap Status:", statuses, [status for status in statuses if status not in fsts.NEUTRALISED_STATUSES], key=f"{key}_lap_status")
+
+        conditions, track_temp_range, normalize = "All", None, False
+        if has_weather:
+            col1, col2 = st.columns(2)
+            with col1:
+                conditions = st.radio("Conditions:", ["All", "Dry", "Wet"], horizontal=True, key=f"{key}_conditions")
+                normalize = st.toggle("Normalize lap times to median track temp", key=f"{key}_normalize")
+            with col2:
+                temp_min, temp_max = float(laps["TrackTemp"].min()), float(laps["TrackTemp"].max())
+                if temp_min < temp_max:
+                    track_temp_range = st.slider("Track Temp (°C):", temp_min, temp_max, (temp_min, temp_max), key=f"{key}_track_temp")
+
+    if has_status:
+        laps = fsts.filter_laps_by_status(laps, lap_statuses)
+
+    laps = fsp.filter_laps_by_weather(laps, conditions, track_temp_range)
+
+    if normalize:
+        laps = fsp.normalize_lap_times_by_track_temp(laps)
+
+    return laps
+
+def show_figure(fig, label=None, file_name=None):
+    # Draws the figure with an optional PNG download, then releases it from pyplot
+    st.pyplot(fig)
+
+    if label is not None:
+        st.download_button(
+            label=label,
+            data=figures.figure_bytes(fig),
+            file_name=file_name,
+            mime="image/png"
+        )
+
+    figures.release(fig)
+
+def show_figures(items, download=True):
+    # Builds and renders (placeholder, builder, label, file name) items together in the render pool,
+    # then fills every placeholder with its image and download button
+    rendered = figures.render_figures([build for _, build, _, _ in items], 300 if download else None)
+
+    for (placeholder, _, label, file_name), images in zip(items, rendered):
+        with placeholder.container():
+            st.image(images["display"], width="stretch", output_format="PNG")
+            if label is not None and images["download"] is not None:
+                st.download_button(
+                    label=label,
+                    data=images["download"],
+                    file_name=file_name,
+                    mime="image/png"
+                )
+
+def replay_player(session_dir, key, play_start, play_end, step, trail_seconds, track, drivers_colors, year, event, session, rotation_angle):
+    # Draws one frame per run and moves on by one step, run as a fragment so only the frame is redrawn
+    play_time = st.session_state.get(key, play_start)
+
+    df_frames = fsrr.load_replay_frames(session_dir, play_time - trail_seconds, play_time, persist=False)
+    fig = fsp.plot_race_replay_frame(df_frames, play_time, track, drivers_colors, year, event, session, trail_seconds, True, rotation_angle)
+    show_figure(fig)
+
+    if play_time < play_end:
+        st.session_state[key] = min(play_time + step, play_end)
+    elif not st.session_state.get(f"{key}_done"):
+        # Last frame drawn, one rerun of the whole app stops the timer
+        st.session_state[f"{key}_done"] = True
+        st.rerun()
+
+@st.cache_data(max_entries=64)
+def circuit_model(year, event, data_version):
+    # Outline, markers and rotation of the event's circuit, stored by the ingest watcher. Venues
+    # without a stored circuit are built in memory and retried when new sessions are published
+    return fscr.load_circuit(dir, year, event, persist=False)
+
+# Derived tables are built by the ingest watcher before a session is published (python ingest.py
+# <data dir> <year> for older sessions). The app never writes them, a missing one is built in memory
+@st.cache_data(max_entries=32)
+def session_speeds(session_dir, data_version):
+    return fsss.load_speed_summary(session_dir, persist=False)
+
+@st.cache_data(max_entries=32)
+def session_degradation(session_dir, data_version):
+    return fsty.load_degradation(session_dir, persist=False)
+
+@st.cache_data(max_entries=32)
+def session_gaps(session_dir, data_version):
+    return fsrg.load_gaps(session_dir, persist=False)
+
+@st.cache_data(max_entries=32)
+def session_features(session_dir, markers, data_version):
+    return fsde.load_driving_features(session_dir, markers, persist=False)
+
+@st.cache_data(max_entries=32)
+def session_minisectors(session_dir, n_minisectors, data_version):
+    return fsms.load_minisectors(session_dir, n_minisectors, persist=False)
+
+@st.cache_data(max_entries=8)
+def season_speeds(year, session, data_version):
+    # One worker inside the server when the stored table is missing or out of date
+    return fsss.load_season_speeds(dir, year, session, workers=1, persist=False)
+
+@st.cache_data(max_entries=8)
+def season_degradation(year, session, data_version):
+    return fsty.load_season_degradation(dir, year, session, workers=1, persist=False)
+
+@st.cache_data(max_entries=8)
+def season_standings(year, data_version):
+    return fst.update_standings(dir, year, persist=False)
+
+@st.cache_data(max_entries=16)
+def fastest_laps_across_years(location, session, years, data_version):
+    return fscr.load_fastest_laps_across_years(dir, location, session, years, per_driver=True, persist=False)
+
+@st.cache_data(max_entries=64)
+def store_records(store_version):
+    # Records of the aggregate store, queried again only after aggregate_store.py changed its contents
+    return fsag.records(fsag.store_url(dir), limit=5)
+
+@st.cache_data(max_entries=64)
+def store_team_results(year, event, data_version, store_version):
+    # Results of every team at the event's circuit across the seasons in the aggregate store
+    location = fsda.read_table(f"{dir}/{year}", "schedule", columns=["EventName", "Location"]).set_index("EventName").loc[event, "Location"]
+    return location, fsag.team_results_at_circuit(fsag.store_url(dir), location)
+
+@st.cache_data(max_entries=32)
+def lap_time_stats(session_dir, laps, by, remove_outliers, kde=False):
+    # Summaries are cached per session, outlier mode and track condition filter (the laps passed in)
+    return fsls.compute_lap_time_stats(laps, by, remove_outliers, kde)
+
+# Bumped by watch_ingest.py whenever it publishes a session, cached data is keyed on it
+data_version = fswi.manifest_version(dir)
+
 # Default wide mode
 st.set_page_config(layout="wide")
 
@@ -39,8 +197,11 @@ st.sidebar.text("Options change dynamically to show correct events and sessions
 # Step 1: choose year
 year = st.sidebar.selectbox("Year", list(range(2018, today.year + 1))[::-1])
 
+# Every read below is booked to the page it is made for, see reads_report.py
+fsda.set_page("Sidebar")
+
 # Load the schedule
-schedule = pd.read_parquet(f"/Users/bartosz/f1_data/{year}/schedule.parquet", columns=["EventName", "EventDate", "Session1", "Session2", "Session3", "Session4", "Session5"])
+schedule = fsda.read_table(f"{dir}/{year}", "schedule", columns=["EventName", "EventDate", "Session1", "Session2", "Session3", "Session4", "Session5"])
 
 # Filter events that happened or are happening
 # Remove events that contain the word "testing" (case insensitive)
@@ -72,53 +233,53 @@ session = re.sub(r"\s+", "_", session).lower()
 # Visualisations
 with tab1:
     st.subheader("Visualisations", help="Detailed information about how each plot works can be found in the guide tab.")
+    fsda.set_page("Visuals")
 
     teams_colors = fsp.get_teams_colors(dir, year, event, session)
 
     page = st.selectbox("Select Graphics",
                                 ["Lap Time Distributions",
                                 "Pace Comparisons",
+                                "Tyre Degradation",
                                 "Whole Race",
+                                "Setup Performance",
                                 "Telemetry",
                                 "Weather Data"
                                 ])
+    fsda.set_page(f"Visuals: {page}")
 
-    df_schedule = pd.read_parquet(f"{dir}/{year}/schedule.parquet", columns=["EventName", "EventDate", "DirName"])
-    dir_name = df_schedule[df_schedule["EventName"] == event]["DirName"].iloc[0]
+    # Weather of every lap is joined at ingest and stored with the laps (ingest.backfill_lap_weather for older sessions)
+    session_dir = fsda.find_session_dir(dir, year, event, session)
+    condition_columns = ["TrackTemp", "Rainfall"] if fsi.has_lap_weather(session_dir) else []
+
+    # So is the Safety Car, VSC, red flag or pit status of every lap (track_status.backfill_lap_status for older sessions)
+    if fsts.has_lap_status(session_dir):
+        condition_columns.append("LapStatus")
 
     if page == "Lap Time Distributions":
         st.text("Default threshold for outliers removal is calculated based on Q1, Q3 and IQR.")
 
         # Load data based on the chose parameters
-        df_laps = pd.read_parquet(
-            f"{dir}/{year}/{dir_name}/{session}/laps.parquet",
-            columns=["LapTime", "Team", "Driver", "Compound", "CompoundColor"]
-        )
+        df_laps = fsda.read_table(session_dir, "laps", columns=["LapTime", "Team", "Driver", "Compound", "CompoundColor"] + condition_columns)
         df_laps["Lap Time (s)"] = df_laps["LapTime"].dt.total_seconds()
         df_laps['Compound'] = df_laps['Compound'].replace('nan', 'No Data')
 
-        df_results = pd.read_parquet(
-            f"{dir}/{year}/{dir_name}/{session}/results.parquet",
-            columns=["Abbreviation", "TeamColorFastf1", "TeamName"]
-        )
+        df_laps = select_track_conditions(df_laps, "distributions")
+
+        df_results = fsda.read_table(session_dir, "results", columns=["Abbreviation", "TeamColorFastf1", "TeamName"])
 
         
         
+        # Widgets and placeholders first, the three figures are then rendered together
         # Plot team lap time distribution
         st.subheader("Team Lap Time Distribution")
         remove_outliers = st.radio("Remove Outliers Team Lap Time:", ["Yes", "No"], horizontal=True)
-        fig = fsp.plot_team_lap_time_dist(df_laps, year, event, session, teams_colors, remove_outliers)
-        st.pyplot(fig)
-
-        img_buffer = io.BytesIO()
-        fig.savefig(img_buffer, format="png", bbox_inches="tight", pad_inches=0.1, dpi=300)
-        img_buffer.seek(0)
-
-        st.download_button(
-            label="Download Team Lap Time Dist",
-            data=img_buffer,
-            file_name=f"team_lap_time_dist_{year}_{event.replace(' ', '_').lower()}_{session}.png",
-            mime="image/png"
+        team_stats = lap_time_stats(session_dir, df_laps[["Team", "Lap Time (s)"]], "Team", remove_outliers)
+        team_figure = (
+            st.empty(),
+            partial(fsp.plot_team_lap_time_dist, df_laps, year, event, session, teams_colors, remove_outliers, stats=team_stats),
+            "Download Team Lap Time Dist",
+            f"team_lap_time_dist_{year}_{event.replace(' ', '_').lower()}_{session}.png"
         )
 
 
@@ -131,18 +292,13 @@ with tab1:
         with col2:
             show_tyre_compounds = st.radio("Show Tyre Compounds", ["Yes", "No"], horizontal=True)
 
-        fig = fsp.plot_violin_dist_point_socrers(df_laps, df_results, year, event, session, teams_colors, remove_outliers, show_tyre_compounds)
-        st.pyplot(fig)
-
-        img_buffer = io.BytesIO()
-        fig.savefig(img_buffer, format="png", bbox_inches="tight", pad_inches=0.1, dpi=300)
-        img_buffer.seek(0)
-
-        st.download_button(
-            label="Download Violin Point Scorers",
-            data=img_buffer,
-            file_name=f"violin_point_scorers_{year}_{event.replace(' ', '_').lower()}_{session}.png",
-            mime="image/png"
+        # Quartiles and density curves of every driver, shared with the drivers box plot below
+        driver_stats = lap_time_stats(session_dir, df_laps[["Driver", "Lap Time (s)"]], "Driver", remove_outliers, kde=True)
+        violin_figure = (
+            st.empty(),
+            partial(fsp.plot_violin_dist_point_socrers, df_laps, df_results, year, event, session, teams_colors, remove_outliers, show_tyre_compounds, stats=driver_stats),
+            "Download Violin Point Scorers",
+            f"violin_point_scorers_{year}_{event.replace(' ', '_').lower()}_{session}.png"
         )
 
 
@@ -151,41 +307,27 @@ with tab1:
         st.subheader("Drivers Lap Time Distribution")
         st.text("Only drivers for whom there is enough valid data are displayed.")
 
-        fig = fsp.plot_drivers_lap_time_dist(df_laps, df_results, year, event, session, teams_colors, remove_outliers)
-        st.pyplot(fig)
-
-        img_buffer = io.BytesIO()
-        fig.savefig(img_buffer, format="png", bbox_inches="tight", pad_inches=0.1, dpi=300)
-        img_buffer.seek(0)
-
-        st.download_button(
-            label="Download Drivers Lap Time Dist",
-            data=img_buffer,
-            file_name=f"drivers_lap_time_dist_{year}_{event.replace(' ', '_').lower()}_{session}.png",
-            mime="image/png"
+        drivers_figure = (
+            st.empty(),
+            partial(fsp.plot_drivers_lap_time_dist, df_laps, df_results, year, event, session, teams_colors, remove_outliers, stats=driver_stats),
+            "Download Drivers Lap Time Dist",
+            f"drivers_lap_time_dist_{year}_{event.replace(' ', '_').lower()}_{session}.png"
         )
 
+        show_figures([team_figure, violin_figure, drivers_figure])
+
 
 
 
     if page == "Pace Comparisons":
         # Load data based on the chose parameters
-        df_laps = pd.read_parquet(
-            f"{dir}/{year}/{dir_name}/{session}/laps.parquet",
-            columns=["LapNumber", "LapTime", "Team"]
-        )
+        df_laps = fsda.read_table(session_dir, "laps", columns=["LapNumber", "LapTime", "Team", "Driver"] + condition_columns)
         df_laps["Lap Time (s)"] = df_laps["LapTime"].dt.total_seconds()
 
-        df_results = pd.read_parquet(
-            f"{dir}/{year}/{dir_name}/{session}/results.parquet",
-            columns=["Abbreviation", "TeamColorFastf1", "TeamName"]
-        )
-        df_telemetry = pd.read_parquet(
-            f"{dir}/{year}/{dir_name}/{session}/telemetry_data.parquet")
-        
-        team_mean_speed_dict = {team: float(speed) for team, speed in df_telemetry.groupby("Team")["Speed"].mean().round(2).items()}
-        team_max_speed_dict = {team: float(speed) for team, speed in df_telemetry.groupby("Team")["Speed"].max().round(2).items()}
-        
+        df_laps = select_track_conditions(df_laps, "pace")
+
+        df_results = fsda.read_table(session_dir, "results", columns=["Abbreviation", "TeamColorFastf1", "TeamName"])
+
         if st.toggle('Show Graphic Options'):
             
             col1, col2 = st.columns(2)
@@ -202,18 +344,177 @@ with tab1:
             fig = fsp.plot_team_pace_comparison(df_laps, df_results, year, event, session, teams_colors, lap, lap_number, remove_outliers)
         else:
             fig = fsp.plot_team_pace_comparison(df_laps, df_results, year, event, session, teams_colors)
-        st.pyplot(fig)
+        show_figure(fig, "Download Team Pace Comparison", f"team_pace_comparison_{year}_{event.replace(' ', '_').lower()}_{session}.png")
 
-        img_buffer = io.BytesIO()
-        fig.savefig(img_buffer, format="png", bbox_inches="tight", pad_inches=0.1, dpi=300)
-        img_buffer.seek(0)
+        st.subheader("Mean vs Max Speed", help="Mean and max of every telemetry speed sample, summarised once per session and stored next to the telemetry.")
 
-        st.download_button(
-            label="Download Team Pace Comparison",
-            data=img_buffer,
-            file_name=f"team_pace_comparison_{year}_{event.replace(' ', '_').lower()}_{session}.png",
-            mime="image/png"
-        )
+        if not os.path.exists(f"{session_dir}/telemetry_data.parquet"):
+            st.text("No telemetry available for this session.")
+        else:
+            by = st.radio("Speeds Per:", ["Team", "Driver"], horizontal=True)
+
+            df_speeds = session_speeds(session_dir, data_version)
+            fig = fsp.plot_mean_vs_max_speed(df_speeds, year, event, session, teams_colors, by)
+            show_figure(fig, "Download Mean vs Max Speed", f"mean_vs_max_speed_{by.lower()}_{year}_{event.replace(' ', '_').lower()}_{session}.png")
+
+            if st.toggle("Show Season Speed Trend"):
+                # Stored by the ingest watcher next to the schedule
+                df_season_speeds = season_speeds(year, session, data_version)
+
+                if df_season_speeds.empty:
+                    st.text(f"No {session.replace('_', ' ')} telemetry available for this season.")
+                else:
+                    fig = fsp.plot_season_speed_trend(df_season_speeds, year, session, teams_colors)
+                    show_figure(fig, "Download Season Speed Trend", f"season_speed_trend_{year}_{session}.png")
+
+
+
+    if page == "Tyre Degradation":
+        st.text("Slope of lap time against tyre age for every stint, fitted on green flag laps without pit stops.")
+
+        # Fitted once per session at ingest and stored next to the laps
+        df_stints = session_degradation(session_dir, data_version)
+
+        df_results = fsda.read_table(session_dir, "results", columns=["Abbreviation", "TeamColorFastf1", "TeamName"])
+
+        min_laps = st.slider("Minimum laps in stint:", 3, 15, 5)
+
+        fig = fsp.plot_tyre_degradation(df_stints, df_results, year, event, session, teams_colors, min_laps)
+        show_figure(fig, "Download Tyre Degradation", f"tyre_degradation_{year}_{event.replace(' ', '_').lower()}_{session}.png")
+
+        if st.toggle("Show Season Trend"):
+            # Stored by the ingest watcher next to the schedule
+            df_season_stints = season_degradation(year, session, data_version)
+
+            if df_season_stints.empty:
+                st.text(f"No {session.replace('_', ' ')} sessions available for this season.")
+            else:
+                fig = fsp.plot_season_tyre_degradation(df_season_stints, year, session, min_laps)
+                show_figure(fig, "Download Season Tyre Degradation", f"season_tyre_degradation_{year}_{session}.png")
+
+
+
+    if page == "Whole Race":
+        view = st.radio("View:", ["Gap To Leader", "Interval", "Position Changes", "Replay"], horizontal=True)
+
+        if view != "Replay":
+            # Drivers x laps matrix, built once per session at ingest and stored next to the laps
+            df_gaps = session_gaps(session_dir, data_version)
+
+        if view in ["Gap To Leader", "Position Changes"]:
+            drivers = st.multiselect("Drivers (all when empty):", list(fsrg.finishing_order(df_gaps)))
+
+        if view == "Gap To Leader":
+            st.text("Time behind the first car to complete each lap. Lapped cars keep falling back by a lap time per lap down.")
+            fig = fsp.plot_gap_to_leader(df_gaps, year, event, session, teams_colors, drivers)
+            show_figure(fig, "Download Gap To Leader", f"gap_to_leader_{year}_{event.replace(' ', '_').lower()}_{session}.png")
+
+        elif view == "Interval":
+            st.text("Time to the car ahead on the road at the end of every lap, the line on the colour bar marks DRS range (1 s).")
+            fig = fsp.plot_interval_matrix(df_gaps, year, event, session)
+            show_figure(fig, "Download Interval Matrix", f"interval_matrix_{year}_{event.replace(' ', '_').lower()}_{session}.png")
+
+        elif view == "Position Changes":
+            fig = fsp.plot_position_changes(df_gaps, year, event, session, teams_colors, drivers)
+            show_figure(fig, "Download Position Changes", f"position_changes_{year}_{event.replace(' ', '_').lower()}_{session}.png")
+
+        elif not os.path.exists(f"{session_dir}/telemetry_data.parquet"):
+            st.text("No telemetry available for this session.")
+        elif not fsrr.has_replay(session_dir):
+            # Too large to build per view, the frames come from ingest only
+            st.text(f"Replay frames have not been built for this session yet, run: python ingest.py {dir} {year}")
+        else:
+            st.text("Positions of all cars resampled onto one session timebase. Pick a moment of the session or play a stretch of it.")
+
+            # Frames are built once per session at ingest, only the viewed time window is read
+            replay_start, replay_end, frame_interval = fsrr.replay_time_range(session_dir, persist=False)
+            track, _, rotation_angle = circuit_model(year, event, data_version)
+
+            df_results = fsda.read_table(session_dir, "results", columns=["Abbreviation", "TeamName"])
+            drivers_colors = {
+                driver: teams_colors.get(team_name, "#FFFFFF")
+                for driver, team_name in zip(df_results["Abbreviation"], df_results["TeamName"])
+            }
+
+            trail_seconds = 5
+
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                frame_time = st.slider("Session Time (s):", replay_start, replay_end, replay_start, step=frame_interval, format="%d")
+            with col2:
+                play_seconds = st.selectbox("Play From Here:", [0, 30, 60, 120], format_func=lambda seconds: f"{seconds} s" if seconds else "Off")
+
+            if play_seconds:
+                # The fragment reruns on its own every step, one frame per second until the end of the stretch
+                play_end = min(frame_time + play_seconds, replay_end)
+                step = max(frame_interval, 1.0)
+                key = f"replay_{session_dir}_{frame_time}_{play_end}"
+                run_every = None if st.session_state.get(f"{key}_done") else step
+
+                st.fragment(replay_player, run_every=run_every)(
+                    session_dir, key, frame_time, play_end, step, trail_seconds, track, drivers_colors, year, event, session, rotation_angle)
+            else:
+                # Playing the same stretch again starts from its beginning
+                for key in [key for key in st.session_state if str(key).startswith("replay_")]:
+                    del st.session_state[key]
+
+                df_frames = fsrr.load_replay_frames(session_dir, frame_time - trail_seconds, frame_time, persist=False)
+
+                fig = fsp.plot_race_replay_frame(df_frames, frame_time, track, drivers_colors, year, event, session, trail_seconds, True, rotation_angle)
+                show_figure(fig, "Download Race Replay Frame", f"race_replay_{year}_{event.replace(' ', '_').lower()}_{session}_{int(frame_time)}.png")
+
+
+
+    if page == "Setup Performance":
+        st.subheader("Setup Performance", help="Top speed against the mean minimum speed through the corners on every driver's fastest lap, both from the per lap driving features table built once per session.")
+
+        if not os.path.exists(f"{session_dir}/telemetry_data.parquet"):
+            st.text("No telemetry available for this session.")
+        else:
+            # Built from the telemetry at ingest, then read from disk
+            _, df_markers, _ = circuit_model(year, event, data_version)
+            df_features = session_features(session_dir, df_markers, data_version)
+
+            df_laps = fsda.read_table(session_dir, "laps", optional=["Driver", "LapNumber", "LapTime", "Team", "IsAccurate", "Deleted"])
+            df_setup = fsde.fastest_lap_features(df_features, df_laps)
+
+            fig = fsp.plot_setup_performance(df_setup, teams_colors, year, event, session, True)
+            show_figure(fig, "Download Setup Performance", f"setup_performance_{year}_{event.replace(' ', '_').lower()}_{session}.png")
+
+            st.dataframe(
+                df_setup.assign(LapTime=df_setup["LapTime"].map(fsp.format_lap_time))[
+                    ["Driver", "Team", "LapNumber", "LapTime", "TopSpeed", "MeanCornerSpeed", "MinCornerSpeed", "FullThrottle", "BrakingZones", "BrakingDistance", "GearShifts"]
+                    if "MeanCornerSpeed" in df_setup.columns else
+                    ["Driver", "Team", "LapNumber", "LapTime", "TopSpeed", "FullThrottle", "BrakingZones", "BrakingDistance", "GearShifts"]
+                ].round(1),
+                hide_index=True)
+
+    if page == "Telemetry":
+        st.subheader("Telemetry", help="Speed, throttle, brake, RPM and gear against distance, every lap resampled onto one distance grid so the drivers line up point for point.")
+
+        if not os.path.exists(f"{session_dir}/telemetry_data.parquet"):
+            st.text("No telemetry available for this session.")
+        else:
+            df_laps = fsda.read_table(session_dir, "laps", optional=["Driver", "LapNumber", "LapTime", "Team", "IsAccurate", "Deleted"])
+            df_fastest = fslt.chosen_laps(df_laps)
+
+            col1, col2 = st.columns(2)
+            with col1:
+                drivers = st.multiselect("Drivers (all when empty):", list(df_fastest["Driver"]), default=list(df_fastest["Driver"].head(2)))
+                channels = st.multiselect("Channels:", fslt.TELEMETRY_CHANNELS, default=fslt.TELEMETRY_CHANNELS)
+            with col2:
+                lap = st.radio("Select Lap", ["Fastest", "Specific"], horizontal=True)
+                lap_number = None
+                if lap == "Specific":
+                    lap_number = st.selectbox("Lap Number:", sorted(int(lap) for lap in df_laps["LapNumber"].dropna().unique()))
+
+            # Only the chosen laps and channels are read from the telemetry
+            df_chosen = fslt.chosen_laps(df_laps, drivers, lap_number)
+            df_telemetry = fslt.resample_to_distance(fslt.load_lap_telemetry(session_dir, df_chosen, channels), channels)
+            _, df_markers, _ = circuit_model(year, event, data_version)
+
+            fig = fsp.plot_telemetry(df_telemetry, df_chosen, year, event, session, teams_colors, channels, True, df_markers)
+            show_figure(fig, "Download Telemetry", f"telemetry_{year}_{event.replace(' ', '_').lower()}_{session}.png")
 
 
 
@@ -224,22 +525,11 @@ with tab1:
         
         st.text("Order of choosing will change the order in which elements appear on the plot.")
 
-        df_weather = pd.read_parquet(f"{dir}/{year}/{dir_name}/{session}/weather.parquet")
+        df_weather = fsda.read_table(session_dir, "weather", columns=list(fsda.TABLES["weather"]["columns"]))
         
         fig = fsp.plot_weather_data(df_weather, year, event, session, elements_to_plot)
 
-        st.pyplot(fig)
-
-        img_buffer = io.BytesIO()
-        fig.savefig(img_buffer, format="png", bbox_inches="tight", pad_inches=0.1, dpi=300)
-        img_buffer.seek(0)
-
-        st.download_button(
-            label="Download Weather Data",
-            data=img_buffer,
-            file_name=f"weather_data_{year}_{event.replace(' ', '_').lower()}_{session}.png",
-            mime="image/png"
-        )
+        show_figure(fig, "Download Weather Data", f"weather_data_{year}_{event.replace(' ', '_').lower()}_{session}.png")
     
     
     
@@ -253,10 +543,11 @@ with tab1:
 # Schedule
 with tab2:
     st.subheader(f"Event schedule for {year}")
+    fsda.set_page("Schedule")
 
     # Load the data
-    df_schedule = pd.read_parquet(
-    f"/Users/bartosz/f1_data/{year}/schedule.parquet",
+    df_schedule = fsda.read_table(
+    f"{dir}/{year}", "schedule",
     columns=["RoundNumber", "Country", "Location", "OfficialEventName", "EventDate", "EventName", "EventFormat"]
     )
 
@@ -290,20 +581,15 @@ with tab2:
 with tab3:
     tab1, tab2, tab3, tab4 = st.tabs(["F1", "F2", "F3", "F1 Academy"])
     today = datetime.today().strftime('%d-%m-%Y')
+    fsda.set_page("Drivers List")
 
     with tab1:
         
-        if not os.path.exists(f"/Users/bartosz/f1_data/f1_drivers_wiki_{today}.parquet"):
-            fss.scrape_drivers_wiki(category="f1")
+        if not os.path.exists(f"{dir}/f1_drivers_wiki_{today}.parquet"):
+            fss.scrape_drivers_wiki(dir, category="f1")
 
-        df_f1_drivers = pd.read_parquet(f"/Users/bartosz/f1_data/f1_drivers_wiki_{today}.parquet")
-        df_schedule = pd.read_parquet(f"{dir}/{year}/schedule.parquet", columns=["EventName", "EventDate", "DirName"])
-        dir_name = df_schedule[df_schedule["EventName"] == event]["DirName"].iloc[0]
-        
-        df_results = pd.read_parquet(
-                f"{dir}/{year}/{dir_name}/{session}/results.parquet",
-                columns=["FullName"]
-            )
+        df_f1_drivers = fsda.read_table(dir, "drivers_wiki", category="f1", date=today)
+        df_results = fsda.read_table(fsda.find_session_dir(dir, year, event, session), "results", columns=["FullName"])
         
         which_drivers = st.radio("Current or all drivers:", ["Current", "All"], horizontal=True)
 
@@ -318,15 +604,15 @@ with tab3:
         st.dataframe(df_f1_drivers, hide_index=True, row_height=35, height=height, use_container_width=True)
 
     with tab2:
-        if not os.path.exists(f"/Users/bartosz/f1_data/f2_drivers_wiki_{today}.parquet"):
-            fss.scrape_drivers_wiki(category="f2")
-        df_f2_drivers = pd.read_parquet(f"/Users/bartosz/f1_data/f2_drivers_wiki_{today}.parquet")
+        if not os.path.exists(f"{dir}/f2_drivers_wiki_{today}.parquet"):
+            fss.scrape_drivers_wiki(dir, category="f2")
+        df_f2_drivers = fsda.read_table(dir, "drivers_wiki", category="f2", date=today)
         st.dataframe(df_f2_drivers, hide_index=True, row_height=35, height=height, use_container_width=True)
 
     with tab3:
-        if not os.path.exists(f"/Users/bartosz/f1_data/f3_drivers_wiki_{today}.parquet"):
-            fss.scrape_drivers_wiki(category="f3")
-        df_f3_drivers = pd.read_parquet(f"/Users/bartosz/f1_data/f3_drivers_wiki_{today}.parquet")
+        if not os.path.exists(f"{dir}/f3_drivers_wiki_{today}.parquet"):
+            fss.scrape_drivers_wiki(dir, category="f3")
+        df_f3_drivers = fsda.read_table(dir, "drivers_wiki", category="f3", date=today)
         st.dataframe(df_f3_drivers, hide_index=True, row_height=35, height=height, use_container_width=True)
 
 
@@ -335,9 +621,52 @@ with tab3:
 
 
 
+# Standings
+with tab4:
+    st.subheader(f"Championship standings for {year}")
+    fsda.set_page("Standings")
+
+    # Stored by the ingest watcher, only results that landed since are read again
+    df_standings = season_standings(year, data_version)
+
+    if df_standings.empty:
+        st.text("No race or sprint results available for this season yet.")
+    else:
+        championship = st.radio("Championship:", ["Drivers", "Constructors"], horizontal=True)
+
+        if championship == "Drivers":
+            df_final = fst.get_final_standings(df_standings, by="Abbreviation")
+            df_final = df_final[["Position", "FullName", "Abbreviation", "TeamName", "CumulativePoints"]]
+            progression = df_standings
+        else:
+            progression = fst.get_constructors_standings(df_standings)
+            df_final = fst.get_final_standings(progression, by="TeamName")
+            df_final = df_final[["Position", "TeamName", "CumulativePoints"]]
+
+        df_final = df_final.rename(columns={
+            "FullName": "Driver",
+            "Abbreviation": "Code",
+            "TeamName": "Team",
+            "CumulativePoints": "Points"
+        })
+
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            st.dataframe(df_final, hide_index=True, use_container_width=True)
+
+        with col2:
+            fig = fsp.plot_standings_progression(progression, year, teams_colors, championship)
+            show_figure(fig, "Download Standings Progression", f"{championship.lower()}_standings_progression_{year}.png")
+
+
+
+
+
+
 # Records
 with tab5:
-    df_f1_drivers = df_f1_drivers = pd.read_parquet(f"/Users/bartosz/f1_data/f1_drivers_wiki_{datetime.today().strftime('%d-%m-%Y')}.parquet")
+    fsda.set_page("Records")
+    df_f1_drivers = fsda.read_table(dir, "drivers_wiki", category="f1", date=datetime.today().strftime('%d-%m-%Y'))
     
     driver, wins = df_f1_drivers[["Driver name", "Race wins"]].loc[df_f1_drivers["Race wins"].idxmax()].values
     st.subheader(f"Most Wins: {driver} - {wins} wins")
@@ -351,6 +680,19 @@ with tab5:
     driver, race_entries = df_f1_drivers[["Driver name", "Race entries"]].loc[df_f1_drivers["Race entries"].idxmax()].values
     st.subheader(f"Most Race Entries: {driver} - {race_entries} race entries")
 
+    # Records of the loaded seasons, only when the aggregate store has been loaded (aggregate_store.py)
+    if fsag.store_exists(dir):
+        st.divider()
+        st.subheader("Records Of The Loaded Seasons", help="Counted by SQL queries over the aggregate store, reload it with aggregate_store.py after new sessions.")
+        store_version = fsag.store_version(fsag.store_url(dir))
+        for column, (name, df_record) in zip(st.columns(4), store_records(store_version).items()):
+            column.text(name)
+            column.dataframe(df_record, hide_index=True)
+
+        location, df_team_results = store_team_results(year, event, data_version, store_version)
+        st.subheader(f"Team Results In {location}")
+        st.dataframe(df_team_results, hide_index=True)
+
 
 
 
@@ -358,73 +700,62 @@ with tab5:
 
 # Circuits
 with tab6:
-    page = st.selectbox("Select Graphics:", ["Gear Shifts Information"])
-    st.subheader("Gear Shifts Per Lap", help="Detailed information about how each plot works can be found in the guide tab.")
+    page = st.selectbox("Select Graphics:", ["Circuit Map", "Gear Shifts Information", "Fastest Team Per Minisector", "Fastest Laps Across Years"])
+    fsda.set_page(f"Circuits: {page}")
+
+    df_schedule = fsda.read_table(f"{dir}/{year}", "schedule", columns=["EventName", "Location", "DirName"])
+    dir_name, location = df_schedule[df_schedule["EventName"] == event][["DirName", "Location"]].iloc[0]
+    session_dir = f"{dir}/{year}/{dir_name}/{session}"
 
-    df_schedule = pd.read_parquet(f"{dir}/{year}/schedule.parquet", columns=["EventName", "EventDate", "DirName"])
-    dir_name = df_schedule[df_schedule["EventName"] == event]["DirName"].iloc[0]
+    # Every track map is drawn in the orientation of the circuit's longest axis
+    df_outline, df_markers, rotation_angle = circuit_model(year, event, data_version)
+
+    if page == "Circuit Map":
+        st.subheader("Circuit Map", help="Outline, corners and distance markers of the circuit, stored once per layout of the venue.")
+
+        if df_outline.empty:
+            st.text("No telemetry available for this circuit yet.")
+        else:
+            fig = fsp.plot_circuit_map(df_outline, df_markers, year, event, True, rotation_angle)
+            show_figure(fig, "Download Circuit Map", f"circuit_map_{year}_{event.replace(' ', '_').lower()}.png")
 
     
     if page == "Gear Shifts Information":
+        st.subheader("Gear Shifts Per Lap", help="Detailed information about how each plot works can be found in the guide tab.")
         comparison = st.radio("Comparison", ["No", "Yes"])
         col1, col2 = st.columns(2)
         if comparison == "No":
             with col1:
 
-                df_results = pd.read_parquet(
-                    f"{dir}/{year}/{dir_name}/{session}/results.parquet",
-                    columns=["Abbreviation", "TeamColorFastf1", "TeamName"]
-                )
+                df_results = fsda.read_table(session_dir, "results", columns=["Abbreviation", "TeamColorFastf1", "TeamName"])
 
                 driver = st.selectbox("Pick Driver:", list(df_results["Abbreviation"]))
             
             with col2:
 
-                df_laps = pd.read_parquet(
-                    f"{dir}/{year}/{dir_name}/{session}/laps.parquet",
-                    columns=["LapNumber", "LapTime", "Team", "Driver"]
-                )
+                df_laps = fsda.read_table(session_dir, "laps", columns=["LapNumber", "LapTime", "Team", "Driver"])
 
                 lap = st.selectbox("Pick Lap:", list(range(1, int(df_laps["LapNumber"].max()+1))))
 
             
-            df_telemetry = pd.read_parquet(
-                f"{dir}/{year}/{dir_name}/{session}/telemetry_data.parquet",
+            df_telemetry = fsda.read_table(
+                session_dir, "telemetry",
+                columns=fsp.TRACK_MAP_COLUMNS,
                 filters=[('driver', '=', driver), ('lap', '=', lap)])
 
         
-            fig = fsp.plot_gear_shifts_on_circuit(df_telemetry, df_laps, year, event, session, lap, driver, True, 122.3)
-            st.pyplot(fig)
-
-            img_buffer = io.BytesIO()
-            fig.savefig(img_buffer, format="png", bbox_inches="tight", pad_inches=0.1, dpi=300)
-            img_buffer.seek(0)
-
-            st.download_button(
-                label="Download Gear Shifts Per Lap",
-                data=img_buffer,
-                file_name=f"gear_shitfs_per_lap_{year}_{event.replace(' ', '_').lower()}_{session}_{driver}_{lap}.png",
-                mime="image/png"
-            )
-
-            fig = fsp.plot_speed_over_lap(df_telemetry, df_laps, year, event, session, lap, driver, True, 122.3)
-            st.pyplot(fig)
-
-            st.download_button(
-                label="Download Speed Over Lap",
-                data=img_buffer,
-                file_name=f"speed_over_lap{year}_{event.replace(' ', '_').lower()}_{session}_{driver}_{lap}.png",
-                mime="image/png"
-            )
+            show_figures([
+                (st.empty(), partial(fsp.plot_gear_shifts_on_circuit, df_telemetry, df_laps, year, event, session, lap, driver, True, rotation_angle, df_markers),
+                 "Download Gear Shifts Per Lap", f"gear_shitfs_per_lap_{year}_{event.replace(' ', '_').lower()}_{session}_{driver}_{lap}.png"),
+                (st.empty(), partial(fsp.plot_speed_over_lap, df_telemetry, df_laps, year, event, session, lap, driver, True, rotation_angle, df_markers),
+                 "Download Speed Over Lap", f"speed_over_lap{year}_{event.replace(' ', '_').lower()}_{session}_{driver}_{lap}.png"),
+            ])
         
         else:
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                df_results = pd.read_parquet(
-                    f"{dir}/{year}/{dir_name}/{session}/results.parquet",
-                    columns=["Abbreviation", "TeamColorFastf1", "TeamName"]
-                )
+                df_results = fsda.read_table(session_dir, "results", columns=["Abbreviation", "TeamColorFastf1", "TeamName"])
 
                 driver_1 = st.selectbox("Driver 1:", list(df_results["Abbreviation"]))
             
@@ -433,10 +764,7 @@ with tab6:
                 
             
             with col3:
-                df_laps = pd.read_parquet(
-                    f"{dir}/{year}/{dir_name}/{session}/laps.parquet",
-                    columns=["LapNumber", "LapTime", "Team", "Driver"]
-                )
+                df_laps = fsda.read_table(session_dir, "laps", columns=["LapNumber", "LapTime", "Team", "Driver"])
 
                 lap_1 = st.selectbox("Lap Driver 1:", list(range(1, int(df_laps["LapNumber"].max()+1))))
             
@@ -444,25 +772,71 @@ with tab6:
 
                 lap_2 = st.selectbox("Lap Driver 2:", list(range(1, int(df_laps["LapNumber"].max()+1))))
             
-            df_telemetry = pd.read_parquet(
-                f"{dir}/{year}/{dir_name}/{session}/telemetry_data.parquet",
+            df_telemetry = fsda.read_table(
+                session_dir, "telemetry",
+                columns=fsp.TRACK_MAP_COLUMNS,
                 filters=[('driver', 'in', [driver_1, driver_2]), ('lap', 'in', [lap_1, lap_2])])
             
             col1, col2 = st.columns(2)
-            
-            with col1:
-                fig = fsp.plot_gear_shifts_on_circuit(df_telemetry, df_laps, year, event, session, lap_1, driver_1, True, 122.3)
-                st.pyplot(fig)
 
-                fig = fsp.plot_speed_over_lap(df_telemetry, df_laps, year, event, session, lap_1, driver_1, True, 122.3)
-                st.pyplot(fig)
+            # The four figures are independent, they render together
+            comparison_figures = []
+            for column, lap_n, driver_n in [(col1, lap_1, driver_1), (col2, lap_2, driver_2)]:
+                with column:
+                    comparison_figures.append((st.empty(), partial(fsp.plot_gear_shifts_on_circuit, df_telemetry, df_laps, year, event, session, lap_n, driver_n, True, rotation_angle, df_markers), None, None))
+                    comparison_figures.append((st.empty(), partial(fsp.plot_speed_over_lap, df_telemetry, df_laps, year, event, session, lap_n, driver_n, True, rotation_angle, df_markers), None, None))
 
-            with col2:
-                fig = fsp.plot_gear_shifts_on_circuit(df_telemetry, df_laps, year, event, session, lap_2, driver_2, True, 122.3)
-                st.pyplot(fig)
+            show_figures(comparison_figures, download=False)
+
+    elif page == "Fastest Team Per Minisector":
+        st.subheader("Fastest Team Per Minisector", help="The lap is split into equal length minisectors on the fastest lap of the session, each is coloured by the team that went through it quickest on any lap.")
+
+        if not os.path.exists(f"{session_dir}/telemetry_data.parquet"):
+            st.text("No telemetry available for this session.")
+        else:
+            n_minisectors = st.slider("Minisectors:", 10, 50, fsms.N_MINISECTORS, step=5)
+
+            # Stored at ingest for the default count, other counts are built in memory
+            df_minisectors, df_reference = session_minisectors(session_dir, n_minisectors, data_version)
+            df_fastest = fsms.fastest_per_minisector(df_minisectors)
+
+            fig = fsp.plot_fastest_team_per_minisector(df_reference, df_fastest, teams_colors, year, event, session, True, rotation_angle)
+            show_figure(fig, "Download Fastest Team Per Minisector", f"fastest_team_per_minisector_{year}_{event.replace(' ', '_').lower()}_{session}_{n_minisectors}.png")
 
-                fig = fsp.plot_speed_over_lap(df_telemetry, df_laps, year, event, session, lap_2, driver_2, True, 122.3)
-                st.pyplot(fig)
+            st.dataframe(
+                df_fastest.assign(MinisectorTime=df_fastest["MinisectorTime"].round(3)),
+                hide_index=True)
+
+    elif page == "Fastest Laps Across Years":
+        st.subheader("Fastest Laps Across Years", help="Fastest lap of the session at this circuit in every season since 2018, read from the small fastest lap files written at ingest instead of the full telemetry.")
+
+        df_events = fscr.circuit_events(dir, location)
+        sessions = [name for name in fscr.SESSION_PREFERENCE if any(os.path.isdir(f"{dir}/{y}/{d}/{name}") for y, d in zip(df_events["Year"], df_events["DirName"]))]
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            session_across = st.selectbox("Session:", sessions, format_func=lambda name: name.replace("_", " ").title())
+        with col2:
+            years = st.multiselect("Seasons:", list(df_events["Year"]), default=list(df_events["Year"]))
+        with col3:
+            view = st.radio("View:", ["Speed Traces", "Track Map"], horizontal=True)
+
+        df_fastest_laps = fastest_laps_across_years(location, session_across, years, data_version)
+
+        if df_fastest_laps.empty:
+            st.text("No telemetry available for this circuit and session.")
+        else:
+            if view == "Speed Traces":
+                fig = fsp.plot_speed_traces_across_years(df_fastest_laps, event, session_across, True, df_markers)
+            else:
+                fig = fsp.plot_fastest_year_on_track(df_fastest_laps, event, session_across, True, rotation_angle, df_markers)
+            show_figure(fig, f"Download {view}", f"fastest_laps_across_years_{view.replace(' ', '_').lower()}_{location.replace(' ', '_').lower()}_{session_across}.png")
+
+            # Every driver's best lap of every season, quickest of each season first
+            df_summary = df_fastest_laps.groupby(["Year", "driver"], as_index=False).agg(Team=("Team", "first"), LapTime=("LapTime", "first"), TopSpeed=("Speed", "max")).round({"TopSpeed": 1})
+            df_summary = df_summary.sort_values(["Year", "LapTime"], ascending=[False, True])
+            df_summary["LapTime"] = df_summary["LapTime"].map(fsp.format_lap_time)
+            st.dataframe(df_summary.rename(columns={"driver": "Driver", "TopSpeed": "Top Speed (km/h)"}), hide_index=True)
 
 
 
@@ -0,0 +1,393 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Column kinds a declared schema can use, an integer column stored as float (FastF1 does that for
+# anything that can be missing) is still a number
+NUMBER, STRING, BOOL, TIMEDELTA, DATETIME = "number", "string", "bool", "timedelta", "datetime"
+
+# Tables of the data tree, their file in its directory ({dir}, {dir}/{year} or the session directory)
+# and the columns the app reads from them. Columns None: written by this project and read whole.
+TABLES = {
+    "schedule": {
+        "file": "schedule.parquet",
+        "columns": {
+            "RoundNumber": NUMBER, "Country": STRING, "Location": STRING, "OfficialEventName": STRING,
+            "EventDate": DATETIME, "EventName": STRING, "EventFormat": STRING,
+            "Session1": STRING, "Session2": STRING, "Session3": STRING, "Session4": STRING, "Session5": STRING,
+            "DirName": STRING,
+        },
+    },
+    "laps": {
+        "file": "laps.parquet",
+        "columns": {
+            "Time": TIMEDELTA, "Driver": STRING, "DriverNumber": STRING, "LapTime": TIMEDELTA, "LapNumber": NUMBER,
+            "Stint": NUMBER, "PitOutTime": TIMEDELTA, "PitInTime": TIMEDELTA, "Compound": STRING, "CompoundColor": STRING,
+            "TyreLife": NUMBER, "FreshTyre": BOOL, "Team": STRING, "LapStartTime": TIMEDELTA, "LapStartDate": DATETIME,
+            "TrackStatus": STRING, "Position": NUMBER, "Deleted": BOOL, "IsAccurate": BOOL, "LapStatus": STRING,
+            "AirTemp": NUMBER, "TrackTemp": NUMBER, "Humidity": NUMBER, "Pressure": NUMBER, "Rainfall": BOOL,
+            "WindDirection": NUMBER, "WindSpeed": NUMBER,
+        },
+    },
+    "results": {
+        "file": "results.parquet",
+        "columns": {
+            "DriverNumber": STRING, "Abbreviation": STRING, "FullName": STRING, "TeamName": STRING,
+            "TeamColorFastf1": STRING, "TeamColorOfficial": STRING, "Position": NUMBER, "GridPosition": NUMBER,
+            "Status": STRING, "Points": NUMBER,
+        },
+    },
+    "telemetry": {
+        "file": "telemetry_data.parquet",
+        "columns": {
+            "Date": DATETIME, "SessionTime": TIMEDELTA, "Time": TIMEDELTA, "RPM": NUMBER, "Speed": NUMBER,
+            "nGear": NUMBER, "Throttle": NUMBER, "Brake": BOOL, "DRS": NUMBER, "Distance": NUMBER,
+            "X": NUMBER, "Y": NUMBER, "Z": NUMBER, "driver": STRING, "lap": NUMBER, "Team": STRING,
+        },
+    },
+    "weather": {
+        "file": "weather.parquet",
+        "columns": {
+            "Time": TIMEDELTA, "AirTemp": NUMBER, "Humidity": NUMBER, "Pressure": NUMBER, "Rainfall": BOOL,
+            "TrackTemp": NUMBER, "WindDirection": NUMBER, "WindSpeed": NUMBER,
+        },
+    },
+    "race_control_messages": {
+        "file": "race_control_messages.parquet",
+        "columns": {"Time": DATETIME, "Category": STRING, "Message": STRING, "Status": STRING, "Flag": STRING, "Scope": STRING, "Lap": NUMBER},
+    },
+    "session_status": {"file": "session_status.parquet", "columns": {"Time": TIMEDELTA, "Status": STRING}},
+    "track_status": {"file": "track_status.parquet", "columns": {"Time": TIMEDELTA, "Status": STRING, "Message": STRING}},
+    "fastest_laps": {"file": "fastest_laps.parquet", "columns": None},
+    "drivers_wiki": {"file": "{category}_drivers_wiki_{date}.parquet", "columns": None},
+}
+
+# Reads kept for the reads report, the oldest are dropped first
+MAX_READS = 10000
+
+_reads = deque(maxlen=MAX_READS)
+_reads_lock = threading.Lock()
+
+# Page the reads of the running thread are booked to, every Streamlit session runs in its own thread
+_state = threading.local()
+
+
+
+def set_page(page: str) -> None:
+    # Reads from now on in this thread are booked to page
+    _state.page = page
+
+
+
+def current_page() -> str:
+    return getattr(_state, "page", None)
+
+
+
+def table_path(directory: str, table: str, **names) -> str:
+    # File of a named table, names fill in templated file names (drivers_wiki: category, date)
+    return f"{directory}/{TABLES[table]['file'].format(**names)}"
+
+
+
+@lru_cache(maxsize=512)
+def _metadata(path: str, mtime_ns: int) -> pq.FileMetaData:
+    # Footers are cached per file version
+    return pq.read_metadata(path)
+
+
+
+def _may_match(statistics, op: str, value) -> bool:
+    # Whether a row group with these column statistics can hold a row passing the predicate
+    if statistics is None or not statistics.has_min_max:
+        return True
+
+    low, high = statistics.min, statistics.max
+    try:
+        if op in ["=", "=="]:
+            return low <= value <= high
+        if op == "in":
+            return any(low <= item <= high for item in value)
+        if op == "<":
+            return low < value
+        if op == "<=":
+            return low <= value
+        if op == ">":
+            return high > value
+        if op == ">=":
+            return high >= value
+    except TypeError:
+        pass
+
+    return True
+
+
+
+def _conjunctions(filters: list) -> list:
+    # Filters in pyarrow's disjunctive form, a list of predicates or a list of lists of them
+    if not filters:
+        return []
+    return filters if isinstance(filters[0], list) else [filters]
+
+
+
+def _row_groups(metadata: pq.FileMetaData, filters: list) -> list:
+    # Row groups a filtered read can't skip on their min/max statistics
+    conjunctions = _conjunctions(filters)
+    if not conjunctions:
+        return list(range(metadata.num_row_groups))
+
+    position = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+
+    kept = []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        if any(all(column not in position or _may_match(row_group.column(position[column]).statistics, op, value)
+                   for column, op, value in conjunction)
+               for conjunction in conjunctions):
+            kept.append(i)
+
+    return kept
+
+
+
+def _bytes(metadata: pq.FileMetaData, row_groups: list, columns: set = None) -> int:
+    # Compressed size of the column chunks read, every column when columns is None
+    total = 0
+    for i in row_groups:
+        row_group = metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            chunk = row_group.column(j)
+            if columns is None or chunk.path_in_schema.split(".")[0] in columns:
+                total += chunk.total_compressed_size
+    return total
+
+
+
+def read_parquet(path: str, columns: list = None, filters: list = None, table: str = None) -> pd.DataFrame:
+    """
+    pd.read_parquet that books the bytes, row groups and time of the read to the current page.
+
+    Arguments:
+    - path (str): parquet file
+    - columns (list): columns to read, all when None
+    - filters (list): row filters in pyarrow's form, row groups they rule out are not read
+    - table (str): name the read is reported under, the file name when None
+
+    Return:
+    - the rows and columns read (pd.DataFrame)
+    """
+
+    start = time.perf_counter()
+    df = pd.read_parquet(path, columns=columns, filters=filters or None)
+    seconds = time.perf_counter() - start
+
+    metadata = _metadata(path, os.stat(path).st_mtime_ns)
+    row_groups = _row_groups(metadata, filters)
+    # Filter columns are read as well to evaluate the predicates
+    read_columns = None if columns is None else set(columns) | {column for conjunction in _conjunctions(filters) for column, _, _ in conjunction}
+
+    with _reads_lock:
+        _reads.append({
+            "page": current_page(),
+            "table": table or os.path.basename(path),
+            "path": path,
+            "columns": metadata.num_columns if columns is None else len(columns),
+            "file_columns": metadata.num_columns,
+            "projected": columns is not None,
+            "filtered": bool(filters),
+            "rows": len(df),
+            "row_groups": len(row_groups),
+            "file_row_groups": metadata.num_row_groups,
+            "bytes": _bytes(metadata, row_groups, read_columns),
+            "file_bytes": _bytes(metadata, range(metadata.num_row_groups)),
+            "seconds": seconds,
+        })
+
+    return df
+
+
+
+def read_table(
+        directory: str,
+        table: str,
+        columns: list = None,
+        filters: list = None,
+        optional: list = None,
+        **names) -> pd.DataFrame:
+    """
+    Reads a named table of the data tree, only the declared columns a caller asks for.
+
+    Arguments:
+    - directory (str): directory holding the table, {dir}/{year} for the schedule, {dir} for the
+      drivers lists and the session directory for everything else
+    - table (str): key of TABLES
+    - columns (list): columns to read, they must be declared for the table; all when None
+    - filters (list): row filters in pyarrow's form
+    - optional (list): declared columns read only when the file has them
+    - names: fill in templated file names
+
+    Return:
+    - the rows and columns read (pd.DataFrame)
+    """
+
+    declared = TABLES[table]["columns"]
+    path = table_path(directory, table, **names)
+
+    requested = list(columns or []) + list(optional or [])
+    if declared is not None:
+        undeclared = [column for column in requested if column not in declared]
+        if undeclared:
+            raise KeyError(f"{table} has no declared columns {undeclared}, add them to data_access.TABLES")
+
+    if optional:
+        available = pq.read_schema(path).names
+        columns = list(columns or []) + [column for column in optional if column in available and column not in (columns or [])]
+
+    return read_parquet(path, columns, filters, table)
+
+
+
+@contextmanager
+def replacing(path: str):
+    """
+    Temporary path next to a file, swapped in for the file once the block has written it. Every
+    writer gets its own temporary name, so two processes building the same file never write into
+    each other's and readers never see a partial file.
+
+    Arguments:
+    - path (str): file to write
+
+    Return:
+    - temporary path to write to (str)
+    """
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+
+def find_session_dir(dir: str, year: int, event: str, session: str) -> str:
+    # Session directory of an event, looked up by EventName in the season's schedule
+    df_schedule = read_table(f"{dir}/{year}", "schedule", columns=["EventName", "DirName"])
+    dir_name = df_schedule[df_schedule["EventName"] == event]["DirName"].iloc[0]
+    return f"{dir}/{year}/{dir_name}/{session}"
+
+
+
+def _kind_matches(arrow_type: pa.DataType, kind: str) -> bool:
+    if pa.types.is_null(arrow_type):
+        return True
+    if kind == NUMBER:
+        return pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)
+    if kind == STRING:
+        return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type) or pa.types.is_dictionary(arrow_type)
+    if kind == BOOL:
+        return pa.types.is_boolean(arrow_type)
+    if kind == TIMEDELTA:
+        return pa.types.is_duration(arrow_type)
+    if kind == DATETIME:
+        return pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type)
+    return False
+
+
+
+def check_schema(path: str, table: str) -> list:
+    """
+    Compares a file with the declared schema of its table. Declared columns a file doesn't have
+    are fine, FastF1 leaves some out for older seasons.
+
+    Return:
+    - failure messages, empty when every declared column present has its declared kind (list)
+    """
+
+    declared = TABLES[table]["columns"] or {}
+    schema = pq.read_schema(path)
+
+    return [
+        f"{path}: {column} is {schema.field(column).type}, declared {kind}"
+        for column, kind in declared.items()
+        if column in schema.names and not _kind_matches(schema.field(column).type, kind)
+    ]
+
+
+
+def reads(page: str = None) -> pd.DataFrame:
+    # Reads booked so far, of one page or all of them
+    with _reads_lock:
+        df_reads = pd.DataFrame(list(_reads), columns=[
+            "page", "table", "path", "columns", "file_columns", "projected", "filtered",
+            "rows", "row_groups", "file_row_groups", "bytes", "file_bytes", "seconds"])
+
+    return df_reads if page is None else df_reads[df_reads["page"] == page].reset_index(drop=True)
+
+
+
+def clear_reads() -> None:
+    with _reads_lock:
+        _reads.clear()
+
+
+
+def reads_report(df_reads: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reads summed per page, with the reads that pulled more than the page asked for flagged:
+    declared tables read with every column instead of the ones the page uses.
+
+    Arguments:
+    - df_reads (pd.DataFrame): output of reads
+
+    Return:
+    - page, reads, rows, row groups, MB read, MB of the files read, seconds and flags, most
+      MB read first (pd.DataFrame)
+    """
+
+    df_reads = df_reads.assign(page=df_reads["page"].fillna("-"))
+    declared = [table for table, spec in TABLES.items() if spec["columns"] is not None]
+    unprojected = df_reads[~df_reads["projected"] & df_reads["table"].isin(declared)]
+
+    flags = unprojected.groupby("page")["table"].agg(lambda tables: [f"{table}: every column read" for table in sorted(set(tables))])
+
+    df_report = df_reads.groupby("page").agg(
+        reads=("table", "size"),
+        rows=("rows", "sum"),
+        row_groups=("row_groups", "sum"),
+        mb=("bytes", "sum"),
+        file_mb=("file_bytes", "sum"),
+        seconds=("seconds", "sum"))
+    df_report[["mb", "file_mb"]] = df_report[["mb", "file_mb"]] / 1024 ** 2
+    df_report["flags"] = flags.reindex(df_report.index).apply(lambda found: found if isinstance(found, list) else [])
+
+    return df_report.sort_values("mb", ascending=False).reset_index()
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+
+    session_dir = sys.argv[1] if len(sys.argv) > 1 else "/tmp/f1_data/2025/2025-03-23_chinese_grand_prix/race"
+
+    set_page("debug")
+    read_table(session_dir, "laps", columns=["Driver", "LapNumber", "LapTime"])
+    read_table(session_dir, "telemetry", columns=["Speed"], filters=[("driver", "=", "VER"), ("lap", "=", 10)])
+    read_table(session_dir, "weather")
+
+    print(reads().drop(columns=["path"]))
+    print(reads_report(reads()))
+    for table in ["laps", "results", "telemetry", "weather"]:
+        print(table, check_schema(table_path(session_dir, table), table))
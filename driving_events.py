@@ -0,0 +1,240 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import data_access
+import ingest
+
+
+FEATURES_FILE = "driving_features.parquet"
+
+TELEMETRY_COLUMNS = ["Distance", "Speed", "Throttle", "Brake", "nGear", "driver", "lap", "Team"]
+
+# Throttle (%) counted as flat out
+FULL_THROTTLE = 98
+
+# Braking shorter than this (m) is a dab of the pedal, not a braking zone
+MIN_BRAKING_DISTANCE = 10
+
+# Metres either side of a corner's apex the minimum speed is looked for in
+CORNER_WINDOW = 100
+
+# Laps covering less distance than this share of the session's median lap are in/out laps or cut short
+MIN_LAP_COVERAGE = 0.95
+
+
+
+def _lap_axis(telemetry: pd.DataFrame) -> tuple:
+    # Samples sorted by lap and distance, with the lap code of every sample and the start of every lap
+    telemetry = telemetry.dropna(subset=["Distance"])
+
+    codes, laps = pd.factorize(pd.MultiIndex.from_frame(telemetry[["driver", "lap"]]), sort=True)
+    distance = telemetry["Distance"].to_numpy(dtype=float)
+    order = np.lexsort((distance, codes))
+
+    codes = codes[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(codes)) + 1]
+    first = np.zeros(len(codes), dtype=bool)
+    first[starts] = True
+
+    return telemetry.iloc[order], codes, laps, starts, first
+
+
+
+def braking_zones(telemetry: pd.DataFrame) -> pd.DataFrame:
+    """
+    Every stretch of a lap with the brake pressed, found for all laps of a session at once.
+
+    Arguments:
+    - telemetry (pd.DataFrame): telemetry of a session, see TELEMETRY_COLUMNS
+
+    Return:
+    - Driver, LapNumber, Start, End (distance in m), Length, EntrySpeed and MinSpeed of every
+      zone at least MIN_BRAKING_DISTANCE long (pd.DataFrame)
+    """
+
+    telemetry, codes, laps, _, first = _lap_axis(telemetry)
+    brake = telemetry["Brake"].fillna(False).to_numpy(dtype=bool)
+    distance = telemetry["Distance"].to_numpy(dtype=float)
+    speed = telemetry["Speed"].to_numpy(dtype=float)
+
+    # A zone starts where the brake goes on or a lap starts braking, and every braking sample
+    # carries the number of its zone
+    starts = brake & (first | ~np.r_[False, brake[:-1]])
+    zone = np.cumsum(starts) - 1
+
+    df_zones = pd.DataFrame({"zone": zone[brake], "code": codes[brake], "Distance": distance[brake], "Speed": speed[brake]})
+    df_zones = df_zones.groupby("zone").agg(
+        code=("code", "first"),
+        Start=("Distance", "first"),
+        End=("Distance", "last"),
+        EntrySpeed=("Speed", "first"),
+        MinSpeed=("Speed", "min"))
+    df_zones["Length"] = df_zones["End"] - df_zones["Start"]
+    df_zones = df_zones[df_zones["Length"] >= MIN_BRAKING_DISTANCE]
+
+    lap_keys = laps[df_zones["code"].to_numpy()]
+    df_zones.insert(0, "Driver", lap_keys.get_level_values(0))
+    df_zones.insert(1, "LapNumber", lap_keys.get_level_values(1))
+
+    return df_zones[["Driver", "LapNumber", "Start", "End", "Length", "EntrySpeed", "MinSpeed"]].reset_index(drop=True)
+
+
+
+def lap_features(telemetry: pd.DataFrame, corners: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Driving features of every driver and lap of a session from grouped array passes over the whole
+    session, no per lap loop.
+
+    Arguments:
+    - telemetry (pd.DataFrame): telemetry of a session, see TELEMETRY_COLUMNS
+    - corners (pd.DataFrame): Number and Distance of the circuit's corners (circuits markers of
+      Kind "Corner"), adds the minimum speed through each of them
+
+    Return:
+    - one row per driver and lap with Team, LapDistance, Complete, TopSpeed, FullThrottle (% of the
+      distance), BrakingZones, BrakingDistance, GearShifts, Upshifts, Downshifts and, with corners,
+      MinCornerSpeed, MeanCornerSpeed and MinSpeedT<n> for every corner (pd.DataFrame)
+    """
+
+    telemetry, codes, laps, starts, first = _lap_axis(telemetry)
+    n_laps = len(laps)
+
+    distance = telemetry["Distance"].to_numpy(dtype=float)
+    speed = telemetry["Speed"].to_numpy(dtype=float)
+    throttle = telemetry["Throttle"].to_numpy(dtype=float)
+    brake = telemetry["Brake"].fillna(False).to_numpy(dtype=bool)
+    gear = telemetry["nGear"].to_numpy(dtype=float)
+
+    # Distance covered by every sample, nothing across the boundary between two laps
+    step = np.where(first, 0, np.diff(distance, prepend=distance[0]))
+
+    lap_distance = np.bincount(codes, weights=step, minlength=n_laps)
+    covered = np.where(lap_distance > 0, lap_distance, np.nan)
+
+    shift = np.where(first, 0, np.diff(gear, prepend=gear[0]))
+    zones = braking_zones(telemetry)
+    zone_codes = laps.get_indexer(pd.MultiIndex.from_frame(zones[["Driver", "LapNumber"]]))
+
+    df_features = pd.DataFrame({
+        "Driver": laps.get_level_values(0),
+        "LapNumber": laps.get_level_values(1),
+        "LapDistance": lap_distance,
+        "TopSpeed": np.maximum.reduceat(speed, starts),
+        "FullThrottle": np.bincount(codes, weights=step * (throttle >= FULL_THROTTLE), minlength=n_laps) / covered * 100,
+        "BrakingZones": np.bincount(zone_codes, minlength=n_laps),
+        "BrakingDistance": np.bincount(zone_codes, weights=zones["Length"].to_numpy(), minlength=n_laps),
+        "GearShifts": np.bincount(codes, weights=shift != 0, minlength=n_laps).astype(int),
+        "Upshifts": np.bincount(codes, weights=shift > 0, minlength=n_laps).astype(int),
+        "Downshifts": np.bincount(codes, weights=shift < 0, minlength=n_laps).astype(int),
+    })
+
+    if "Team" in telemetry.columns:
+        df_features.insert(2, "Team", telemetry["Team"].to_numpy()[starts])
+
+    df_features.insert(4, "Complete", lap_distance >= MIN_LAP_COVERAGE * np.median(lap_distance))
+
+    if corners is not None and len(corners):
+        # Nearest corner of every sample from a search in the sorted apexes, minima of the samples
+        # within the window gathered into a laps x corners array in one pass
+        apex = corners["Distance"].to_numpy(dtype=float)
+        order = np.argsort(apex)
+        right = np.clip(np.searchsorted(apex[order], distance), 0, len(apex) - 1)
+        left = np.clip(right - 1, 0, len(apex) - 1)
+        nearest = order[np.where(np.abs(distance - apex[order][left]) <= np.abs(distance - apex[order][right]), left, right)]
+        near = np.abs(distance - apex[nearest]) <= CORNER_WINDOW
+
+        minimum = np.full((n_laps, len(apex)), np.inf)
+        np.minimum.at(minimum, (codes[near], nearest[near]), speed[near])
+        corner_speeds = pd.DataFrame(np.where(np.isinf(minimum), np.nan, minimum), columns=[f"MinSpeedT{number}" for number in corners["Number"]])
+
+        df_features = pd.concat([df_features, corner_speeds], axis=1)
+        df_features["MinCornerSpeed"] = corner_speeds.min(axis=1)
+        df_features["MeanCornerSpeed"] = corner_speeds.mean(axis=1)
+
+    return df_features
+
+
+
+def _corners_key(corners: pd.DataFrame) -> str:
+    # Corners the minimum speeds were measured at, stored with the table
+    if corners is None or not len(corners):
+        return "[]"
+    return json.dumps([[int(number), round(float(distance), 1)] for number, distance in zip(corners["Number"], corners["Distance"])])
+
+
+
+def load_driving_features(session_dir: str, corners: pd.DataFrame = None, persist: bool = True) -> pd.DataFrame:
+    """
+    Returns the per lap driving features of a session, building and persisting them when
+    telemetry_data.parquet is newer than the table or the corners changed.
+
+    Arguments:
+    - session_dir (str): directory holding telemetry_data.parquet
+    - corners (pd.DataFrame): circuit markers, only rows of Kind "Corner" are used
+    - persist (bool): store the built table, False builds it in memory only (the dashboard)
+
+    Return:
+    - output of lap_features (pd.DataFrame)
+    """
+
+    if corners is not None and "Kind" in corners.columns:
+        corners = corners[corners["Kind"] == "Corner"]
+
+    telemetry_path = f"{session_dir}/telemetry_data.parquet"
+    file_path = f"{session_dir}/{FEATURES_FILE}"
+    key = _corners_key(corners)
+
+    if os.path.exists(file_path) and os.stat(file_path).st_mtime_ns >= os.stat(telemetry_path).st_mtime_ns:
+        metadata = pq.read_schema(file_path).metadata or {}
+        if metadata.get(b"corners", b"").decode() == key:
+            return data_access.read_parquet(file_path)
+
+    df_features = lap_features(data_access.read_table(session_dir, "telemetry", optional=TELEMETRY_COLUMNS), corners)
+    if not persist:
+        return df_features
+
+    table = pa.Table.from_pandas(df_features, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, b"corners": key.encode()})
+    with data_access.replacing(file_path) as tmp_path:
+        pq.write_table(table, tmp_path)
+
+    return df_features
+
+
+
+def fastest_lap_features(features: pd.DataFrame, laps: pd.DataFrame) -> pd.DataFrame:
+    # Features of every driver's fastest valid lap, with its lap time
+    fastest = ingest.fastest_valid_laps(laps)[["Driver", "LapNumber", "LapTime"]]
+    return features.merge(fastest, on=["Driver", "LapNumber"]).sort_values("LapTime").reset_index(drop=True)
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+    import time
+
+    session_dir = sys.argv[1] if len(sys.argv) > 1 else "/tmp/f1_data/2025/2025-03-23_chinese_grand_prix/race"
+    telemetry = pd.read_parquet(f"{session_dir}/telemetry_data.parquet", columns=TELEMETRY_COLUMNS)
+
+    start = time.perf_counter()
+    df_features = lap_features(telemetry)
+    print(f"{len(df_features)} laps in {time.perf_counter() - start:.3f}s")
+
+    # Same numbers lap by lap, the slow way
+    for (driver, lap), df_lap in list(telemetry.groupby(["driver", "lap"]))[:20]:
+        df_lap = df_lap.sort_values("Distance")
+        row = df_features[(df_features["Driver"] == driver) & (df_features["LapNumber"] == lap)].iloc[0]
+        gear_changes = (df_lap["nGear"].diff().fillna(0) != 0).sum()
+        full = df_lap["Distance"].diff().fillna(0)[df_lap["Throttle"] >= FULL_THROTTLE].sum() / df_lap["Distance"].diff().fillna(0).sum() * 100
+        assert row["TopSpeed"] == df_lap["Speed"].max()
+        assert row["GearShifts"] == gear_changes, (row["GearShifts"], gear_changes)
+        assert abs(row["FullThrottle"] - full) < 1e-9
+
+    print(df_features.head())
+    print(braking_zones(telemetry).head())
@@ -0,0 +1,400 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+import circuits
+import data_access
+import driving_events
+import figures
+import lap_telemetry
+import plotting as fsp
+import season_speed
+import standings as fst
+
+
+dir = "/Users/bartosz/f1_data"
+
+FORMATS = ["png", "svg", "pdf"]
+
+MANIFEST_FILE = ".export_manifest.json"
+
+# Laps used for the gear and speed track maps when none are given
+DEFAULT_LAPS = ["fastest"]
+
+
+
+def _session_dir(dir, year, dir_name, session):
+    return f"{dir}/{year}/{dir_name}/{session}"
+
+
+def _read_laps(session_dir, columns):
+    df_laps = data_access.read_table(session_dir, "laps", columns=columns)
+    df_laps["Lap Time (s)"] = df_laps["LapTime"].dt.total_seconds()
+    if "Compound" in df_laps.columns:
+        df_laps["Compound"] = df_laps["Compound"].replace("nan", "No Data")
+    return df_laps
+
+
+def _read_results(session_dir):
+    return data_access.read_table(session_dir, "results", columns=["Abbreviation", "TeamColorFastf1", "TeamName"])
+
+
+
+def _init_worker():
+    # Workers only write files, never open windows
+    matplotlib.use("Agg")
+
+
+
+def render_job(job: dict) -> dict:
+    """
+    Renders one figure and saves it in every requested format. Runs inside a worker process.
+
+    Arguments:
+    - job (dict): description of the figure built by build_jobs
+
+    Return:
+    - job outcome with the number of files written or the error message (dict)
+    """
+
+    start = time.perf_counter()
+    dir, year, event, session = job["dir"], job["year"], job["event"], job["session"]
+    session_dir = _session_dir(dir, year, job["dir_name"], session) if session else None
+    plot, params = job["plot"], job["params"]
+
+    try:
+        if plot == "standings_progression":
+            df_standings = fst.update_standings(dir, year)
+            last = df_standings.sort_values(["RoundNumber", "SessionOrder"]).iloc[-1]
+            teams_colors = fsp.get_teams_colors(dir, year, last["EventName"], last["Session"])
+            if params["championship"] == "Constructors":
+                df_standings = fst.get_constructors_standings(df_standings)
+            fig = fsp.plot_standings_progression(df_standings, year, teams_colors, params["championship"])
+
+        elif plot == "season_speed_trend":
+            df_season_speeds = season_speed.load_season_speeds(dir, year, params["session"])
+            last_event = df_season_speeds.sort_values("RoundNumber")["EventName"].iloc[-1]
+            teams_colors = fsp.get_teams_colors(dir, year, last_event, params["session"])
+            fig = fsp.plot_season_speed_trend(df_season_speeds, year, params["session"], teams_colors)
+
+        elif plot == "weather_data":
+            df_weather = data_access.read_table(session_dir, "weather", columns=list(data_access.TABLES["weather"]["columns"]))
+            fig = fsp.plot_weather_data(df_weather, year, event, session)
+
+        else:
+            teams_colors = fsp.get_teams_colors(dir, year, event, session)
+
+            if plot == "team_lap_time_dist":
+                df_laps = _read_laps(session_dir, ["LapTime", "Team"])
+                fig = fsp.plot_team_lap_time_dist(df_laps, year, event, session, teams_colors)
+
+            elif plot == "violin_point_scorers":
+                df_laps = _read_laps(session_dir, ["LapTime", "Team", "Driver", "Compound", "CompoundColor"])
+                fig = fsp.plot_violin_dist_point_socrers(df_laps, _read_results(session_dir), year, event, session, teams_colors)
+
+            elif plot == "drivers_lap_time_dist":
+                df_laps = _read_laps(session_dir, ["LapTime", "Team", "Driver"])
+                fig = fsp.plot_drivers_lap_time_dist(df_laps, _read_results(session_dir), year, event, session, teams_colors)
+
+            elif plot == "team_pace_comparison":
+                df_laps = _read_laps(session_dir, ["LapNumber", "LapTime", "Team"])
+                fig = fsp.plot_team_pace_comparison(df_laps, _read_results(session_dir), year, event, session, teams_colors, params["lap"])
+
+            elif plot in ["gear_shifts_on_circuit", "speed_over_lap"]:
+                df_laps = _read_laps(session_dir, ["LapNumber", "LapTime", "Team", "Driver"])
+                df_telemetry = data_access.read_table(
+                    session_dir, "telemetry",
+                    columns=fsp.TRACK_MAP_COLUMNS,
+                    filters=[('driver', '=', params["driver"]), ('lap', '=', params["lap"])])
+                _, df_markers, rotation_angle = circuits.load_circuit(dir, year, event)
+                plot_function = fsp.plot_gear_shifts_on_circuit if plot == "gear_shifts_on_circuit" else fsp.plot_speed_over_lap
+                fig = plot_function(df_telemetry, df_laps, year, event, session, params["lap"], params["driver"], True, rotation_angle, df_markers)
+
+            elif plot == "setup_performance":
+                df_laps = data_access.read_table(session_dir, "laps", optional=["Driver", "LapNumber", "LapTime", "Team", "IsAccurate", "Deleted"])
+                _, df_markers, _ = circuits.load_circuit(dir, year, event)
+                df_features = driving_events.load_driving_features(session_dir, df_markers)
+                fig = fsp.plot_setup_performance(driving_events.fastest_lap_features(df_features, df_laps), teams_colors, year, event, session)
+
+            elif plot == "mean_vs_max_speed":
+                df_speeds = season_speed.load_speed_summary(session_dir)
+                fig = fsp.plot_mean_vs_max_speed(df_speeds, year, event, session, teams_colors, params["by"])
+
+            elif plot == "telemetry_comparison":
+                df_laps = data_access.read_table(session_dir, "laps", optional=["Driver", "LapNumber", "LapTime", "Team", "IsAccurate", "Deleted"])
+                df_chosen = lap_telemetry.chosen_laps(df_laps)
+                df_telemetry = lap_telemetry.resample_to_distance(lap_telemetry.load_lap_telemetry(session_dir, df_chosen))
+                _, df_markers, _ = circuits.load_circuit(dir, year, event)
+                fig = fsp.plot_telemetry(df_telemetry, df_chosen, year, event, session, teams_colors, corners=df_markers)
+
+            else:
+                raise ValueError(f"Unknown plot: {plot}")
+
+        os.makedirs(os.path.dirname(job["output"]), exist_ok=True)
+        for fmt in job["formats"]:
+            fig.savefig(f"{job['output']}.{fmt}", format=fmt, dpi=job["dpi"], **figures.SAVE_KWARGS)
+        figures.release(fig)
+
+        return {"output": job["output"], "files": len(job["formats"]), "seconds": time.perf_counter() - start, "error": None}
+
+    except Exception as e:
+        plt.close("all")
+        return {"output": job["output"], "files": 0, "seconds": time.perf_counter() - start, "error": f"{type(e).__name__}: {e}"}
+
+
+
+def resolve_laps(session_dir, lap_specs):
+    """
+    Turns lap specifications into (driver, lap) pairs.
+    "fastest" is the fastest lap of the session, "VER:fastest" the fastest lap of a driver,
+    "VER:12" a specific lap and "12" that lap of the driver who set the fastest time on it.
+    """
+
+    df_laps = data_access.read_table(session_dir, "laps", columns=["Driver", "LapNumber", "LapTime"])
+    df_laps = df_laps.dropna(subset=["LapTime"])
+
+    pairs = []
+    for spec in lap_specs:
+        driver, _, lap = spec.partition(":") if ":" in spec else (None, None, spec)
+
+        df_driver = df_laps[df_laps["Driver"] == driver.upper()] if driver else df_laps
+        if df_driver.empty:
+            continue
+
+        if lap == "fastest":
+            fastest = df_driver.loc[df_driver["LapTime"].idxmin()]
+            pairs.append((fastest["Driver"], int(fastest["LapNumber"])))
+        else:
+            df_lap = df_driver[df_driver["LapNumber"] == int(lap)]
+            if not df_lap.empty:
+                pairs.append((df_lap.loc[df_lap["LapTime"].idxmin(), "Driver"], int(lap)))
+
+    return list(dict.fromkeys(pairs))
+
+
+
+def _code_state():
+    # Every module of this project the exporter has loaded (plotting and the modules the jobs read
+    # and build their data with), identified by modification time
+    here = os.path.dirname(os.path.abspath(__file__))
+    return sorted(
+        (name, os.stat(module.__file__).st_mtime_ns)
+        for name, module in list(sys.modules.items())
+        if getattr(module, "__file__", None) and os.path.dirname(os.path.abspath(module.__file__)) == here
+    )
+
+
+
+def _signature(input_paths, job):
+    # Inputs are identified by size and modification time, code by the modification time of its modules
+    state = [(path, os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in input_paths if os.path.exists(path)]
+    state += _code_state()
+    key = {k: job[k] for k in ["plot", "params", "dpi"]}
+    return hashlib.sha1(json.dumps([state, key], sort_keys=True, default=str).encode()).hexdigest()
+
+
+
+def build_jobs(
+        dir: str,
+        year: int,
+        events: list = None,
+        sessions: list = None,
+        lap_specs: list = None,
+        output_dir: str = "exports",
+        formats: list = None,
+        dpi: int = 300) -> list:
+    """
+    Lists every figure to render for a season, optionally restricted to some events and sessions.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - events (list): event names or directory names, all events when None
+    - sessions (list): session names (e.g. "Race", "sprint_qualifying"), all sessions when None
+    - lap_specs (list): laps for the track maps, see resolve_laps
+    - output_dir (str): where figures are written
+    - formats (list): any of FORMATS
+    - dpi (int): resolution of raster outputs
+
+    Return:
+    - jobs, each with the input files it depends on (list)
+    """
+
+    formats = formats or ["png"]
+    lap_specs = lap_specs or DEFAULT_LAPS
+    sessions = [re.sub(r"\s+", "_", s).lower() for s in sessions] if sessions else None
+    wanted_events = [e.lower() for e in events] if events else None
+
+    df_schedule = data_access.read_table(f"{dir}/{year}", "schedule", columns=["RoundNumber", "EventName", "Location", "DirName"])
+    df_schedule = df_schedule[df_schedule["RoundNumber"] > 0]
+
+    jobs = []
+
+    def add(plot, event, dir_name, session, params, name, inputs):
+        job = {
+            "dir": dir, "year": year, "event": event, "dir_name": dir_name, "session": session,
+            "plot": plot, "params": params, "formats": formats, "dpi": dpi,
+            "output": f"{output_dir}/{year}/{dir_name}/{session}/{name}" if session else f"{output_dir}/{year}/{name}"
+        }
+        job["signature"] = _signature(inputs, job)
+        jobs.append(job)
+
+    for event, location, dir_name in df_schedule[["EventName", "Location", "DirName"]].itertuples(index=False):
+        if wanted_events and event.lower() not in wanted_events and dir_name.lower() not in wanted_events:
+            continue
+
+        event_dir = f"{dir}/{year}/{dir_name}"
+        if not os.path.isdir(event_dir):
+            continue
+
+        for session in sorted(os.listdir(event_dir)):
+            if sessions and session not in sessions:
+                continue
+
+            session_dir = _session_dir(dir, year, dir_name, session)
+            laps_path, results_path = f"{session_dir}/laps.parquet", f"{session_dir}/results.parquet"
+            if not (os.path.exists(laps_path) and os.path.exists(results_path)):
+                continue
+
+            schedule_path = f"{dir}/{year}/schedule.parquet"
+            lap_inputs = [schedule_path, laps_path, results_path]
+
+            add("team_lap_time_dist", event, dir_name, session, {}, "team_lap_time_dist", lap_inputs)
+            add("violin_point_scorers", event, dir_name, session, {}, "violin_point_scorers", lap_inputs)
+            add("drivers_lap_time_dist", event, dir_name, session, {}, "drivers_lap_time_dist", lap_inputs)
+            for lap in ["Average", "Fastest"]:
+                add("team_pace_comparison", event, dir_name, session, {"lap": lap}, f"team_pace_comparison_{lap.lower()}", lap_inputs)
+
+            if os.path.exists(f"{session_dir}/weather.parquet"):
+                add("weather_data", event, dir_name, session, {}, "weather_data", [f"{session_dir}/weather.parquet"])
+
+            telemetry_path = f"{session_dir}/telemetry_data.parquet"
+            if os.path.exists(telemetry_path):
+                # Built here once, not by several workers at the same time
+                circuits.update_circuit(dir, year, dir_name, location)
+                circuit_path = f"{circuits.layout_dir(dir, year, dir_name, location)}/{circuits.OUTLINE_FILE}"
+
+                for driver, lap in resolve_laps(session_dir, lap_specs):
+                    params = {"driver": driver, "lap": lap}
+                    add("gear_shifts_on_circuit", event, dir_name, session, params, f"gear_shifts_per_lap_{driver}_{lap}", lap_inputs + [telemetry_path, circuit_path])
+                    add("speed_over_lap", event, dir_name, session, params, f"speed_over_lap_{driver}_{lap}", lap_inputs + [telemetry_path, circuit_path])
+
+                add("setup_performance", event, dir_name, session, {}, "setup_performance", lap_inputs + [telemetry_path, circuit_path])
+                add("telemetry_comparison", event, dir_name, session, {}, "telemetry_comparison", lap_inputs + [telemetry_path, circuit_path])
+                season_speed.load_speed_summary(session_dir)
+                for by in ["Team", "Driver"]:
+                    add("mean_vs_max_speed", event, dir_name, session, {"by": by}, f"mean_vs_max_speed_{by.lower()}", lap_inputs + [telemetry_path])
+
+    # Season level figures only when the whole season is exported
+    if not events and not sessions:
+        df_standings = fst.update_standings(dir, year)
+        if not df_standings.empty:
+            for championship in ["Drivers", "Constructors"]:
+                add("standings_progression", None, None, None, {"championship": championship},
+                    f"{championship.lower()}_standings_progression", [f"{dir}/{year}/{fst.STANDINGS_FILE}"])
+
+        # Built here once, not by several workers at the same time
+        if not season_speed.load_season_speeds(dir, year).empty:
+            add("season_speed_trend", None, None, None, {"session": "race"}, "race_season_speed_trend", [f"{dir}/{year}/race_{season_speed.SPEEDS_FILE}"])
+
+    return jobs
+
+
+
+def export_plots(jobs: list, output_dir: str, workers: int = None, force: bool = False) -> dict:
+    """
+    Renders jobs across a process pool, skipping figures whose inputs are unchanged since the last export.
+
+    Arguments:
+    - jobs (list): output of build_jobs
+    - output_dir (str): where figures and the export manifest are written
+    - workers (int): number of processes, defaults to the number of CPUs
+    - force (bool): render everything even if up to date
+
+    Return:
+    - summary with rendered, skipped, failed, files, seconds (dict)
+    """
+
+    manifest_path = f"{output_dir}/{MANIFEST_FILE}"
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    # Manifest is keyed by output file, so exporting a new format doesn't re-render the others
+    def outdated_formats(job):
+        return [
+            fmt for fmt in job["formats"]
+            if force or manifest.get(f"{job['output']}.{fmt}") != job["signature"] or not os.path.exists(f"{job['output']}.{fmt}")
+        ]
+
+    to_render = []
+    for job in jobs:
+        formats = outdated_formats(job)
+        if formats:
+            to_render.append({**job, "formats": formats})
+    summary = {"rendered": 0, "skipped": len(jobs) - len(to_render), "failed": 0, "files": 0, "seconds": 0.0}
+
+    start = time.perf_counter()
+
+    if to_render:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = {executor.submit(render_job, job): job for job in to_render}
+            for future in as_completed(futures):
+                job, outcome = futures[future], future.result()
+                if outcome["error"]:
+                    summary["failed"] += 1
+                    print(f"Failed: {outcome['output']} ({outcome['error']})")
+                    continue
+                summary["rendered"] += 1
+                summary["files"] += outcome["files"]
+                for fmt in job["formats"]:
+                    manifest[f"{job['output']}.{fmt}"] = job["signature"]
+
+    summary["seconds"] = time.perf_counter() - start
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    return summary
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export every dashboard figure for a season, event or session.")
+    parser.add_argument("year", type=int)
+    parser.add_argument("--events", nargs="+", help="event names or directory names (default: all)")
+    parser.add_argument("--sessions", nargs="+", help="sessions, e.g. Race Qualifying sprint (default: all)")
+    parser.add_argument("--laps", nargs="+", default=DEFAULT_LAPS,
+                        help="laps for the track maps: fastest, DRIVER:fastest, DRIVER:LAP or LAP (default: fastest)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["png"])
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--data-dir", default=dir)
+    parser.add_argument("--output-dir", default="exports")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="re-render figures that are up to date")
+    args = parser.parse_args()
+
+    jobs = build_jobs(args.data_dir, args.year, args.events, args.sessions, args.laps, args.output_dir, args.formats, args.dpi)
+    summary = export_plots(jobs, args.output_dir, args.workers, args.force)
+
+    rate = summary["rendered"] / summary["seconds"] if summary["seconds"] > 0 else 0.0
+    print(
+        f"{len(jobs)} figures: {summary['rendered']} rendered, {summary['skipped']} up to date, {summary['failed']} failed | "
+        f"{summary['files']} files in {summary['seconds']:.1f}s ({rate:.2f} figures/s)"
+    )
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import matplotlib.pyplot as plt
+
+
+# Settings every downloaded or exported figure is saved with
+SAVE_KWARGS = dict(bbox_inches="tight", pad_inches=0.1)
+
+# Resolution st.pyplot renders at, figures shown as images look the same
+DISPLAY_DPI = 200
+
+# Threads rendering figures, shared by every session of the app so a busy server stays bounded
+RENDER_WORKERS = 4
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+
+def figure_bytes(fig: plt.Figure, format: str = "png", dpi: int = 300) -> bytes:
+    """
+    Renders a figure to an image in memory.
+
+    Arguments:
+    - fig (plt.Figure): figure to render
+    - format (str): image format, e.g. "png", "svg" or "pdf"
+    - dpi (int): resolution of raster formats
+
+    Return:
+    - Encoded image (bytes)
+    """
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=format, dpi=dpi, **SAVE_KWARGS)
+    return buffer.getvalue()
+
+
+
+def release(fig: plt.Figure) -> None:
+    # pyplot keeps every figure made with plt.subplots until it is closed, also in a long running server,
+    # figures made with plotting.new_figure are not registered and this is a no-op for them
+    plt.close(fig)
+
+
+
+def render_and_release(fig: plt.Figure, format: str = "png", dpi: int = 300) -> bytes:
+    # For figures that are only needed as an image, e.g. cached or exported ones
+    try:
+        return figure_bytes(fig, format, dpi)
+    finally:
+        release(fig)
+
+
+
+def _render(build, download_dpi: int) -> dict:
+    fig = build()
+    try:
+        return {
+            "display": figure_bytes(fig, dpi=DISPLAY_DPI),
+            "download": figure_bytes(fig, dpi=download_dpi) if download_dpi else None,
+        }
+    finally:
+        release(fig)
+
+
+
+def render_figures(builders: list, download_dpi: int = 300, max_workers: int = RENDER_WORKERS) -> list:
+    """
+    Builds and renders independent figures concurrently in a thread pool. Builders must draw
+    with the Figure/Axes API only (see plotting.new_figure), pyplot's state is not thread safe.
+
+    Arguments:
+    - builders (list): functions without arguments that return a figure
+    - download_dpi (int): resolution of the PNG offered for download, no download image when None
+    - max_workers (int): threads to render with, 1 renders in the calling thread
+
+    Return:
+    - dicts with the "display" and "download" PNG bytes, in the order of builders (list)
+    """
+
+    global _render_pool
+
+    if max_workers <= 1 or len(builders) <= 1:
+        return [_render(build, download_dpi) for build in builders]
+
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="render")
+
+    futures = [_render_pool.submit(_render, build, download_dpi) for build in builders]
+    return [future.result() for future in futures]
+
+
+
+def open_figures() -> int:
+    return len(plt.get_fignums())
+
+
+
+@contextmanager
+def figure_scope():
+    """
+    Closes every figure created inside the block when it exits, also on errors. Meant for
+    scripts and worker processes, in a server other sessions may be drawing at the same time.
+    """
+
+    before = set(plt.get_fignums())
+    try:
+        yield
+    finally:
+        for number in set(plt.get_fignums()) - before:
+            plt.close(number)
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    with figure_scope():
+        fig, ax = plt.subplots()
+        ax.plot([0, 1], [0, 1])
+        print(len(render_and_release(fig)), "bytes", open_figures(), "open")
+        plt.subplots()
+
+    print(open_figures(), "open after scope")
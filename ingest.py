@@ -0,0 +1,484 @@
+import os
+import re
+import resource
+import sys
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Iterable, Iterator
+
+import data_access
+import track_status
+
+
+# Weather columns attached to every lap in laps.parquet
+LAP_WEATHER_COLUMNS = ["AirTemp", "TrackTemp", "Humidity", "Pressure", "Rainfall", "WindDirection", "WindSpeed"]
+
+# Session statuses FastF1 reports once a session is over
+FINISHED_STATUSES = ["Finished", "Finalised", "Ends"]
+
+# Telemetry of every driver's fastest valid lap, a few hundred kB instead of the full session
+FASTEST_LAPS_FILE = "fastest_laps.parquet"
+FASTEST_LAP_COLUMNS = ["Time", "Distance", "Speed", "RPM", "nGear", "Throttle", "Brake", "DRS", "X", "Y"]
+
+
+
+class SessionNotFinished(Exception):
+    # The session is still running or its data is not complete yet, try again later
+    pass
+
+
+
+def session_key(session: str) -> str:
+    # "Sprint Qualifying" -> "sprint_qualifying", the directory name of a session
+    return re.sub(r"\s+", "_", session).lower()
+
+
+
+def convert_fastf1_session(
+        cache_dir: str,
+        year: int,
+        event: str,
+        session: str,
+        output_dir: str,
+        telemetry: bool = True) -> list:
+    """
+    Loads a session from a local FastF1 cache (offline, nothing is downloaded) and writes it in
+    the parquet layout the dashboard reads.
+
+    Arguments:
+    - cache_dir (str): FastF1 cache directory
+    - year (int): season
+    - event (str): event name, e.g. "Chinese Grand Prix"
+    - session (str): session name, e.g. "Sprint Qualifying"
+    - output_dir (str): directory the session files are written to
+    - telemetry (bool): also write telemetry_data.parquet
+
+    Return:
+    - names of the written files (list)
+    """
+
+    import fastf1
+    import fastf1.plotting
+
+    fastf1.Cache.enable_cache(cache_dir)
+    fastf1.Cache.offline_mode(True)
+
+    ff1_session = fastf1.get_session(year, event, session)
+    ff1_session.load(laps=True, telemetry=telemetry, weather=True, messages=True)
+
+    statuses = set(ff1_session.session_status["Status"]) if ff1_session.session_status is not None else set()
+    if not statuses.intersection(FINISHED_STATUSES):
+        raise SessionNotFinished(f"{year} {event} {session} has not finished")
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+
+    def write(df, name):
+        pd.DataFrame(df).to_parquet(f"{output_dir}/{name}")
+        written.append(name)
+
+    # Results with both colour maps the plots can pick from
+    df_results = pd.DataFrame(ff1_session.results)
+    df_results["TeamColorOfficial"] = "#" + df_results["TeamColor"].astype(str)
+    df_results["TeamColorFastf1"] = [fastf1.plotting.get_team_color(team, session=ff1_session) for team in df_results["TeamName"]]
+    write(df_results, "results.parquet")
+
+    # Laps with the compound colours and the weather of every lap
+    df_laps = pd.DataFrame(ff1_session.laps)
+    compound_colors = fastf1.plotting.get_compound_mapping(session=ff1_session)
+    df_laps["CompoundColor"] = df_laps["Compound"].map(compound_colors)
+
+    # Safety Car, VSC, red flag and pit laps from the track status feed
+    df_track_status = pd.DataFrame(ff1_session.track_status)
+    df_laps["LapStatus"] = track_status.classify_laps(df_laps, track_status.intervals_from_track_status(df_track_status, df_laps["Time"].max()))
+
+    df_weather = pd.DataFrame(ff1_session.weather_data)
+    write(add_lap_weather(df_laps, df_weather) if not df_weather.empty else df_laps, "laps.parquet")
+    write(df_weather, "weather.parquet")
+
+    write(df_track_status, track_status.TRACK_STATUS_FILE)
+    write(ff1_session.race_control_messages, "race_control_messages.parquet")
+    write(ff1_session.session_status, "session_status.parquet")
+
+    if telemetry:
+        # Streamed one driver at a time, the fastest lap sidecar is cut from each driver on the way
+        fastest_frames = []
+
+        def keep_fastest(frames):
+            for frame in frames:
+                fastest_frames.append(build_fastest_laps(df_laps, frame))
+                yield frame
+                del frame
+
+        stats = write_parquet_stream(keep_fastest(iter_driver_telemetry(ff1_session)), f"{output_dir}/telemetry_data.parquet", "telemetry")
+        print(f"Telemetry of {year} {event} {session}: {stats['rows']} rows in {stats['row_groups']} row groups, peak RSS {stats['peak_rss_mb']:.0f} MB")
+
+        if stats["rows"]:
+            written.append("telemetry_data.parquet")
+            df_fastest = pd.concat(fastest_frames, ignore_index=True).sort_values(["LapTime", "Distance"]).reset_index(drop=True)
+            write(df_fastest, FASTEST_LAPS_FILE)
+
+    return written
+
+
+
+def rss_mb() -> float:
+    # Current resident set size on Linux, peak RSS elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+
+def iter_driver_telemetry(ff1_session) -> Iterator[pd.DataFrame]:
+    """
+    Telemetry of a loaded FastF1 session, one DataFrame per driver with every lap of that driver.
+    Same per driver and lap layout as the notebook conversion, driver and lap make up the filters
+    the app reads with.
+
+    Arguments:
+    - ff1_session (fastf1.core.Session): session loaded with telemetry
+
+    Return:
+    - generator of per driver telemetry (Iterator[pd.DataFrame])
+    """
+
+    for driver in ff1_session.laps["Driver"].dropna().unique():
+        frames = []
+        for _, lap in ff1_session.laps.pick_drivers(driver).iterlaps():
+            try:
+                df_lap = pd.DataFrame(lap.get_telemetry())
+            except Exception as e:
+                print(f"No telemetry for driver {driver} in lap {lap['LapNumber']}: {e}")
+                continue
+            df_lap["driver"] = driver
+            df_lap["lap"] = int(lap["LapNumber"])
+            df_lap["Team"] = lap["Team"]
+            frames.append(df_lap)
+
+        if frames:
+            df_driver = pd.concat(frames, ignore_index=True)
+            frames.clear()
+            yield df_driver
+            del df_driver
+
+
+
+# Arrow types of the declared column kinds, for stream columns the first frame has no values for
+KIND_TYPES = {
+    data_access.NUMBER: pa.float64(),
+    data_access.STRING: pa.large_string(),
+    data_access.BOOL: pa.bool_(),
+    data_access.TIMEDELTA: pa.duration("ns"),
+    data_access.DATETIME: pa.timestamp("ns"),
+}
+
+
+
+def stream_schema(schema: pa.Schema, table: str = None) -> pa.Schema:
+    """
+    Schema every frame of a stream is written with, from the first frame's. Columns that are all
+    null in the first frame take their declared type, strings when undeclared. Integer columns stay
+    int64, later frames where FastF1 turned them to float (a missing value) cast back as long as the
+    values are whole numbers.
+
+    Arguments:
+    - schema (pa.Schema): schema of the first frame
+    - table (str): key of data_access.TABLES the stream is written to
+
+    Return:
+    - pa.Schema
+    """
+
+    declared = (data_access.TABLES[table]["columns"] or {}) if table else {}
+
+    fields = []
+    for field in schema:
+        if pa.types.is_null(field.type):
+            field = field.with_type(KIND_TYPES[declared.get(field.name, data_access.STRING)])
+        fields.append(field)
+
+    return pa.schema(fields)
+
+
+
+def write_parquet_stream(frames: Iterable[pd.DataFrame], file_path: str, table: str = None) -> dict:
+    """
+    Writes DataFrames to one parquet file as they arrive, each one becomes its own row group, so
+    only one of them is held in memory at a time. Every frame is cast to stream_schema of the
+    first, so later frames with values where the first had none or whole floats where it had
+    integers still fit. The file is swapped in once complete.
+
+    Arguments:
+    - frames (Iterable[pd.DataFrame]): frames with the same columns, e.g. iter_driver_telemetry
+    - file_path (str): parquet file to write, nothing is written when there are no frames
+    - table (str): key of data_access.TABLES the file holds, its declared types fill in null columns
+
+    Return:
+    - rows, row_groups and peak_rss_mb (RSS sampled while every frame was held) (dict)
+    """
+
+    writer = None
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    stats = {"rows": 0, "row_groups": 0, "peak_rss_mb": rss_mb()}
+
+    try:
+        for frame in frames:
+            if writer is None:
+                schema = stream_schema(pa.Schema.from_pandas(frame, preserve_index=False), table)
+                writer = pq.ParquetWriter(tmp_path, schema)
+
+            table_frame = pa.Table.from_pandas(frame.reindex(columns=writer.schema.names), preserve_index=False).cast(writer.schema)
+
+            writer.write_table(table_frame, row_group_size=max(len(table_frame), 1))
+            stats["rows"] += len(table_frame)
+            stats["row_groups"] += 1
+            stats["peak_rss_mb"] = max(stats["peak_rss_mb"], rss_mb())
+
+            # Released before the next frame is built
+            del table_frame, frame
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+
+    if writer is not None:
+        writer.close()
+        os.replace(tmp_path, file_path)
+
+    return stats
+
+
+
+def add_lap_weather(laps: pd.DataFrame, weather: pd.DataFrame) -> pd.DataFrame:
+    """
+    Attaches the nearest preceding weather sample to every lap (as-of join on session time).
+
+    Arguments:
+    - laps (pd.DataFrame): laps with LapStartTime (and Time/LapTime as a fallback)
+    - weather (pd.DataFrame): weather samples with Time
+
+    Return:
+    - Copy of laps with the LAP_WEATHER_COLUMNS added (pd.DataFrame)
+    """
+
+    laps = laps.drop(columns=[column for column in LAP_WEATHER_COLUMNS if column in laps.columns])
+    weather = weather.dropna(subset=["Time"]).sort_values("Time")
+
+    # Some laps have no start time recorded, use lap end minus lap time instead
+    lap_start = laps["LapStartTime"].fillna(laps["Time"] - laps["LapTime"])
+
+    weather_times = weather["Time"].to_numpy(dtype="timedelta64[ns]")
+    lap_times = lap_start.to_numpy(dtype="timedelta64[ns]")
+
+    # Index of the last sample taken at or before the lap start, laps starting before the
+    # first sample take the first one
+    idx = np.clip(np.searchsorted(weather_times, lap_times, side="right") - 1, 0, None)
+    has_weather = ~np.isnat(lap_times) & (len(weather_times) > 0)
+
+    for column in LAP_WEATHER_COLUMNS:
+        if column not in weather.columns:
+            continue
+        values = weather[column].to_numpy()
+        if len(values) == 0:
+            laps[column] = pd.Series(np.nan, index=laps.index)
+            continue
+        joined = pd.Series(values[idx], index=laps.index)
+        laps[column] = joined.where(has_weather)
+
+    return laps
+
+
+
+def has_lap_weather(session_dir: str) -> bool:
+    schema_names = pq.read_schema(f"{session_dir}/laps.parquet").names
+    return all(column in schema_names for column in LAP_WEATHER_COLUMNS)
+
+
+
+def materialize_lap_weather(session_dir: str) -> None:
+    """
+    Rewrites laps.parquet of a session with the weather of every lap, so plots can filter
+    and normalize by conditions without joining on every rerun.
+
+    Arguments:
+    - session_dir (str): directory holding laps.parquet and weather.parquet
+    """
+
+    laps_path = f"{session_dir}/laps.parquet"
+    weather_path = f"{session_dir}/weather.parquet"
+
+    if not os.path.exists(weather_path):
+        print(f"No weather data for {session_dir}, skipping.")
+        return
+
+    # Every column, the laps are written back whole
+    df_laps = pd.read_parquet(laps_path)
+    df_weather = data_access.read_table(session_dir, "weather", columns=["Time"] + LAP_WEATHER_COLUMNS)
+
+    df_laps = add_lap_weather(df_laps, df_weather)
+
+    # Write next to the target and swap, so readers never see a half-written file
+    with data_access.replacing(laps_path) as tmp_path:
+        df_laps.to_parquet(tmp_path)
+
+
+
+def backfill_lap_weather(dir: str, year: int) -> None:
+    """
+    Materializes lap weather for every session of a season that does not have it yet.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    """
+
+    df_schedule = pd.read_parquet(f"{dir}/{year}/schedule.parquet", columns=["DirName"])
+
+    for dir_name in df_schedule["DirName"]:
+        event_dir = f"{dir}/{year}/{dir_name}"
+        if not os.path.isdir(event_dir):
+            continue
+
+        for session in sorted(os.listdir(event_dir)):
+            session_dir = f"{event_dir}/{session}"
+            if os.path.exists(f"{session_dir}/laps.parquet") and not has_lap_weather(session_dir):
+                materialize_lap_weather(session_dir)
+                print(f"Lap weather added: {session_dir}")
+
+
+
+def fastest_valid_laps(laps: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fastest valid lap of every driver: timed, accurate and not deleted for track limits
+    (IsAccurate and Deleted are used when the laps have them).
+
+    Arguments:
+    - laps (pd.DataFrame): laps with Driver, LapNumber and LapTime
+
+    Return:
+    - Driver, LapNumber, LapTime and Team of one lap per driver, fastest first (pd.DataFrame)
+    """
+
+    valid = laps["LapTime"].notna()
+    if "IsAccurate" in laps.columns:
+        valid &= laps["IsAccurate"].fillna(False).astype(bool)
+    if "Deleted" in laps.columns:
+        valid &= ~laps["Deleted"].fillna(False).astype(bool)
+
+    columns = [column for column in ["Driver", "LapNumber", "LapTime", "Team"] if column in laps.columns]
+    fastest = laps.loc[valid, columns].sort_values("LapTime").drop_duplicates("Driver")
+    fastest["LapNumber"] = fastest["LapNumber"].astype(int)
+
+    return fastest.reset_index(drop=True)
+
+
+
+def build_fastest_laps(laps: pd.DataFrame, telemetry: pd.DataFrame) -> pd.DataFrame:
+    """
+    Telemetry of every driver's fastest valid lap, the sidecar cross-year comparisons read.
+
+    Arguments:
+    - laps (pd.DataFrame): laps of the session
+    - telemetry (pd.DataFrame): telemetry of the session, or only of the fastest laps
+
+    Return:
+    - FASTEST_LAP_COLUMNS with driver, lap, Team and LapTime, floats as float32 (pd.DataFrame)
+    """
+
+    fastest = fastest_valid_laps(laps).rename(columns={"Driver": "driver", "LapNumber": "lap"})
+
+    columns = [column for column in FASTEST_LAP_COLUMNS if column in telemetry.columns]
+    df_fastest = telemetry[columns + ["driver", "lap"]].merge(fastest, on=["driver", "lap"])
+    df_fastest = df_fastest.sort_values(["LapTime", "Distance"]).reset_index(drop=True)
+
+    floats = df_fastest.select_dtypes("float64").columns
+    df_fastest[floats] = df_fastest[floats].astype(np.float32)
+
+    return df_fastest
+
+
+
+def has_fastest_laps(session_dir: str) -> bool:
+    # Present and at least as new as the telemetry it was cut from
+    file_path = f"{session_dir}/{FASTEST_LAPS_FILE}"
+    return os.path.exists(file_path) and os.stat(file_path).st_mtime_ns >= os.stat(f"{session_dir}/telemetry_data.parquet").st_mtime_ns
+
+
+
+def session_fastest_laps(session_dir: str) -> pd.DataFrame:
+    """
+    Builds the fastest lap sidecar of a session, reading only the telemetry of the laps it keeps.
+
+    Arguments:
+    - session_dir (str): directory holding laps.parquet and telemetry_data.parquet
+
+    Return:
+    - output of build_fastest_laps (pd.DataFrame)
+    """
+
+    df_laps = data_access.read_table(session_dir, "laps", optional=["Driver", "LapNumber", "LapTime", "Team", "IsAccurate", "Deleted"])
+    fastest = fastest_valid_laps(df_laps)
+
+    # One (driver, lap) conjunction per kept lap, row groups of other laps are skipped
+    filters = [[("driver", "=", driver), ("lap", "=", lap)] for driver, lap in zip(fastest["Driver"], fastest["LapNumber"])]
+    df_telemetry = data_access.read_table(session_dir, "telemetry", columns=["driver", "lap"], optional=FASTEST_LAP_COLUMNS, filters=filters) if filters else pd.DataFrame(columns=FASTEST_LAP_COLUMNS + ["driver", "lap"])
+
+    return build_fastest_laps(df_laps, df_telemetry)
+
+
+
+def materialize_fastest_laps(session_dir: str) -> None:
+    # Writes the output of session_fastest_laps next to the telemetry
+    df_fastest = session_fastest_laps(session_dir)
+    with data_access.replacing(f"{session_dir}/{FASTEST_LAPS_FILE}") as tmp_path:
+        df_fastest.to_parquet(tmp_path, index=False)
+
+
+
+def backfill_fastest_laps(dir: str, year: int) -> None:
+    """
+    Writes the fastest lap sidecar for every session of a season with telemetry that does not
+    have an up to date one.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    """
+
+    df_schedule = pd.read_parquet(f"{dir}/{year}/schedule.parquet", columns=["DirName"])
+
+    for dir_name in df_schedule["DirName"]:
+        event_dir = f"{dir}/{year}/{dir_name}"
+        if not os.path.isdir(event_dir):
+            continue
+
+        for session in sorted(os.listdir(event_dir)):
+            session_dir = f"{event_dir}/{session}"
+            if os.path.exists(f"{session_dir}/telemetry_data.parquet") and not has_fastest_laps(session_dir):
+                materialize_fastest_laps(session_dir)
+                print(f"Fastest laps written: {session_dir}")
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+
+    # python ingest.py <data dir> <year>: lap weather, lap status, fastest laps and the derived tables
+    # the dashboard reads, for sessions stored without them
+    if len(sys.argv) > 2:
+        import watch_ingest
+
+        backfill_lap_weather(sys.argv[1], int(sys.argv[2]))
+        track_status.backfill_lap_status(sys.argv[1], int(sys.argv[2]))
+        backfill_fastest_laps(sys.argv[1], int(sys.argv[2]))
+        watch_ingest.backfill_tables(sys.argv[1], int(sys.argv[2]))
@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+
+
+# Whiskers reach the furthest lap within this many IQRs of the box (matplotlib/seaborn default)
+WHISKER_IQR = 1.5
+
+# KDE settings of seaborn's violinplot: Scott's rule bandwidth, curves cut two bandwidths past
+# the extreme laps and evaluated on 100 points
+KDE_CUT = 2
+KDE_GRIDSIZE = 100
+
+
+
+def remove_lap_time_outliers(laps: pd.DataFrame) -> pd.DataFrame:
+    # Session wide Q1 - 1.5 IQR .. Q3 + 1.5 IQR, laps without a time are dropped as well
+    Q1 = laps['Lap Time (s)'].quantile(0.25)
+    Q3 = laps['Lap Time (s)'].quantile(0.75)
+    IQR = Q3 - Q1
+    lower_bound = Q1 - 1.5 * IQR
+    upper_bound = Q3 + 1.5 * IQR
+    return laps[(laps['Lap Time (s)'] >= lower_bound) & (laps['Lap Time (s)'] <= upper_bound)]
+
+
+
+def _grouped_quantile(values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    # Linear interpolation between the closest ranks (numpy's default), values sorted within groups
+    position = (counts - 1) * q
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, counts - 1)
+    fraction = position - lower
+    return values[starts + lower] * (1 - fraction) + values[starts + upper] * fraction
+
+
+
+def _grouped_kde(values: np.ndarray, codes: np.ndarray, starts: np.ndarray, counts: np.ndarray):
+    # Scott's factor n^(-1/5) times the sample standard deviation, as in scipy's gaussian_kde
+    means = np.add.reduceat(values, starts) / counts
+    deviation = values - np.repeat(means, counts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.sqrt(np.add.reduceat(deviation ** 2, starts) / (counts - 1))
+    bandwidth = counts ** (-1 / 5) * std
+
+    grid_min = values[starts] - bandwidth * KDE_CUT
+    grid_max = values[starts + counts - 1] + bandwidth * KDE_CUT
+    support = grid_min[:, None] + (grid_max - grid_min)[:, None] * np.linspace(0, 1, KDE_GRIDSIZE)
+
+    # Every lap adds its gaussian to the grid of its own group, summed per group in one reduction
+    lap_bandwidth = bandwidth[codes]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (support[codes] - values[:, None]) / lap_bandwidth[:, None]
+        kernels = np.exp(-0.5 * z ** 2) / (lap_bandwidth[:, None] * np.sqrt(2 * np.pi))
+    density = np.add.reduceat(kernels, starts, axis=0) / counts[:, None]
+
+    # One lap or identical laps have no spread to estimate a density from
+    density[~(bandwidth > 0)] = np.nan
+
+    return support, density
+
+
+
+def compute_lap_time_stats(
+        laps: pd.DataFrame,
+        by: str,
+        remove_outliers: str = "Yes",
+        kde: bool = False) -> pd.DataFrame:
+    """
+    Summarises the lap times of every team or driver in one grouped pass: five-number summary,
+    whiskers, outlier laps and optionally the KDE curve of a violin.
+
+    Arguments:
+    - laps (pd.DataFrame): laps with a "Lap Time (s)" column and the grouping column
+    - by (str): grouping column, "Team" or "Driver"
+    - remove_outliers (str): "Yes" drops session wide outliers before summarising, as the plots do
+    - kde (bool): also evaluate the density curves (Support and Density columns)
+
+    Return:
+    - One row per group ordered by median lap time, groups without timed laps last (pd.DataFrame)
+    """
+
+    if remove_outliers == "Yes":
+        laps = remove_lap_time_outliers(laps)
+
+    laps = laps[laps[by].notna()]
+    groups = np.sort(laps[by].unique())
+    timed = laps.loc[laps["Lap Time (s)"].notna(), [by, "Lap Time (s)"]].sort_values([by, "Lap Time (s)"])
+
+    codes, names = pd.factorize(timed[by], sort=True)
+    values = timed["Lap Time (s)"].to_numpy(dtype=float)
+    counts = np.bincount(codes, minlength=len(names))
+    starts = np.r_[0, np.cumsum(counts)[:-1]].astype(np.int64)
+
+    stats = pd.DataFrame({by: names, "Count": counts})
+
+    if len(values):
+        q1 = _grouped_quantile(values, starts, counts, 0.25)
+        median = _grouped_quantile(values, starts, counts, 0.5)
+        q3 = _grouped_quantile(values, starts, counts, 0.75)
+        iqr = q3 - q1
+
+        # Whiskers end on the furthest lap inside the fences, laps beyond them are fliers
+        low_fence = np.repeat(q1 - WHISKER_IQR * iqr, counts)
+        high_fence = np.repeat(q3 + WHISKER_IQR * iqr, counts)
+        whisker_low = np.minimum.reduceat(np.where(values >= low_fence, values, np.inf), starts)
+        whisker_high = np.maximum.reduceat(np.where(values <= high_fence, values, -np.inf), starts)
+        whisker_low = np.where(np.isfinite(whisker_low), whisker_low, q1)
+        whisker_high = np.where(np.isfinite(whisker_high), whisker_high, q3)
+
+        is_flier = (values < np.repeat(whisker_low, counts)) | (values > np.repeat(whisker_high, counts))
+        fliers = np.split(np.where(is_flier, values, np.nan), starts[1:])
+
+        stats["Mean"] = np.add.reduceat(values, starts) / counts
+        stats["Median"] = median
+        stats["Q1"] = q1
+        stats["Q3"] = q3
+        stats["WhiskerLow"] = whisker_low
+        stats["WhiskerHigh"] = whisker_high
+        stats["Fliers"] = [group[~np.isnan(group)] for group in fliers]
+
+        if kde:
+            support, density = _grouped_kde(values, codes, starts, counts)
+            stats["Support"] = list(support)
+            stats["Density"] = list(density)
+
+    # Groups whose laps are all untimed keep their place on the axis, after the rest
+    stats = stats.set_index(by).reindex(groups).reset_index()
+    stats["Count"] = stats["Count"].fillna(0).astype(int)
+    if "Median" not in stats.columns:
+        stats["Median"] = np.nan
+
+    return stats.sort_values("Median", na_position="last", kind="stable").reset_index(drop=True)
+
+
+
+def has_density(stats: pd.DataFrame) -> pd.Series:
+    # Groups with a KDE curve, one lap or identical laps have no spread to estimate it from
+    if "Density" not in stats.columns:
+        return pd.Series(False, index=stats.index)
+    return stats["Density"].map(lambda density: isinstance(density, np.ndarray) and np.isfinite(density).all())
+
+
+
+def to_bxp_stats(stats: pd.DataFrame) -> list:
+    # Input of matplotlib's Axes.bxp, one dict per group (groups need timed laps)
+    return [
+        {
+            "med": row.Median, "q1": row.Q1, "q3": row.Q3, "mean": row.Mean,
+            "whislo": row.WhiskerLow, "whishi": row.WhiskerHigh, "fliers": row.Fliers
+        }
+        for row in stats.itertuples(index=False)
+    ]
+
+
+
+def to_violin_stats(stats: pd.DataFrame) -> list:
+    # Input of matplotlib's Axes.violin, one dict per group (groups need a density curve)
+    return [
+        {
+            "coords": row.Support, "vals": row.Density, "mean": row.Mean,
+            "median": row.Median, "min": row.Support[0], "max": row.Support[-1]
+        }
+        for row in stats.itertuples(index=False)
+    ]
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    # Grouped summaries must match matplotlib's boxplot_stats and a per group gaussian KDE
+    import matplotlib.cbook as cbook
+
+    def gaussian_kde(values, support):
+        # Reference density, scipy.stats.gaussian_kde with its default Scott's rule bandwidth
+        bandwidth = len(values) ** (-1 / 5) * np.std(values, ddof=1)
+        z = (np.asarray(support)[:, None] - values[None, :]) / bandwidth
+        return np.exp(-0.5 * z ** 2).sum(axis=1) / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+
+    # Values of scipy.stats.gaussian_kde([1, 2, 4]) at 0, 2 and 5
+    assert np.allclose(gaussian_kde(np.array([1.0, 2.0, 4.0]), [0.0, 2.0, 5.0]), [0.10697687, 0.21489537, 0.08373715])
+
+    rng = np.random.default_rng(0)
+    laps = pd.DataFrame({
+        "Driver": rng.choice(["VER", "NOR", "LEC", "HAM"], 400),
+        "Lap Time (s)": rng.normal(92, 1.5, 400) + rng.exponential(1, 400)
+    })
+    stats = compute_lap_time_stats(laps, "Driver", "No", kde=True)
+
+    for row in stats.itertuples(index=False):
+        values = laps.loc[laps["Driver"] == row.Driver, "Lap Time (s)"].to_numpy()
+        expected = cbook.boxplot_stats(values)[0]
+        assert np.allclose([row.Q1, row.Median, row.Q3, row.WhiskerLow, row.WhiskerHigh], [expected[k] for k in ["q1", "med", "q3", "whislo", "whishi"]])
+        assert np.allclose(np.sort(row.Fliers), np.sort(expected["fliers"]))
+        assert np.allclose(row.Density, gaussian_kde(values, row.Support))
+
+    print(stats[["Driver", "Count", "Median", "Q1", "Q3", "WhiskerLow", "WhiskerHigh"]])
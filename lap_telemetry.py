@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+import data_access
+import ingest
+
+
+# Channels drawn against distance, in the order of the panels
+TELEMETRY_CHANNELS = ["Speed", "Throttle", "Brake", "RPM", "nGear"]
+
+# Channels that hold their last value between samples instead of being interpolated
+STEP_CHANNELS = ["Brake", "nGear", "DRS"]
+
+# Spacing of the shared distance grid (m)
+GRID_STEP = 5
+
+
+
+def chosen_laps(laps: pd.DataFrame, drivers: list = None, lap_number: int = None) -> pd.DataFrame:
+    """
+    The lap of every driver to compare, their fastest valid lap or the same lap number for all.
+
+    Arguments:
+    - laps (pd.DataFrame): laps with Driver, LapNumber, LapTime and Team
+    - drivers (list): drivers to compare, all when empty
+    - lap_number (int): lap to compare, every driver's fastest valid lap when None
+
+    Return:
+    - Driver, LapNumber, LapTime and Team of one lap per driver, fastest first (pd.DataFrame)
+    """
+
+    if lap_number is None:
+        df_chosen = ingest.fastest_valid_laps(laps)
+    else:
+        columns = [column for column in ["Driver", "LapNumber", "LapTime", "Team"] if column in laps.columns]
+        df_chosen = laps.loc[laps["LapNumber"] == lap_number, columns].sort_values("LapTime").drop_duplicates("Driver")
+        df_chosen["LapNumber"] = df_chosen["LapNumber"].astype(int)
+
+    if drivers:
+        df_chosen = df_chosen[df_chosen["Driver"].isin(drivers)]
+
+    return df_chosen.reset_index(drop=True)
+
+
+
+def load_lap_telemetry(session_dir: str, laps: pd.DataFrame, channels: list = TELEMETRY_CHANNELS) -> pd.DataFrame:
+    # Only the chosen laps and channels, one driver and lap predicate each so the rest is never decoded
+    filters = [[("driver", "=", driver), ("lap", "=", int(lap))] for driver, lap in zip(laps["Driver"], laps["LapNumber"])]
+    if not filters:
+        return pd.DataFrame(columns=["driver", "lap", "Distance"] + list(channels))
+
+    return data_access.read_table(session_dir, "telemetry", columns=["driver", "lap", "Distance"] + list(channels), filters=filters)
+
+
+
+def resample_to_distance(telemetry: pd.DataFrame, channels: list = TELEMETRY_CHANNELS, step: float = GRID_STEP) -> pd.DataFrame:
+    """
+    Every lap's channels on one shared distance grid, from one interpolation over all laps at once.
+
+    Arguments:
+    - telemetry (pd.DataFrame): driver, lap, Distance and the channels of one or more laps
+    - channels (list): channels to resample, STEP_CHANNELS hold their last value
+    - step (float): spacing of the grid in metres
+
+    Return:
+    - Driver, LapNumber, Distance and the channels at every grid point a lap covers (pd.DataFrame)
+    """
+
+    telemetry = telemetry.dropna(subset=["Distance"])
+    if not len(telemetry):
+        return pd.DataFrame(columns=["Driver", "LapNumber", "Distance"] + list(channels))
+
+    codes, laps = pd.factorize(pd.MultiIndex.from_frame(telemetry[["driver", "lap"]]), sort=True)
+    distance = telemetry["Distance"].to_numpy(dtype=float)
+
+    order = np.lexsort((distance, codes))
+    codes, distance = codes[order], distance[order]
+
+    starts = np.r_[0, np.flatnonzero(np.diff(codes)) + 1]
+    lap_start = distance[starts]
+    lap_end = np.maximum.reduceat(distance, starts)
+
+    # Laps laid end to end on one axis, each offset past the end of the one before
+    offset = np.ceil(lap_end.max() - min(lap_start.min(), 0) + step)
+    sample_axis = distance + codes * offset
+
+    grid = np.arange(0, lap_end.max() + step, step)
+    grid_codes = np.repeat(np.arange(len(laps)), len(grid))
+    grid_distance = np.tile(grid, len(laps))
+    grid_axis = grid_distance + grid_codes * offset
+
+    # No values outside the distance a lap has samples for
+    covered = (grid_distance >= lap_start[grid_codes]) & (grid_distance <= lap_end[grid_codes])
+
+    # Last sample at or before every grid point, for the channels that change in steps
+    previous = np.clip(np.searchsorted(sample_axis, grid_axis, side="right") - 1, 0, len(sample_axis) - 1)
+
+    df_resampled = pd.DataFrame({
+        "Driver": laps.get_level_values(0)[grid_codes[covered]],
+        "LapNumber": laps.get_level_values(1)[grid_codes[covered]],
+        "Distance": grid_distance[covered],
+    })
+
+    for channel in channels:
+        values = telemetry[channel].to_numpy(dtype=float)[order]
+        if channel in STEP_CHANNELS:
+            df_resampled[channel] = values[previous][covered]
+        else:
+            df_resampled[channel] = np.interp(grid_axis, sample_axis, values)[covered]
+
+    return df_resampled
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+    import time
+
+    session_dir = sys.argv[1] if len(sys.argv) > 1 else "/tmp/f1_data/2025/2025-03-23_chinese_grand_prix/race"
+    df_laps = data_access.read_table(session_dir, "laps", optional=["Driver", "LapNumber", "LapTime", "Team", "IsAccurate", "Deleted"])
+
+    start = time.perf_counter()
+    df_chosen = chosen_laps(df_laps)
+    telemetry = load_lap_telemetry(session_dir, df_chosen)
+    df_resampled = resample_to_distance(telemetry)
+    print(f"{len(df_chosen)} laps, {len(telemetry)} samples to {len(df_resampled)} grid points in {time.perf_counter() - start:.3f}s")
+
+    # Same resampling lap by lap, the slow way
+    for (driver, lap), df_lap in telemetry.groupby(["driver", "lap"]):
+        df_lap = df_lap.sort_values("Distance", kind="stable")
+        df_grid = df_resampled[(df_resampled["Driver"] == driver) & (df_resampled["LapNumber"] == lap)]
+        speed = np.interp(df_grid["Distance"], df_lap["Distance"], df_lap["Speed"])
+        gear = df_lap["nGear"].to_numpy()[np.searchsorted(df_lap["Distance"].to_numpy(), df_grid["Distance"].to_numpy(), side="right") - 1]
+        assert np.allclose(df_grid["Speed"], speed), driver
+        assert (df_grid["nGear"].to_numpy() == gear).all(), driver
+
+    print(df_resampled.head())
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import data_access
+from ingest import rss_mb, session_key
+
+
+# Simulated analysts run at once in every step of the sweep
+USER_COUNTS = [1, 2, 4]
+
+# Clicks every user makes after opening the app, each one is a rerun
+ACTIONS_PER_USER = 10
+
+# Rerun latency the capacity is measured against, in seconds
+TARGET_P95 = 5.0
+
+# Sidebar pickers and the page pickers of the Visuals (tab1) and Circuits (tab6) tabs
+WIDGETS = ["Year", "Event", "Session", "Select Graphics", "Select Graphics:"]
+
+# Seconds between two RSS samples
+MEMORY_INTERVAL = 0.2
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard_app.py")
+
+
+
+def available_years(dir: str) -> list:
+    # Seasons in the data tree, the year picker also lists seasons that aren't downloaded
+    return sorted(int(name) for name in os.listdir(dir) if name.isdigit() and os.path.exists(f"{dir}/{name}/schedule.parquet"))
+
+
+
+def click_options(at, dir: str, years: list) -> dict:
+    # Options of every picker the app shows that lead to data: downloaded seasons and the sessions of
+    # the event that are on disk (the schedule lists practice sessions that are never written)
+    pickers = {selectbox.label: selectbox for selectbox in at.selectbox if selectbox.label in WIDGETS}
+
+    options = {}
+    for label, picker in pickers.items():
+        if label == "Year":
+            options[label] = [year for year in picker.options if int(year) in years]
+        elif label == "Session" and "Year" in pickers and "Event" in pickers:
+            year, event = pickers["Year"].value, pickers["Event"].value
+            options[label] = [session for session in picker.options if os.path.isdir(data_access.find_session_dir(dir, year, event, session_key(session)))]
+        else:
+            options[label] = list(picker.options)
+
+    return {label: values for label, values in options.items() if values}
+
+
+
+def simulate_user(actions: int, seed: int, dir: str, years: list, barrier: threading.Barrier = None) -> dict:
+    """
+    One analyst: opens the app, then changes a random sidebar picker or page every rerun.
+
+    Arguments:
+    - actions (int): reruns after the first one
+    - seed (int): seed of this user's clicks, the same seed clicks the same way
+    - dir (str): data tree the app reads
+    - years (list): seasons the year picker may be set to
+    - barrier (threading.Barrier): waited on so every user starts at once
+
+    Return:
+    - open (seconds of the first run), latencies (seconds of every click's rerun), clicks and
+      exceptions, app exceptions and errors of the harness itself alike (dict)
+    """
+
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    result = {"open": None, "latencies": [], "clicks": [], "exceptions": []}
+
+    if barrier is not None:
+        barrier.wait()
+
+    click = "open"
+    for i in range(actions + 1):
+        try:
+            if i > 0:
+                # Only pickers the last run showed, a run that raised may not have drawn them all
+                options = click_options(at, dir, years)
+                if not options:
+                    result["exceptions"].append(f"{click}: no picker left to click")
+                    break
+                label = rng.choice(sorted(options))
+                value = rng.choice(options[label])
+                [selectbox for selectbox in at.selectbox if selectbox.label == label][0].set_value(int(value) if label == "Year" else value)
+                click = f"{label} = {value}"
+
+            start = time.perf_counter()
+            at.run()
+        except Exception as e:
+            result["exceptions"].append(f"{click}: {type(e).__name__}: {e}")
+            continue
+
+        if i == 0:
+            result["open"] = time.perf_counter() - start
+        else:
+            result["latencies"].append(time.perf_counter() - start)
+            result["clicks"].append(click)
+        result["exceptions"] += [f"{click}: {exception.message}" for exception in at.exception]
+
+    return result
+
+
+
+def run_load(users: int, actions: int, seed: int, dir: str, years: list) -> dict:
+    """
+    Runs users analysts at once, each in its own thread as the Streamlit server runs every browser
+    session's script, with cold caches.
+
+    Arguments:
+    - users (int): concurrent users
+    - actions (int): clicks of every user
+    - seed (int): base seed, user i clicks with seed + i
+    - dir (str): data tree the app reads
+    - years (list): seasons with data
+
+    Return:
+    - click rerun latency percentiles, median first load, throughput (runs per second, first loads
+      included), peak RSS and exceptions of the step (dict)
+    """
+
+    import streamlit as st
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    results = [None] * users
+    barrier = threading.Barrier(users + 1)
+
+    def run(i):
+        results[i] = simulate_user(actions, seed + i, dir, years, barrier)
+
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    peak = rss_mb()
+    while any(thread.is_alive() for thread in threads):
+        peak = max(peak, rss_mb())
+        time.sleep(MEMORY_INTERVAL)
+
+    seconds = time.perf_counter() - start
+
+    latencies = np.array([latency for result in results for latency in result["latencies"]])
+    p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99]) if len(latencies) else [np.nan] * 4
+    opens = [result["open"] for result in results if result["open"] is not None]
+
+    return {
+        "users": users,
+        "reruns": len(latencies),
+        "seconds": seconds,
+        "throughput": (len(latencies) + users) / seconds,
+        "open": float(np.median(opens)) if opens else np.nan,
+        "p50": p50, "p90": p90, "p95": p95, "p99": p99,
+        "max": latencies.max() if len(latencies) else np.nan,
+        "peak_rss_mb": peak,
+        "exceptions": [exception for result in results for exception in result["exceptions"]],
+    }
+
+
+
+def capacity(steps: list, target_p95: float = TARGET_P95) -> int:
+    # Most concurrent users served within the latency target without errors, 0 when even one user misses it
+    served = [step["users"] for step in steps if step["p95"] <= target_p95 and not step["exceptions"]]
+    return max(served, default=0)
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard with concurrent simulated users.")
+    parser.add_argument("--users", type=int, nargs="+", default=USER_COUNTS, help="Concurrent users of every step of the sweep")
+    parser.add_argument("--actions", type=int, default=ACTIONS_PER_USER)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target-p95", type=float, default=TARGET_P95)
+    parser.add_argument("--data-dir", default=None, help="Data tree to run against, two synthetic seasons are generated when omitted")
+    parser.add_argument("--output", default=None, help="JSON file the results are written to")
+    args = parser.parse_args()
+
+    if args.data_dir is None:
+        import synthetic_data
+        from datetime import datetime
+
+        # The app opens on the current season and reads today's drivers lists
+        args.data_dir = tempfile.mkdtemp(prefix="f1_load_")
+        for year in [datetime.today().year - 1, datetime.today().year]:
+            synthetic_data.write_tree(args.data_dir, year)
+        synthetic_data.write_drivers_wiki(args.data_dir)
+        print(f"Synthetic data written to {args.data_dir}")
+
+    os.environ["F1_DATA_DIR"] = args.data_dir
+    years = available_years(args.data_dir)
+
+    steps = []
+    print(f"{'users':>5} {'reruns':>6} {'runs/s':>8} {'open':>7} {'p50':>7} {'p90':>7} {'p95':>7} {'p99':>7} {'max':>7} {'peak RSS':>9} {'errors':>6}")
+    for users in args.users:
+        step = run_load(users, args.actions, args.seed, args.data_dir, years)
+        steps.append(step)
+        print(f"{users:>5} {step['reruns']:>6} {step['throughput']:>8.2f} {step['open']:>6.2f}s {step['p50']:>6.2f}s {step['p90']:>6.2f}s {step['p95']:>6.2f}s {step['p99']:>6.2f}s {step['max']:>6.2f}s {step['peak_rss_mb']:>6.0f} MB {len(step['exceptions']):>6}")
+
+    served = capacity(steps, args.target_p95)
+    print(f"Capacity: {served} concurrent users with p95 rerun latency <= {args.target_p95:g}s ({os.cpu_count()} CPUs, seed {args.seed}, {args.actions} clicks per user)")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "seed": args.seed, "actions": args.actions, "target_p95": args.target_p95, "capacity": served, "steps": steps}, f, indent=2)
+
+    failures = [exception for step in steps for exception in step["exceptions"]]
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import numpy as np
+import pandas as pd
+
+import data_access
+
+
+MINISECTORS_FILE = "minisectors_{n}.parquet"
+REFERENCE_FILE = "minisectors_{n}_reference.parquet"
+
+TELEMETRY_COLUMNS = ["Time", "Distance", "driver", "lap", "Team"]
+
+N_MINISECTORS = 25
+
+# Laps covering less of the reference lap's distance are in/out laps, retirements or cut short
+MIN_LAP_COVERAGE = 0.95
+
+
+
+def reference_lap(session_dir: str) -> pd.DataFrame:
+    """
+    Telemetry of the fastest lap of a session, the lap the minisectors are laid out on.
+
+    Arguments:
+    - session_dir (str): directory holding laps.parquet and telemetry_data.parquet
+
+    Return:
+    - X, Y and Distance of the reference lap (pd.DataFrame)
+    """
+
+    df_laps = data_access.read_table(session_dir, "laps", columns=["Driver", "LapNumber", "LapTime"]).dropna(subset=["LapTime"])
+    driver, lap = df_laps.loc[df_laps["LapTime"].idxmin(), ["Driver", "LapNumber"]]
+
+    return data_access.read_table(
+        session_dir, "telemetry",
+        columns=["X", "Y", "Distance"],
+        filters=[("driver", "=", driver), ("lap", "=", int(lap))]).sort_values("Distance").reset_index(drop=True)
+
+
+
+def minisector_times(
+        telemetry: pd.DataFrame,
+        lap_length: float,
+        n_minisectors: int = N_MINISECTORS,
+        lap_times: pd.Series = None) -> pd.DataFrame:
+    """
+    Time of every driver through every minisector of every lap, from one interpolation over
+    all laps at once.
+
+    Arguments:
+    - telemetry (pd.DataFrame): telemetry of a session, see TELEMETRY_COLUMNS
+    - lap_length (float): distance of the reference lap in metres
+    - n_minisectors (int): number of equal length minisectors
+    - lap_times (pd.Series): lap times in seconds indexed by driver and lap, they close the last
+      minisector at the line instead of at the last telemetry sample
+
+    Return:
+    - One row per driver, lap and minisector with MinisectorTime in seconds (pd.DataFrame)
+    """
+
+    telemetry = telemetry.dropna(subset=["Time", "Distance"])
+
+    lap_keys = pd.MultiIndex.from_frame(telemetry[["driver", "lap"]])
+    codes, laps = pd.factorize(lap_keys, sort=True)
+    distance = telemetry["Distance"].to_numpy(dtype=float)
+    time = telemetry["Time"].dt.total_seconds().to_numpy()
+
+    order = np.lexsort((distance, codes))
+    codes, distance, time = codes[order], distance[order], time[order]
+
+    # Every lap is stretched onto the reference distance, so the boundaries sit at the same
+    # place on track whatever line the car took
+    lap_distance = np.maximum.reduceat(distance, np.r_[0, np.flatnonzero(np.diff(codes)) + 1])
+    complete = lap_distance >= MIN_LAP_COVERAGE * lap_length
+    progress = distance / lap_distance[codes]
+
+    # Laps laid end to end on one axis, one interpolation gives the time at every boundary of every lap
+    boundaries = np.linspace(0, 1, n_minisectors + 1)
+    sample_axis = progress + codes * 2
+    boundary_axis = (boundaries[None, :] + (np.arange(len(laps)) * 2)[:, None]).ravel()
+    boundary_time = np.interp(boundary_axis, sample_axis, time).reshape(len(laps), n_minisectors + 1)
+
+    if lap_times is not None:
+        line_time = lap_times.reindex(laps).to_numpy(dtype=float)
+        boundary_time[:, -1] = np.where(np.isnan(line_time), boundary_time[:, -1], line_time)
+
+    sector_time = np.diff(boundary_time, axis=1)
+    sector_time[~complete] = np.nan
+
+    driver, lap_number = laps.get_level_values(0), laps.get_level_values(1)
+    teams = telemetry.groupby(["driver", "lap"])["Team"].first().reindex(laps).to_numpy() if "Team" in telemetry.columns else None
+
+    df_minisectors = pd.DataFrame({
+        "Driver": np.repeat(driver, n_minisectors),
+        "LapNumber": np.repeat(lap_number, n_minisectors),
+        "Minisector": np.tile(np.arange(1, n_minisectors + 1), len(laps)),
+        "MinisectorTime": sector_time.ravel(),
+    })
+    if teams is not None:
+        df_minisectors.insert(1, "Team", np.repeat(teams, n_minisectors))
+
+    return df_minisectors.dropna(subset=["MinisectorTime"]).reset_index(drop=True)
+
+
+
+def load_minisectors(session_dir: str, n_minisectors: int = N_MINISECTORS, persist: bool = True) -> tuple:
+    """
+    Returns the minisector table and the reference lap (with the minisector of every point) of a
+    session, building and persisting both when telemetry_data.parquet is newer than the table.
+
+    Arguments:
+    - session_dir (str): directory holding laps.parquet and telemetry_data.parquet
+    - n_minisectors (int): number of equal length minisectors
+    - persist (bool): store both tables, False builds them in memory only (the dashboard)
+
+    Return:
+    - minisector times (pd.DataFrame), reference lap (pd.DataFrame)
+    """
+
+    telemetry_path = f"{session_dir}/telemetry_data.parquet"
+    file_path = f"{session_dir}/{MINISECTORS_FILE.format(n=n_minisectors)}"
+    reference_path = f"{session_dir}/{REFERENCE_FILE.format(n=n_minisectors)}"
+
+    if os.path.exists(file_path) and os.stat(file_path).st_mtime_ns >= os.stat(telemetry_path).st_mtime_ns:
+        return data_access.read_parquet(file_path), data_access.read_parquet(reference_path)
+
+    df_reference = reference_lap(session_dir)
+    lap_length = df_reference["Distance"].max()
+    df_reference["Minisector"] = np.minimum((df_reference["Distance"] / lap_length * n_minisectors).astype(int) + 1, n_minisectors)
+
+    df_laps = data_access.read_table(session_dir, "laps", columns=["Driver", "LapNumber", "LapTime"])
+    lap_times = df_laps.set_index(["Driver", "LapNumber"])["LapTime"].dt.total_seconds()
+
+    df_minisectors = minisector_times(data_access.read_table(session_dir, "telemetry", columns=TELEMETRY_COLUMNS), lap_length, n_minisectors, lap_times)
+
+    if not persist:
+        return df_minisectors, df_reference
+
+    with data_access.replacing(reference_path) as tmp_path:
+        df_reference.to_parquet(tmp_path, index=False)
+
+    # Table last, its mtime marks both files as up to date
+    with data_access.replacing(file_path) as tmp_path:
+        df_minisectors.to_parquet(tmp_path, index=False)
+
+    return df_minisectors, df_reference
+
+
+
+def fastest_per_minisector(minisectors: pd.DataFrame, by: str = "Team") -> pd.DataFrame:
+    # Quickest time anyone set through each minisector and who set it
+    fastest = minisectors.loc[minisectors.groupby("Minisector")["MinisectorTime"].idxmin()]
+    return fastest[["Minisector", by, "Driver", "LapNumber", "MinisectorTime"]].reset_index(drop=True)
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+    import time
+
+    session_dir = sys.argv[1] if len(sys.argv) > 1 else "/tmp/f1_data/2025/2025-03-23_chinese_grand_prix/race"
+
+    start = time.perf_counter()
+    df_minisectors, df_reference = load_minisectors(session_dir)
+    print(f"{len(df_minisectors)} minisector times in {time.perf_counter() - start:.3f}s")
+
+    # Minisectors of a complete lap add up to its lap time
+    df_laps = pd.read_parquet(f"{session_dir}/laps.parquet", columns=["Driver", "LapNumber", "LapTime"])
+    lap_sums = df_minisectors.groupby(["Driver", "LapNumber"])["MinisectorTime"].sum()
+    print((lap_sums - df_laps.set_index(["Driver", "LapNumber"])["LapTime"].dt.total_seconds().reindex(lap_sums.index)).abs().describe())
+
+    print(fastest_per_minisector(df_minisectors).head())
@@ -2,15 +2,21 @@ import matplotlib.pyplot as plt
 from matplotlib import colormaps
 # from matplotlib.patches import Patch
 from matplotlib.collections import LineCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import matplotlib as mpl
 
-import seaborn as sns
-import plotly
 import pandas as pd
 import numpy as np 
 import re
+import colorsys
 from typing import Dict
 
+import data_access
+import lap_stats
+import race_gaps
+import season_speed
+
 import matplotlib.patches as mpatches
 # from adjustText import adjust_text
 
@@ -18,6 +24,24 @@ plt.style.use('dark_background')
 
 master_dir = "/Users/bartosz/f1_data"
 
+# Telemetry columns the gear shift and speed track maps draw from
+TRACK_MAP_COLUMNS = ["driver", "lap", "X", "Y", "nGear", "Speed"]
+
+
+
+def new_figure(
+        nrows: int = 1,
+        ncols: int = 1,
+        figsize: tuple = None,
+        constrained_layout: bool = False,
+        **subplot_kw) -> tuple:
+
+    # Like plt.subplots, but the figure is not registered with pyplot and draws on its own Agg
+    # canvas, so several figures can be drawn from different threads without shared state
+    fig = Figure(figsize=figsize, layout="constrained" if constrained_layout else None)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots(nrows, ncols, **subplot_kw)
+
 def add_watermark(
         fig,
         watermark_text: str = "FORMULA STATS",
@@ -50,13 +74,8 @@ def get_teams_order(
         session: str,
         fastest_first: bool = True) -> pd.Index:
     
-    df_schedule = pd.read_parquet(f"{dir}/{year}/schedule.parquet", columns=["EventName", "EventDate", "DirName"])
-    dir_name = df_schedule[df_schedule["EventName"] == event]["DirName"].iloc[0]
-    
-    df_laps = pd.read_parquet(
-        f"{dir}/{year}/{dir_name}/{session}/laps.parquet",
-        columns=["LapTime", "Team"]
-    )
+    session_dir = data_access.find_session_dir(dir, year, event, session)
+    df_laps = data_access.read_table(session_dir, "laps", columns=["LapTime", "Team"])
 
     df_laps["Lap Time (s)"] = df_laps["LapTime"].dt.total_seconds()
 
@@ -73,13 +92,8 @@ def get_drivers_order(
         session: str,
         fastest_first: bool = True) -> pd.Index:
     
-    df_schedule = pd.read_parquet(f"{dir}/{year}/schedule.parquet", columns=["EventName", "EventDate", "DirName"])
-    dir_name = df_schedule[df_schedule["EventName"] == event]["DirName"].iloc[0]
-    
-    df_laps = pd.read_parquet(
-        f"{dir}/{year}/{dir_name}/{session}/laps.parquet",
-        columns=["LapTime", "Driver"]
-    )
+    session_dir = data_access.find_session_dir(dir, year, event, session)
+    df_laps = data_access.read_table(session_dir, "laps", columns=["LapTime", "Driver"])
 
     df_laps["Lap Time (s)"] = df_laps["LapTime"].dt.total_seconds()
 
@@ -96,15 +110,10 @@ def get_teams_colors(
         session: str = None,
         color_map: str = "fastf1") -> Dict[str, str]:
     
-    df_schedule = pd.read_parquet(f"{dir}/{year}/schedule.parquet", columns=["EventName", "EventDate", "DirName"])
-    dir_name = df_schedule[df_schedule["EventName"] == event]["DirName"].iloc[0]
-
     color_column = "TeamColorOfficial" if color_map == "official" else "TeamColorFastf1"
 
-    df_results = pd.read_parquet(
-        f"{dir}/{year}/{dir_name}/{session}/results.parquet",
-        columns=["TeamName", color_column]
-    ).dropna(subset=["TeamName", color_column])
+    session_dir = data_access.find_session_dir(dir, year, event, session)
+    df_results = data_access.read_table(session_dir, "results", columns=["TeamName", color_column]).dropna(subset=["TeamName", color_column])
 
     # Ensure colors are properly formatted, fallback to white
     teams_colors = {
@@ -130,6 +139,161 @@ def format_lap_time(seconds: float) -> str:
 
 
 
+def filter_laps_by_weather(
+        laps: pd.DataFrame,
+        conditions: str = "All",
+        track_temp_range: tuple = None) -> pd.DataFrame:
+
+    # Laps without materialized weather are kept as they are
+    if "TrackTemp" not in laps.columns:
+        return laps
+
+    if conditions == "Dry":
+        laps = laps[laps["Rainfall"] != True]
+    elif conditions == "Wet":
+        laps = laps[laps["Rainfall"] == True]
+
+    if track_temp_range is not None:
+        laps = laps[laps["TrackTemp"].between(*track_temp_range)]
+
+    return laps
+
+
+
+def normalize_lap_times_by_track_temp(
+        laps: pd.DataFrame,
+        reference_temp: float = None) -> pd.DataFrame:
+
+    # Without weather or with constant track temperature there is nothing to correct
+    if "TrackTemp" not in laps.columns or laps["TrackTemp"].nunique() < 2:
+        return laps
+
+    laps = laps.copy()
+    valid = laps["Lap Time (s)"].notna() & laps["TrackTemp"].notna()
+
+    # Fit only on representative laps, in/out laps and neutralised laps would dominate the slope
+    fit = valid & laps.index.isin(lap_stats.remove_lap_time_outliers(laps).index)
+    if "LapStatus" in laps.columns:
+        fit &= laps["LapStatus"] == "Green"
+
+    # Pooled within-driver slope of lap time against track temperature, so differences in
+    # pace between drivers don't leak into the temperature effect
+    x = laps.loc[fit, "TrackTemp"]
+    y = laps.loc[fit, "Lap Time (s)"]
+    x_dev = x - x.groupby(laps.loc[fit, "Driver"]).transform("mean")
+    y_dev = y - y.groupby(laps.loc[fit, "Driver"]).transform("mean")
+
+    denominator = (x_dev ** 2).sum()
+    if denominator == 0:
+        return laps
+
+    slope = (x_dev * y_dev).sum() / denominator
+
+    if reference_temp is None:
+        reference_temp = x.median()
+
+    laps.loc[valid, "Lap Time (s)"] = laps.loc[valid, "Lap Time (s)"] - slope * (laps.loc[valid, "TrackTemp"] - reference_temp)
+
+    return laps
+
+
+
+def sample_laps_by_compound(
+        laps: pd.DataFrame,
+        budget: int,
+        seed: int = 0) -> pd.DataFrame:
+
+    if len(laps) <= budget:
+        return laps
+
+    # Every driver/compound stratum keeps its share of the budget (at least one lap), so the
+    # sampled points follow the same distribution as the full race
+    strata = ["Driver", "Compound"]
+    shuffled = laps.sample(frac=1, random_state=seed)
+    stratum_size = shuffled.groupby(strata)["Lap Time (s)"].transform("size")
+    keep = np.maximum(np.round(stratum_size * budget / len(laps)), 1)
+
+    return shuffled[shuffled.groupby(strata).cumcount() < keep].sort_index()
+
+
+
+def beeswarm_offsets(
+        values: np.ndarray,
+        point_height: float,
+        point_width: float,
+        max_width: float) -> np.ndarray:
+
+    if len(values) == 0:
+        return np.zeros(0)
+
+    # Points less than one marker apart vertically share a row and are spread sideways,
+    # alternating right and left of the centre: 0, +1, -1, +2, -2, ...
+    rows = np.floor(values / point_height).astype(np.int64)
+    order = np.argsort(rows, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(rows[order]) != 0])
+    counts = np.diff(np.r_[starts, len(values)])
+    rank = np.arange(len(values)) - np.repeat(starts, counts)
+    slot = np.where(rank % 2 == 1, (rank + 1) // 2, -(rank // 2))
+
+    # Rows too crowded for the available width are squeezed instead of overflowing
+    outermost_slot = np.maximum(np.repeat(counts, counts) // 2, 1)
+    spacing = np.minimum(point_width, max_width / 2 / outermost_slot)
+
+    offsets = np.empty(len(values))
+    offsets[order] = slot * spacing
+
+    return offsets
+
+
+
+def _desaturate(color, prop: float = 0.75) -> tuple:
+    # Box and violin fills are toned down like seaborn's default saturation
+    hue, lightness, saturation = colorsys.rgb_to_hls(*mpl.colors.to_rgb(color))
+    return colorsys.hls_to_rgb(hue, lightness, saturation * prop)
+
+
+
+def _outline_color(colors) -> tuple:
+    # Grey a bit darker than the darkest fill, used for violin and flier outlines
+    lightness = min(colorsys.rgb_to_hls(*mpl.colors.to_rgb(color))[1] for color in colors) * 0.6
+    return (lightness, lightness, lightness)
+
+
+
+def _draw_lap_time_boxes(
+        ax: plt.Axes,
+        stats: pd.DataFrame,
+        by: str,
+        palette: Dict,
+        width: float) -> None:
+
+    drawn = stats[stats["Count"] > 0]
+    colors = [_desaturate(palette.get(name, "#FFFFFF")) for name in drawn[by]]
+
+    artists = ax.bxp(
+        lap_stats.to_bxp_stats(drawn),
+        positions=drawn.index.to_numpy(dtype=float),
+        widths=width,
+        capwidths=0.5 * width,
+        patch_artist=True,
+        manage_ticks=False,
+        boxprops=dict(edgecolor="white"),
+        whiskerprops=dict(color="white", solid_capstyle="butt"),
+        medianprops=dict(color="grey", solid_capstyle="butt"),
+        capprops=dict(color="white"),
+        flierprops=dict(marker='o', markerfacecolor='lightgrey', markeredgecolor=_outline_color(colors or ["#FFFFFF"]), markersize=5, linestyle='none')
+    )
+
+    for box, color in zip(artists["boxes"], colors):
+        box.set_facecolor(color)
+
+    ax.set_xlim(-0.5, len(stats) - 0.5)
+    ax.xaxis.grid(False)
+    ax.set_xlabel(by)
+    ax.set_ylabel("Lap Time (s)")
+
+
+
 def plot_team_lap_time_dist(
         laps: pd.DataFrame,
         year: int,
@@ -137,41 +301,21 @@ def plot_team_lap_time_dist(
         session: str,
         teams_colors: Dict,
         remove_outliers: str = "Yes",
+        stats: pd.DataFrame = None,
         watermark: bool = True) -> plt.Figure:
 
+    # Summaries can be computed once per session and outlier mode and passed in
+    if stats is None:
+        stats = lap_stats.compute_lap_time_stats(laps, "Team", remove_outliers)
 
-    if remove_outliers == "Yes":
-        Q1 = laps['Lap Time (s)'].quantile(0.25)
-        Q3 = laps['Lap Time (s)'].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        laps = laps[(laps['Lap Time (s)'] >= lower_bound) & (laps['Lap Time (s)'] <= upper_bound)]
-
-    teams_order = laps.groupby("Team")["Lap Time (s)"].median().sort_values().index
-
-    fig, ax = plt.subplots(figsize=(15, 8))
-
-    sns.boxplot(
-        data=laps,
-        x="Team",
-        y="Lap Time (s)",
-        hue="Team",
-        order=teams_order,
-        palette=teams_colors,
-        whiskerprops=dict(color="white"),
-        boxprops=dict(edgecolor="white"),
-        medianprops=dict(color="grey"),
-        capprops=dict(color="white"),
-        flierprops=dict(marker='o', markerfacecolor='lightgrey', markersize=5, linestyle='none'),
-        width=0.6,
-        dodge=False
-    )
+    fig, ax = new_figure(figsize=(15, 8))
 
-    avg_lap_times = laps.groupby('Team')['Lap Time (s)'].median().reindex(teams_order).dropna()
+    _draw_lap_time_boxes(ax, stats, "Team", teams_colors, width=0.6)
+
+    avg_lap_times = stats.set_index("Team")["Median"].dropna()
     tick_labels = [f"{team} \n {format_lap_time(avg_lap_time)}" for team, avg_lap_time in zip(avg_lap_times.index, avg_lap_times)]
 
-    plt.xticks(ticks=np.arange(len(tick_labels)), labels=tick_labels, rotation=45)
+    ax.set_xticks(np.arange(len(tick_labels)), labels=tick_labels, rotation=45)
     
     
     # Main title
@@ -181,7 +325,7 @@ def plot_team_lap_time_dist(
     ax.text(0.5, 1.02, f"{year} | {event} | {session.replace('_', ' ').title()}", ha='center', fontsize=13, color='white', transform=ax.transAxes)
 
 
-    plt.grid(visible=False)
+    ax.grid(visible=False)
     ax.set(xlabel=None)
 
     return add_watermark(fig) if watermark else fig
@@ -197,6 +341,8 @@ def plot_violin_dist_point_socrers(
         teams_colors: Dict,
         remove_outliers: str = "Yes",
         show_tyre_compounds: str = "Yes",
+        swarm_budget: int = 800,
+        stats: pd.DataFrame = None,
         watermark: bool = True) -> plt.Figure:
 
     finishing_order = results[:10]["Abbreviation"]
@@ -208,46 +354,70 @@ def plot_violin_dist_point_socrers(
 
 
     if remove_outliers == "Yes":
-        Q1 = laps['Lap Time (s)'].quantile(0.25)
-        Q3 = laps['Lap Time (s)'].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        laps = laps[(laps['Lap Time (s)'] >= lower_bound) & (laps['Lap Time (s)'] <= upper_bound)]
-
-    fig, ax = plt.subplots(figsize=(15, 8))
-
-    # Driver laps violin plot
-    sns.violinplot(data=laps,
-                    x="Driver",
-                    y="Lap Time (s)",
-                    hue="Driver",
-                    inner=None,
-                    scale="width",
-                    density_norm="area",
-                    order=finishing_order,
-                    dodge=False,
-                    palette=palette,
-                    ax=ax
-                    )
+        laps = lap_stats.remove_lap_time_outliers(laps)
+
+    if stats is None:
+        stats = lap_stats.compute_lap_time_stats(laps, "Driver", "No", kde=True)
+
+    fig, ax = new_figure(figsize=(15, 8))
+
+    # Driver laps violin plot, every violin scaled to the same width at its densest point
+    x_position = {driver: i for i, driver in enumerate(finishing_order)}
+    violins = stats[stats["Driver"].isin(x_position) & lap_stats.has_density(stats)]
+    colors = [_desaturate(palette.get(driver, "#FFFFFF")) for driver in violins["Driver"]]
+    outline = _outline_color(colors or ["#FFFFFF"])
+    linewidth = 1.25 * mpl.rcParams["patch.linewidth"]
+
+    if len(violins):
+        artists = ax.violin(
+            lap_stats.to_violin_stats(violins),
+            positions=violins["Driver"].map(x_position).to_numpy(dtype=float),
+            widths=0.8,
+            showextrema=False,
+            facecolor=colors,
+            linecolor=outline
+        )
+        for body in artists["bodies"]:
+            body.set_edgecolor(outline)
+            body.set_linewidth(linewidth)
+
+    # Drivers with a single lap (or identical laps) get a flat line at their lap time
+    for row in stats[stats["Driver"].isin(x_position) & ~lap_stats.has_density(stats) & (stats["Count"] > 0)].itertuples(index=False):
+        ax.plot([x_position[row.Driver] - 0.4, x_position[row.Driver] + 0.4], [row.Mean, row.Mean], color=outline, linewidth=linewidth)
+
+    ax.set_xticks(np.arange(len(finishing_order)), labels=finishing_order)
+    ax.set_xlim(-0.5, len(finishing_order) - 0.5)
+    ax.xaxis.grid(False)
 
     if show_tyre_compounds == "Yes":
         compound_palette = dict(zip(laps["Compound"].unique(), laps.drop_duplicates(subset=["Compound"])["CompoundColor"]))
+
+        swarm_laps = laps[laps["Driver"].isin(finishing_order) & laps["Lap Time (s)"].notna()]
+        swarm_laps = sample_laps_by_compound(swarm_laps, swarm_budget)
+
+        # Marker size in data units, the violins have already fixed the axes limits
+        marker_size = 5
+        bbox = ax.get_window_extent()
+        points_per_pixel = 72 / fig.dpi
+        y_per_point = np.ptp(ax.get_ylim()) / (bbox.height * points_per_pixel)
+        x_per_point = np.ptp(ax.get_xlim()) / (bbox.width * points_per_pixel)
+
+        x_position = {driver: i for i, driver in enumerate(finishing_order)}
+        x = np.zeros(len(swarm_laps))
+        y = swarm_laps["Lap Time (s)"].to_numpy()
+        drivers = swarm_laps["Driver"].to_numpy()
+
+        for driver, i in x_position.items():
+            mask = drivers == driver
+            x[mask] = i + beeswarm_offsets(y[mask], marker_size * y_per_point, marker_size * x_per_point, 0.8)
+
         # Tyre compounds plot
-        sns.swarmplot(data=laps,
-                    x="Driver",
-                    y="Lap Time (s)",
-                    order=finishing_order,
-                    hue="Compound",
-                    palette=compound_palette,
-                    hue_order=list(compound_palette.keys()),
-                    dodge=False,
-                    linewidth=1,
-                    edgecolor='black',
-                    size=5,
-                    ax=ax
-                    )
-        
+        compounds = swarm_laps["Compound"].to_numpy()
+        for compound, color in compound_palette.items():
+            mask = compounds == compound
+            if mask.any():
+                ax.scatter(x[mask], y[mask], s=marker_size ** 2, color=color, edgecolor='black', linewidth=1, label=compound, zorder=3)
+
         ax.legend(fontsize=12, title="Tyre Compound", title_fontsize=12, markerscale=2.5)
 
     ax.set_xlabel("Driver")
@@ -272,52 +442,31 @@ def plot_drivers_lap_time_dist(
         session: str,
         teams_colors: Dict,
         remove_outliers: str = "Yes",
+        stats: pd.DataFrame = None,
         watermark: bool = True) -> plt.Figure:
-    
+
     # Create a palette mapping driver to team color
     palette = {
         driver: teams_colors.get(team_name, "#FFFFFF")
         for driver, team_name in zip(results["Abbreviation"], results["TeamName"])
     }
 
-    if remove_outliers == "Yes":
-        Q1 = laps['Lap Time (s)'].quantile(0.25)
-        Q3 = laps['Lap Time (s)'].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        laps = laps[(laps['Lap Time (s)'] >= lower_bound) & (laps['Lap Time (s)'] <= upper_bound)]
-
-    fig, ax = plt.subplots(figsize=(15, 8))
-
-    # Order drivers by median lap time
-    drivers_order = laps.groupby("Driver")["Lap Time (s)"].median().sort_values().index
+    # Drivers ordered by median lap time
+    if stats is None:
+        stats = lap_stats.compute_lap_time_stats(laps, "Driver", remove_outliers)
 
-    avg_lap_times = laps.groupby('Driver')['Lap Time (s)'].median().reindex(drivers_order)
+    fig, ax = new_figure(figsize=(15, 8))
 
     tick_labels = [
         f"{driver} \n {format_lap_time(avg_lap_time) if not pd.isna(avg_lap_time) else 'No Data'}"
-        for driver, avg_lap_time in zip(avg_lap_times.index, avg_lap_times)
+        for driver, avg_lap_time in zip(stats["Driver"], stats["Median"])
     ]
 
-    sns.boxplot(data=laps,
-                x="Driver",
-                y="Lap Time (s)",
-                hue="Driver",
-                order=drivers_order,
-                palette=palette,
-                whiskerprops=dict(color="white"),
-                boxprops=dict(edgecolor="white"),
-                medianprops=dict(color="grey"),
-                capprops=dict(color="white"),
-                flierprops=dict(marker='o', markerfacecolor='lightgrey', markersize=5, linestyle='none'),
-                width=0.5,
-                dodge=False
-                )
+    _draw_lap_time_boxes(ax, stats, "Driver", palette, width=0.5)
     
     # Set custom x-ticks with rotation and labels
-    plt.xticks(
-        ticks=np.arange(len(tick_labels)),
+    ax.set_xticks(
+        np.arange(len(tick_labels)),
         labels=tick_labels,
         ha='center',
         rotation=45,
@@ -360,7 +509,7 @@ def plot_weather_data(
     # df_weather = pd.read_parquet(f"{dir}/{year}/{dir_name}/{session}/weather.parquet")
     
     # Convert Time to minutes
-    weather["Time (m)"] = weather["Time"].dt.total_seconds() // 60
+    time_minutes = weather["Time"].dt.total_seconds() // 60
     
     # Define the available plots for each weather element
     plot_data = {
@@ -388,7 +537,7 @@ def plot_weather_data(
         ]
 
     # Adjust number of rows based on selected elements
-    fig, ax = plt.subplots(num_plots, gridspec_kw={'height_ratios': height_ratios}, constrained_layout=True, figsize=(12, 2 * num_plots))
+    fig, ax = new_figure(num_plots, gridspec_kw={'height_ratios': height_ratios}, constrained_layout=True, figsize=(12, 2 * num_plots))
 
     # Ensure ax is always an array, even for one plot
     if num_plots == 1:
@@ -397,7 +546,7 @@ def plot_weather_data(
     # Plot the selected elements in the order they were chosen
     for i, element in enumerate(elements_to_plot):
         data = plot_data[element]
-        ax[i].plot(weather["Time (m)"], data["data"], color=data["color"], linewidth=2)
+        ax[i].plot(time_minutes, data["data"], color=data["color"], linewidth=2)
         ax[i].set_ylabel(data["ylabel"], color='white', fontsize=12)
         
         # Custom ticks for Rainfall
@@ -427,8 +576,280 @@ def plot_weather_data(
 
 
 
-def plot_telemetry():
-    pass
+def _race_lines(
+        ax: plt.Axes,
+        gaps: pd.DataFrame,
+        column: str,
+        teams_colors: Dict,
+        drivers: list = None) -> list:
+
+    # Drivers in finishing order, the second driver of each team dashed
+    finishing_order = list(race_gaps.finishing_order(gaps))
+    if drivers:
+        finishing_order = [driver for driver in finishing_order if driver in drivers]
+
+    seen_teams = set()
+    for driver in finishing_order:
+        df_driver = gaps[gaps["Driver"] == driver].sort_values("LapNumber")
+        team = df_driver["Team"].iloc[-1] if "Team" in df_driver.columns else None
+        color = teams_colors.get(team, "#FFFFFF")
+
+        ax.plot(df_driver["LapNumber"], df_driver[column], color=color, linestyle="--" if team in seen_teams else "-", linewidth=2, label=driver)
+
+        # Pit stops as hollow markers on the line
+        pit_laps = df_driver[df_driver["PitLap"]]
+        ax.scatter(pit_laps["LapNumber"], pit_laps[column], s=30, facecolor="black", edgecolor=color, zorder=3)
+
+        seen_teams.add(team)
+
+    ax.xaxis.set_major_locator(mpl.ticker.MaxNLocator(integer=True))
+
+    return finishing_order
+
+
+
+def plot_gap_to_leader(
+        gaps: pd.DataFrame,
+        year: int,
+        event: str,
+        session: str,
+        teams_colors: Dict,
+        drivers: list = None,
+        watermark: bool = True) -> plt.Figure:
+
+    fig, ax = new_figure(figsize=(15, 8))
+
+    _race_lines(ax, gaps, "GapToLeader", teams_colors, drivers)
+
+    # Leader on top, cars further back lower down
+    ax.invert_yaxis()
+    ax.set_xlabel("Lap")
+    ax.set_ylabel("Gap To Leader (s)")
+    ax.grid(True, linestyle='--', alpha=0.3)
+    ax.legend(title="Driver", loc='upper left', bbox_to_anchor=(1, 1), fontsize=9)
+
+    # Main title
+    ax.set_title("Gap To Leader", fontsize=18, color='white', fontweight='bold', y=1.05)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {event} | {session.replace('_', ' ').title()} | Circles mark pit laps", ha='center', fontsize=13, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig) if watermark else fig
+
+
+
+def plot_interval_matrix(
+        gaps: pd.DataFrame,
+        year: int,
+        event: str,
+        session: str,
+        max_interval: float = 5,
+        watermark: bool = True) -> plt.Figure:
+
+    matrix = race_gaps.gap_matrix(gaps, "Interval")
+
+    fig, ax = new_figure(figsize=(15, 8))
+
+    # Intervals under a second (DRS range) stand out, anything beyond max_interval is one colour
+    mesh = ax.pcolormesh(
+        matrix.columns.to_numpy(dtype=float),
+        np.arange(len(matrix)),
+        np.ma.masked_invalid(matrix.to_numpy(dtype=float)),
+        cmap=colormaps["magma"],
+        vmin=0,
+        vmax=max_interval,
+        shading="nearest"
+    )
+
+    ax.set_yticks(np.arange(len(matrix)), labels=matrix.index)
+    ax.invert_yaxis()
+    ax.xaxis.set_major_locator(mpl.ticker.MaxNLocator(integer=True))
+    ax.set_xlabel("Lap")
+
+    cbar = fig.colorbar(mesh, ax=ax, label="Interval To Car Ahead (s)", extend="max")
+    cbar.ax.axhline(1, color="white", linewidth=1)
+
+    # Main title
+    ax.set_title("Interval To Car Ahead", fontsize=18, color='white', fontweight='bold', y=1.05)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {event} | {session.replace('_', ' ').title()}", ha='center', fontsize=13, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig) if watermark else fig
+
+
+
+def plot_position_changes(
+        gaps: pd.DataFrame,
+        year: int,
+        event: str,
+        session: str,
+        teams_colors: Dict,
+        drivers: list = None,
+        watermark: bool = True) -> plt.Figure:
+
+    fig, ax = new_figure(figsize=(15, 8))
+
+    finishing_order = _race_lines(ax, gaps, "Position", teams_colors, drivers)
+
+    # Driver codes at the end of every line
+    last_laps = gaps.sort_values("LapNumber").groupby("Driver").last()
+    for driver in finishing_order:
+        ax.text(last_laps.loc[driver, "LapNumber"] + 0.3, last_laps.loc[driver, "Position"], driver, va="center", fontsize=9, color="white")
+
+    ax.invert_yaxis()
+    ax.set_yticks(np.arange(1, gaps["Position"].max() + 1))
+    ax.set_xlabel("Lap")
+    ax.set_ylabel("Position")
+    ax.grid(True, axis="y", linestyle='--', alpha=0.3)
+
+    # Main title
+    ax.set_title("Position Changes", fontsize=18, color='white', fontweight='bold', y=1.05)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {event} | {session.replace('_', ' ').title()} | Circles mark pit laps", ha='center', fontsize=13, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig) if watermark else fig
+
+
+
+def plot_race_replay_frame(
+        frames: pd.DataFrame,
+        frame_time: float,
+        track: pd.DataFrame,
+        drivers_colors: Dict,
+        year: int,
+        event: str,
+        session: str,
+        trail_seconds: float = 5,
+        watermark: bool = True,
+        rotation_angle: float = 0
+        ) -> plt.Figure:
+
+    # Rotation matrix for counter-clockwise rotation, same as the other track maps
+    angle_rad = np.deg2rad(rotation_angle)
+    rotation_matrix = np.array([[np.cos(angle_rad), -np.sin(angle_rad)],
+                                [np.sin(angle_rad), np.cos(angle_rad)]])
+
+    fig, ax = new_figure(figsize=(10, 8))
+
+    if len(track):
+        outline = track[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix
+        ax.plot(outline[:, 0], outline[:, 1], color="grey", linewidth=8, alpha=0.4, solid_capstyle="round", zorder=1)
+
+    # Last few seconds of every car as a fading trail, the car itself at the frame time
+    trail = frames[frames["FrameTime"].between(frame_time - trail_seconds, frame_time)]
+    current = trail[trail["FrameTime"] == trail["FrameTime"].max()] if len(trail) else trail
+
+    for driver, df_driver in trail.groupby("Driver", observed=True):
+        points = df_driver[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix
+        ax.plot(points[:, 0], points[:, 1], color=drivers_colors.get(driver, "#FFFFFF"), linewidth=2, alpha=0.5, zorder=2)
+
+    points = current[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix
+    colors = [drivers_colors.get(driver, "#FFFFFF") for driver in current["Driver"]]
+    ax.scatter(points[:, 0], points[:, 1], s=120, color=colors, edgecolor="white", linewidth=1, zorder=3)
+
+    for (x, y), driver in zip(points, current["Driver"]):
+        ax.annotate(driver, (x, y), xytext=(6, 6), textcoords="offset points", fontsize=9, color="white", fontweight="bold", zorder=4)
+
+    ax.set_aspect("equal", adjustable="datalim")
+    ax.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    leader_lap = int(current["LapNumber"].max()) if len(current) else 0
+
+    # Main title
+    ax.set_title("Race Replay", fontsize=18, color='white', fontweight='bold', y=1.04)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {event} | {session.replace('_', ' ').title()} | Lap: {leader_lap} | Session Time: {int(frame_time) // 3600}:{int(frame_time) % 3600 // 60:02d}:{int(frame_time) % 60:02d}",
+            ha='center', fontsize=10, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig, fontsize=60) if watermark else fig
+
+
+
+# Panel labels and relative heights of the telemetry channels
+TELEMETRY_PANELS = {
+    "Speed": ("Speed (km/h)", 3),
+    "Throttle": ("Throttle (%)", 1.2),
+    "Brake": ("Brake", 0.6),
+    "RPM": ("RPM", 1.2),
+    "nGear": ("Gear", 1),
+    "DRS": ("DRS", 0.6),
+}
+
+
+
+def plot_telemetry(
+        telemetry: pd.DataFrame,
+        laps: pd.DataFrame,
+        year: int,
+        event: str,
+        session: str,
+        teams_colors: Dict,
+        channels: list = None,
+        watermark: bool = True,
+        corners: pd.DataFrame = None
+        ) -> plt.Figure:
+
+    # One panel per channel on a shared distance axis, telemetry is already on one grid
+    # (lap_telemetry.resample_to_distance) so every driver's line lines up sample for sample
+    channels = [channel for channel in (channels or list(TELEMETRY_PANELS)) if channel in telemetry.columns]
+
+    fig, axes = new_figure(
+        nrows=max(len(channels), 1),
+        figsize=(15, 2 + 1.6 * sum(TELEMETRY_PANELS[channel][1] for channel in channels)),
+        sharex=True,
+        squeeze=False,
+        gridspec_kw={"height_ratios": [TELEMETRY_PANELS[channel][1] for channel in channels] or [1]})
+    axes = axes[:, 0]
+
+    # Drivers fastest first, the second driver of each team dashed
+    seen_teams = set()
+    for row in laps.itertuples(index=False):
+        df_lap = telemetry[(telemetry["Driver"] == row.Driver) & (telemetry["LapNumber"] == row.LapNumber)]
+        team = getattr(row, "Team", None)
+        color = teams_colors.get(team, "#FFFFFF")
+        lap_time = format_lap_time(row.LapTime) if pd.notna(row.LapTime) else "No Time"
+
+        for ax, channel in zip(axes, channels):
+            ax.plot(df_lap["Distance"], df_lap[channel], color=color, linestyle="--" if team in seen_teams else "-", linewidth=1.2,
+                    drawstyle="steps-post" if channel in ["Brake", "nGear", "DRS"] else "default",
+                    label=f"{row.Driver} | Lap {row.LapNumber} | {lap_time}")
+
+        seen_teams.add(team)
+
+    for ax, channel in zip(axes, channels):
+        ax.set_ylabel(TELEMETRY_PANELS[channel][0], fontsize=11, color="white")
+        ax.grid(axis="y", linestyle="--", alpha=0.3)
+
+        # Corners of the stored circuit as dotted lines, numbered above the top panel
+        if corners is not None and not corners.empty:
+            for distance in corners.loc[corners["Kind"] == "Corner", "Distance"]:
+                ax.axvline(distance, color="grey", linestyle=":", linewidth=0.8, zorder=0)
+
+    if "Brake" in channels:
+        axes[channels.index("Brake")].set_yticks([0, 1], labels=["Off", "On"])
+    if "nGear" in channels:
+        axes[channels.index("nGear")].yaxis.set_major_locator(mpl.ticker.MaxNLocator(integer=True))
+
+    if corners is not None and not corners.empty:
+        for distance, label in zip(corners.loc[corners["Kind"] == "Corner", "Distance"], corners.loc[corners["Kind"] == "Corner", "Label"]):
+            axes[0].text(distance, 1.0, label, transform=axes[0].get_xaxis_transform(), ha="center", va="bottom", fontsize=8, color="grey")
+
+    axes[-1].set_xlabel("Distance (m)", fontsize=12, color="white")
+    if len(laps) and channels:
+        axes[0].legend(loc="upper left", bbox_to_anchor=(1, 1), frameon=False, fontsize=9, labelcolor="white")
+
+    # Main title
+    axes[0].set_title("Telemetry Comparison", fontsize=18, color='white', fontweight='bold', y=1.25)
+
+    # Subtitle positioned below the main title
+    axes[0].text(0.5, 1.12, f"{year} | {event} | {session.replace('_', ' ').title()}", ha='center', fontsize=13, color='white', transform=axes[0].transAxes)
+
+    return add_watermark(fig, fontsize=60) if watermark else fig
 
 
 
@@ -445,14 +866,9 @@ def plot_team_pace_comparison(
         watermark: bool = True) -> plt.Figure:
 
     if remove_outliers == "Yes":
-        Q1 = laps['Lap Time (s)'].quantile(0.25)
-        Q3 = laps['Lap Time (s)'].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        laps = laps[(laps['Lap Time (s)'] >= lower_bound) & (laps['Lap Time (s)'] <= upper_bound)]
+        laps = lap_stats.remove_lap_time_outliers(laps)
 
-    fig, ax = plt.subplots(figsize=(15, 8))
+    fig, ax = new_figure(figsize=(15, 8))
 
     laps = laps.sort_values("LapTime")
 
@@ -480,7 +896,8 @@ def plot_team_pace_comparison(
                 f"Team{lap}Lap": 'first'
             }).reset_index()
     
-    results = results.sort_values(by=f"PercentageDiff{lap}Lap")
+    # Teams without a timed lap left after filtering have nothing to compare
+    results = results.dropna(subset=[f"Team{lap}Lap"]).sort_values(by=f"PercentageDiff{lap}Lap")
 
     ax.bar(results["TeamName"], results[f"PercentageDiff{lap}Lap"], color=results['TeamColorFastf1'])
 
@@ -502,7 +919,7 @@ def plot_team_pace_comparison(
     ax.set_xticks(np.arange(len(results["TeamName"])))
     ax.set_xticklabels(tick_labels, rotation=45)
 
-    ax.set_ylim(results[f"PercentageDiff{lap}Lap"].max() + 1, 0)
+    ax.set_ylim(results[f"PercentageDiff{lap}Lap"].max() + 1 if len(results) else 1, 0)
 
     # Main title
     ax.set_title("Team Pace Comparison", fontsize=18, color='white', fontweight='bold', y=1.05)
@@ -514,6 +931,69 @@ def plot_team_pace_comparison(
 
 
 
+def _annotate_corners(ax, markers: pd.DataFrame, rotation_matrix: np.ndarray) -> None:
+    # Corner numbers of the stored circuit, see circuits.py
+    if markers is None or markers.empty:
+        return
+
+    corners = markers[markers["Kind"] == "Corner"]
+    points = corners[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix
+    for (x, y), label in zip(points, corners["Label"]):
+        ax.annotate(label, (x, y), xytext=(8, 8), textcoords="offset points", fontsize=9, color="white",
+                    fontweight="bold", bbox=dict(boxstyle="circle,pad=0.2", facecolor="#404040", edgecolor="none"))
+
+
+
+def plot_circuit_map(
+        outline: pd.DataFrame,
+        markers: pd.DataFrame,
+        year: int,
+        event: str,
+        watermark: bool = True,
+        rotation_angle: float = 0
+        ) -> plt.Figure:
+
+    # Rotation matrix for counter-clockwise rotation, same as the other track maps
+    angle_rad = np.deg2rad(rotation_angle)
+    rotation_matrix = np.array([[np.cos(angle_rad), -np.sin(angle_rad)],
+                                [np.sin(angle_rad), np.cos(angle_rad)]])
+
+    fig, ax = new_figure(figsize=(10, 8))
+
+    points = outline[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix
+    ax.plot(points[:, 0], points[:, 1], color="grey", linewidth=8, solid_capstyle="round", zorder=1)
+
+    # Start line and direction of travel
+    if len(points) > 1:
+        ax.scatter(points[0, 0], points[0, 1], s=150, color="white", marker="s", zorder=3)
+        ax.annotate("", xy=points[min(20, len(points) - 1)], xytext=points[0],
+                    arrowprops=dict(arrowstyle="->", color="white", linewidth=2), zorder=3)
+
+    distance = markers[markers["Kind"] == "Distance"]
+    marks = distance[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix
+    ax.scatter(marks[:, 0], marks[:, 1], s=30, color="#FFD700", zorder=2)
+    for (x, y), label in zip(marks, distance["Label"]):
+        ax.annotate(label, (x, y), xytext=(-6, -12), textcoords="offset points", fontsize=8, color="#FFD700", ha="right")
+
+    _annotate_corners(ax, markers, rotation_matrix)
+
+    ax.set_aspect("equal", adjustable="datalim")
+    ax.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    lap_length = outline["Distance"].max() / 1000 if len(outline) else 0
+
+    # Main title
+    ax.set_title("Circuit Map", fontsize=18, color='white', fontweight='bold', y=1.04)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {event} | {lap_length:.3f} km | {(markers['Kind'] == 'Corner').sum()} corners", ha='center', fontsize=10, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig, fontsize=60) if watermark else fig
+
+
+
 def plot_gear_shifts_on_circuit(
         telemetry: pd.DataFrame,
         laps: pd.DataFrame,
@@ -523,7 +1003,8 @@ def plot_gear_shifts_on_circuit(
         lap: int,
         driver: str,
         watermark: bool = True,
-        rotation_angle: int = 0
+        rotation_angle: int = 0,
+        corners: pd.DataFrame = None
         ) -> plt.Figure:
     
     telemetry = telemetry[(telemetry["driver"] == driver) & (telemetry["lap"] == lap)]
@@ -548,17 +1029,19 @@ def plot_gear_shifts_on_circuit(
     rotated_segments = np.array(rotated_segments)
 
     cmap = colormaps['Paired']
-    lc_comp = LineCollection(rotated_segments, norm=plt.Normalize(1, cmap.N+1), cmap=cmap)
+    lc_comp = LineCollection(rotated_segments, norm=mpl.colors.Normalize(1, cmap.N+1), cmap=cmap)
     lc_comp.set_array(gear)
     lc_comp.set_linewidth(4)
     
-    fig, ax = plt.subplots(figsize=(10, 8))
+    fig, ax = new_figure(figsize=(10, 8))
+
+    ax.add_collection(lc_comp)
+    ax.axis('equal')
+    ax.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
 
-    plt.gca().add_collection(lc_comp)
-    plt.axis('equal')
-    plt.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
+    _annotate_corners(ax, corners, rotation_matrix)
 
-    cbar = plt.colorbar(mappable=lc_comp, label="Gear",
+    cbar = fig.colorbar(mappable=lc_comp, ax=ax, label="Gear",
                     boundaries=np.arange(1, 10))
     cbar.set_ticks(np.arange(1.5, 9.5))
     cbar.set_ticklabels(np.arange(1, 9))
@@ -575,6 +1058,59 @@ def plot_gear_shifts_on_circuit(
 
 
 
+def plot_fastest_team_per_minisector(
+        reference: pd.DataFrame,
+        fastest: pd.DataFrame,
+        teams_colors: Dict,
+        year: int,
+        event: str,
+        session: str,
+        watermark: bool = True,
+        rotation_angle: float = 0
+        ) -> plt.Figure:
+
+    # Rotation matrix for counter-clockwise rotation, same as the other track maps
+    angle_rad = np.deg2rad(rotation_angle)
+    rotation_matrix = np.array([[np.cos(angle_rad), -np.sin(angle_rad)],
+                                [np.sin(angle_rad), np.cos(angle_rad)]])
+
+    points = (reference[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix).reshape(-1, 1, 2)
+    segments = np.concatenate([points[:-1], points[1:]], axis=1)
+
+    # Every segment takes the colour of the team fastest through the minisector it starts in
+    team_of_minisector = fastest.set_index("Minisector")["Team"]
+    segment_teams = team_of_minisector.reindex(reference["Minisector"].to_numpy()[:-1]).to_numpy()
+    colors = [teams_colors.get(team, "#808080") for team in segment_teams]
+
+    fig, ax = new_figure(figsize=(10, 8))
+
+    ax.add_collection(LineCollection(segments, colors=colors, linewidth=5, capstyle="round"))
+    ax.set_aspect("equal", adjustable="datalim")
+    ax.autoscale_view()
+    ax.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    # Minisector numbers next to their start
+    starts = reference.groupby("Minisector")[["X", "Y"]].first().to_numpy(dtype=float) @ rotation_matrix
+    for number, (x, y) in enumerate(starts, start=1):
+        ax.annotate(str(number), (x, y), xytext=(6, 6), textcoords="offset points", fontsize=8, color="white")
+
+    # Legend with the number of minisectors each team owns, most first
+    owned = fastest["Team"].value_counts()
+    handles = [mpatches.Patch(color=teams_colors.get(team, "#808080"), label=f"{team} ({count})") for team, count in owned.items()]
+    ax.legend(handles=handles, loc="center left", bbox_to_anchor=(1.0, 0.5), frameon=False, fontsize=10, labelcolor="white")
+
+    # Main title
+    ax.set_title("Fastest Team Per Minisector", fontsize=18, color='white', fontweight='bold', y=1.04)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {event} | {session.replace('_', ' ').title()} | {len(fastest)} minisectors", ha='center', fontsize=10, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig, fontsize=60) if watermark else fig
+
+
+
 def plot_speed_over_lap(
         telemetry: pd.DataFrame,
         laps: pd.DataFrame,
@@ -584,7 +1120,8 @@ def plot_speed_over_lap(
         lap: int,
         driver: str,
         watermark: bool = True,
-        rotation_angle: float = 0
+        rotation_angle: float = 0,
+        corners: pd.DataFrame = None
         ) -> plt.Figure:
     
     telemetry = telemetry[(telemetry["driver"] == driver) & (telemetry["lap"] == lap)]
@@ -609,17 +1146,19 @@ def plot_speed_over_lap(
     rotated_segments = np.array(rotated_segments)
 
     cmap = mpl.cm.plasma
-    norm = plt.Normalize(vmin=50, vmax=350)  # Set fixed range for speed
+    norm = mpl.colors.Normalize(vmin=50, vmax=350)  # Set fixed range for speed
     lc_comp = LineCollection(rotated_segments, norm=norm, cmap=cmap, linewidth=4)
     lc_comp.set_array(speed)
 
-    fig, ax = plt.subplots(figsize=(10, 8))
+    fig, ax = new_figure(figsize=(10, 8))
     
-    plt.gca().add_collection(lc_comp)
-    plt.axis('equal')
-    plt.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
+    ax.add_collection(lc_comp)
+    ax.axis('equal')
+    ax.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
+
+    _annotate_corners(ax, corners, rotation_matrix)
 
-    cbar = plt.colorbar(mappable=lc_comp, label="Speed (km/h)")
+    cbar = fig.colorbar(mappable=lc_comp, ax=ax, label="Speed (km/h)")
     cbar.set_ticks(np.linspace(50, 350, num=6))
     cbar.set_ticklabels([f"{s:.0f}" for s in np.linspace(50, 350, num=6)])
 
@@ -633,12 +1172,398 @@ def plot_speed_over_lap(
 
 
 
-def plot_setup_performance():
-    pass
+def _fastest_lap_per_year(fastest_laps: pd.DataFrame) -> list:
+    # (year, lap telemetry) of the quickest lap of every season, oldest first
+    laps = []
+    for year, df_year in fastest_laps.groupby("Year"):
+        best = df_year.loc[df_year["LapTime"].idxmin(), ["driver", "lap"]]
+        df_lap = df_year[(df_year["driver"] == best["driver"]) & (df_year["lap"] == best["lap"])]
+        laps.append((year, df_lap.sort_values("Distance")))
+    return laps
+
+
+
+def plot_speed_traces_across_years(
+        fastest_laps: pd.DataFrame,
+        event: str,
+        session: str,
+        watermark: bool = True,
+        corners: pd.DataFrame = None
+        ) -> plt.Figure:
+
+    laps = _fastest_lap_per_year(fastest_laps)
+    colors = colormaps["viridis"](np.linspace(0.15, 1, len(laps)))
+
+    fig, ax = new_figure(figsize=(14, 7))
+
+    for (year, df_lap), color in zip(laps, colors):
+        label = f"{year} | {df_lap['driver'].iloc[0]} | {format_lap_time(df_lap['LapTime'].iloc[0])}"
+        ax.plot(df_lap["Distance"], df_lap["Speed"], color=color, linewidth=1.5, label=label)
+
+    # Corners of the stored circuit as dotted lines with their numbers on top
+    if corners is not None and not corners.empty:
+        for distance, label in zip(corners.loc[corners["Kind"] == "Corner", "Distance"], corners.loc[corners["Kind"] == "Corner", "Label"]):
+            ax.axvline(distance, color="grey", linestyle=":", linewidth=0.8, zorder=0)
+            ax.text(distance, 1.0, label, transform=ax.get_xaxis_transform(), ha="center", va="bottom", fontsize=8, color="grey")
+
+    ax.set_xlabel("Distance (m)", fontsize=12, color="white")
+    ax.set_ylabel("Speed (km/h)", fontsize=12, color="white")
+    ax.grid(axis="y", linestyle="--", alpha=0.3)
+    ax.legend(loc="lower right", frameon=False, fontsize=10, labelcolor="white")
+
+    years = f"{laps[0][0]}–{laps[-1][0]}" if laps else ""
+
+    # Main title
+    ax.set_title("Fastest Lap Speed Traces", fontsize=18, color='white', fontweight='bold', y=1.06)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.045, f"{event} | {session.replace('_', ' ').title()} | {years}", ha='center', fontsize=10, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig, fontsize=60) if watermark else fig
+
+
+
+def plot_fastest_year_on_track(
+        fastest_laps: pd.DataFrame,
+        event: str,
+        session: str,
+        watermark: bool = True,
+        rotation_angle: float = 0,
+        corners: pd.DataFrame = None
+        ) -> plt.Figure:
+
+    laps = _fastest_lap_per_year(fastest_laps)
+    colors = colormaps["viridis"](np.linspace(0.15, 1, len(laps)))
+
+    # The latest lap is the map, every season's speed is read at the same fraction of the lap
+    reference = laps[-1][1]
+    progress = reference["Distance"].to_numpy(dtype=float) / reference["Distance"].max()
+    speeds = np.array([
+        np.interp(progress, df_lap["Distance"].to_numpy(dtype=float) / df_lap["Distance"].max(), df_lap["Speed"].to_numpy(dtype=float))
+        for _, df_lap in laps
+    ])
+    fastest_year = np.argmax(speeds, axis=0)
+
+    # Rotation matrix for counter-clockwise rotation, same as the other track maps
+    angle_rad = np.deg2rad(rotation_angle)
+    rotation_matrix = np.array([[np.cos(angle_rad), -np.sin(angle_rad)],
+                                [np.sin(angle_rad), np.cos(angle_rad)]])
+
+    points = (reference[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix).reshape(-1, 1, 2)
+    segments = np.concatenate([points[:-1], points[1:]], axis=1)
+
+    fig, ax = new_figure(figsize=(10, 8))
+
+    ax.add_collection(LineCollection(segments, colors=colors[fastest_year[:-1]], linewidth=5, capstyle="round"))
+    ax.set_aspect("equal", adjustable="datalim")
+    ax.autoscale_view()
+    ax.tick_params(labelleft=False, left=False, labelbottom=False, bottom=False)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    _annotate_corners(ax, corners, rotation_matrix)
+
+    # Legend with the share of the lap every season was quickest on
+    share = np.bincount(fastest_year[:-1], minlength=len(laps)) / max(len(fastest_year) - 1, 1)
+    handles = [mpatches.Patch(color=color, label=f"{year} {df_lap['driver'].iloc[0]} ({s:.0%})") for (year, df_lap), color, s in zip(laps, colors, share)]
+    ax.legend(handles=handles, loc="lower right", frameon=False, fontsize=10, labelcolor="white")
+
+    # Main title
+    ax.set_title("Fastest Season Around The Lap", fontsize=18, color='white', fontweight='bold', y=1.04)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{event} | {session.replace('_', ' ').title()} | Highest speed at every point of the fastest laps", ha='center', fontsize=10, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig, fontsize=60) if watermark else fig
+
+
+
+def plot_standings_progression(
+        standings: pd.DataFrame,
+        year: int,
+        teams_colors: Dict,
+        championship: str = "Drivers",
+        watermark: bool = True) -> plt.Figure:
+
+    by = "Abbreviation" if championship == "Drivers" else "TeamName"
+
+    # One row per points-scoring session in the order they were run, one column per driver/team
+    progression = standings.pivot_table(
+        index=["RoundNumber", "SessionOrder", "EventName", "Session"],
+        columns=by,
+        values="CumulativePoints"
+    ).sort_index().ffill().fillna(0)
+
+    championship_order = progression.iloc[-1].sort_values(ascending=False).index
+
+    if championship == "Drivers":
+        last_team = standings.sort_values(["RoundNumber", "SessionOrder"]).groupby("Abbreviation")["TeamName"].last()
+    else:
+        last_team = pd.Series(championship_order, index=championship_order)
+
+    fig, ax = new_figure(figsize=(15, 8))
+
+    # Second driver of each team is drawn dashed so teammates can be told apart
+    seen_teams = set()
+    for name in championship_order:
+        team = last_team.get(name)
+        ax.plot(
+            np.arange(len(progression)),
+            progression[name],
+            color=teams_colors.get(team, "#FFFFFF"),
+            linestyle="--" if team in seen_teams else "-",
+            linewidth=2,
+            label=f"{name} ({progression[name].iloc[-1]:g})"
+        )
+        seen_teams.add(team)
+
+    tick_labels = [
+        f"{event.replace(' Grand Prix', '')}{' (S)' if session == 'sprint' else ''}"
+        for _, _, event, session in progression.index
+    ]
+    ax.set_xticks(np.arange(len(tick_labels)))
+    ax.set_xticklabels(tick_labels, rotation=45, ha="right")
+
+    ax.set_ylabel("Points")
+    ax.grid(True, linestyle='--', alpha=0.3)
+    ax.legend(title=championship, loc='upper left', bbox_to_anchor=(1, 1), fontsize=9)
+
+    # Main title
+    ax.set_title(f"{'Drivers' if championship == 'Drivers' else 'Constructors'} Championship Progression", fontsize=18, color='white', fontweight='bold', y=1.05)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | After Round {progression.index[-1][0]}", ha='center', fontsize=13, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig) if watermark else fig
+
+
+
+def plot_tyre_degradation(
+        stints: pd.DataFrame,
+        results: pd.DataFrame,
+        year: int,
+        event: str,
+        session: str,
+        teams_colors: Dict,
+        min_laps: int = 5,
+        watermark: bool = True) -> plt.Figure:
+
+    # Short stints give meaningless slopes
+    stints = stints[(stints["FitLaps"] >= min_laps) & stints["Degradation"].notna()]
+
+    drivers_order = [driver for driver in results["Abbreviation"] if driver in set(stints["Driver"])]
+    x_position = {driver: i for i, driver in enumerate(drivers_order)}
+
+    fig, ax = new_figure(figsize=(15, 8))
+
+    # Stints of a driver are spread around the driver's tick in the order they were run
+    stints = stints.sort_values(["Driver", "StintNumber"])
+    offsets = stints.groupby("Driver").cumcount() - (stints.groupby("Driver")["StintNumber"].transform("size") - 1) / 2
+    x = stints["Driver"].map(x_position) + offsets * 0.25
+
+    compound_colors = dict(zip(stints["Compound"], stints["CompoundColor"])) if "CompoundColor" in stints.columns else {}
+
+    for compound, df_compound in stints.groupby("Compound"):
+        ax.scatter(
+            x[df_compound.index],
+            df_compound["Degradation"],
+            s=df_compound["FitLaps"] * 15,
+            color=compound_colors.get(compound, "#FFFFFF"),
+            edgecolor="black",
+            linewidth=1,
+            label=compound,
+            zorder=3
+        )
+
+    ax.axhline(0, color="grey", linestyle="--", linewidth=1)
+
+    team_of_driver = dict(zip(results["Abbreviation"], results["TeamName"]))
+    ax.set_xticks(np.arange(len(drivers_order)))
+    ax.set_xticklabels(drivers_order)
+    for tick, driver in zip(ax.get_xticklabels(), drivers_order):
+        tick.set_color(teams_colors.get(team_of_driver.get(driver), "#FFFFFF"))
+
+    ax.set_ylabel("Degradation (s/lap)")
+    ax.set_xlabel("Driver")
+    ax.grid(True, axis="y", linestyle="--", alpha=0.3)
+    ax.legend(title="Tyre Compound", fontsize=12, title_fontsize=12)
+
+    # Main title
+    ax.set_title("Tyre Degradation Per Stint", fontsize=18, color='white', fontweight='bold', y=1.05)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {event} | {session.replace('_', ' ').title()} | Marker size: laps in stint", ha='center', fontsize=13, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig) if watermark else fig
+
+
+
+def plot_season_tyre_degradation(
+        season_stints: pd.DataFrame,
+        year: int,
+        session: str = "race",
+        min_laps: int = 5,
+        watermark: bool = True) -> plt.Figure:
+
+    season_stints = season_stints[(season_stints["FitLaps"] >= min_laps) & season_stints["Degradation"].notna()]
+
+    # Median degradation of every compound at every event
+    trend = season_stints.groupby(["RoundNumber", "EventName", "Compound"])["Degradation"].median().unstack("Compound")
+    compound_colors = dict(zip(season_stints["Compound"], season_stints["CompoundColor"])) if "CompoundColor" in season_stints.columns else {}
+
+    fig, ax = new_figure(figsize=(15, 8))
+
+    for compound in trend.columns:
+        ax.plot(
+            np.arange(len(trend)),
+            trend[compound],
+            color=compound_colors.get(compound, "#FFFFFF"),
+            marker="o",
+            linewidth=2,
+            label=compound
+        )
+
+    ax.axhline(0, color="grey", linestyle="--", linewidth=1)
+    ax.set_xticks(np.arange(len(trend)))
+    ax.set_xticklabels([event.replace(" Grand Prix", "") for _, event in trend.index], rotation=45, ha="right")
+    ax.set_ylabel("Median Degradation (s/lap)")
+    ax.grid(True, axis="y", linestyle="--", alpha=0.3)
+    ax.legend(title="Tyre Compound", fontsize=12, title_fontsize=12)
+
+    # Main title
+    ax.set_title("Tyre Degradation Across The Season", fontsize=18, color='white', fontweight='bold', y=1.05)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {session.replace('_', ' ').title()}", ha='center', fontsize=13, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig) if watermark else fig
+
+
+
+def plot_setup_performance(
+        features: pd.DataFrame,
+        teams_colors: Dict,
+        year: int,
+        event: str,
+        session: str,
+        watermark: bool = True
+        ) -> plt.Figure:
+
+    # Corner speed against top speed on every driver's fastest lap, full throttle share when the
+    # circuit has no corners stored
+    x_column = "MeanCornerSpeed" if "MeanCornerSpeed" in features.columns and features["MeanCornerSpeed"].notna().any() else "FullThrottle"
+    x_label = "Mean Minimum Corner Speed (km/h)" if x_column == "MeanCornerSpeed" else "Full Throttle (% of the lap)"
+
+    fig, ax = new_figure(figsize=(12, 9))
+
+    ax.scatter(features[x_column], features["TopSpeed"], s=120, c=[teams_colors.get(team, "#808080") for team in features["Team"]],
+               edgecolors="white", linewidths=0.8, zorder=3)
+    for x, y, driver in zip(features[x_column], features["TopSpeed"], features["Driver"]):
+        ax.annotate(driver, (x, y), xytext=(7, 5), textcoords="offset points", fontsize=10, color="white")
+
+    # Medians split the field into the four usual setup trade-offs, which only read that way against corner speed
+    x_median, y_median = features[x_column].median(), features["TopSpeed"].median()
+    ax.axvline(x_median, color="grey", linestyle="--", linewidth=1, zorder=1)
+    ax.axhline(y_median, color="grey", linestyle="--", linewidth=1, zorder=1)
+    if x_column == "MeanCornerSpeed":
+        for x, y, label, ha, va in [(0.02, 0.98, "Low Drag", "left", "top"), (0.98, 0.98, "Efficient", "right", "top"),
+                                    (0.02, 0.02, "Slow", "left", "bottom"), (0.98, 0.02, "High Downforce", "right", "bottom")]:
+            ax.text(x, y, label, transform=ax.transAxes, ha=ha, va=va, fontsize=12, color="grey", fontweight="bold")
+
+    ax.set_xlabel(x_label, fontsize=12, color="white")
+    ax.set_ylabel("Top Speed (km/h)", fontsize=12, color="white")
+    ax.grid(linestyle="--", alpha=0.2)
+
+    # Main title
+    ax.set_title("Setup Performance", fontsize=18, color='white', fontweight='bold', y=1.05)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {event} | {session.replace('_', ' ').title()} | Fastest lap of every driver", ha='center', fontsize=13, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig) if watermark else fig
+
+
+def plot_mean_vs_max_speed(
+        speeds: pd.DataFrame,
+        year: int,
+        event: str,
+        session: str,
+        teams_colors: Dict,
+        by: str = "Team",
+        watermark: bool = True
+        ) -> plt.Figure:
+
+    # Driver rows of one event (season_speed.load_speed_summary), summed up to teams unless by is "Driver"
+    if by == "Team":
+        speeds = season_speed.team_speeds(speeds)
+
+    fig, ax = new_figure(figsize=(12, 9))
+
+    ax.scatter(speeds["MeanSpeed"], speeds["MaxSpeed"], s=400 if by == "Team" else 150, c=[teams_colors.get(team, "#808080") for team in speeds["Team"]],
+               edgecolors="white", linewidths=0.8, zorder=3)
+    for x, y, label in zip(speeds["MeanSpeed"], speeds["MaxSpeed"], speeds[by]):
+        ax.annotate(label, (x, y), xytext=(0, 14 if by == "Team" else 9), textcoords="offset points", ha="center", fontsize=10, color="white")
 
+    # Medians split the field, quick over the lap to the right, quick on the straights at the top
+    ax.axvline(speeds["MeanSpeed"].median(), color="grey", linestyle="--", linewidth=1, zorder=1)
+    ax.axhline(speeds["MaxSpeed"].median(), color="grey", linestyle="--", linewidth=1, zorder=1)
+    for x, y, label, ha, va in [(0.5, 0.98, "Low Drag", "center", "top"), (0.5, 0.02, "High Drag", "center", "bottom"),
+                                (0.02, 0.5, "Slow", "left", "center"), (0.98, 0.5, "Fast", "right", "center")]:
+        ax.text(x, y, label, transform=ax.transAxes, ha=ha, va=va, fontsize=12, color="grey", fontweight="bold")
 
-def plot_mean_vs_max_speed():
-    pass
+    ax.set_xlabel("Mean Speed (km/h)", fontsize=12, color="white")
+    ax.set_ylabel("Max Speed (km/h)", fontsize=12, color="white")
+    ax.margins(0.12)
+    ax.grid(linestyle="--", alpha=0.2)
+
+    # Main title
+    ax.set_title(f"{by} Speed Analysis", fontsize=18, color='white', fontweight='bold', y=1.05)
+
+    # Subtitle positioned below the main title
+    ax.text(0.5, 1.02, f"{year} | {event} | {session.replace('_', ' ').title()} | Every telemetry sample", ha='center', fontsize=13, color='white', transform=ax.transAxes)
+
+    return add_watermark(fig) if watermark else fig
+
+
+
+def plot_season_speed_trend(
+        season_speeds: pd.DataFrame,
+        year: int,
+        session: str,
+        teams_colors: Dict,
+        watermark: bool = True
+        ) -> plt.Figure:
+
+    # Every team's mean and max speed behind the quickest team of each event, so circuits of
+    # different speeds share one scale
+    df_teams = season_speed.team_speeds(season_speeds)
+    rounds = df_teams[["RoundNumber", "EventName"]].drop_duplicates().sort_values("RoundNumber")
+    position = {round_number: i for i, round_number in enumerate(rounds["RoundNumber"])}
+
+    fig, axes = new_figure(nrows=2, figsize=(15, 10), sharex=True)
+
+    for ax, column, label in zip(axes, ["MeanSpeed", "MaxSpeed"], ["Mean Speed", "Max Speed"]):
+        deficit = df_teams[column] - df_teams.groupby("RoundNumber")[column].transform("max")
+
+        for team, df_team in df_teams.assign(Deficit=deficit).groupby("Team"):
+            df_team = df_team.sort_values("RoundNumber")
+            ax.plot(df_team["RoundNumber"].map(position), df_team["Deficit"], color=teams_colors.get(team, "#FFFFFF"), marker="o", linewidth=2, label=team)
+
+        ax.axhline(0, color="grey", linestyle="--", linewidth=1)
+        ax.set_ylabel(f"{label} To Fastest (km/h)")
+        ax.grid(True, axis="y", linestyle="--", alpha=0.3)
+
+    axes[-1].set_xticks(np.arange(len(rounds)))
+    axes[-1].set_xticklabels([event.replace(" Grand Prix", "") for event in rounds["EventName"]], rotation=45, ha="right")
+    axes[0].legend(title="Team", loc="upper left", bbox_to_anchor=(1, 1), fontsize=9)
+
+    # Main title
+    axes[0].set_title("Speed Across The Season", fontsize=18, color='white', fontweight='bold', y=1.1)
+
+    # Subtitle positioned below the main title
+    axes[0].text(0.5, 1.04, f"{year} | {session.replace('_', ' ').title()}", ha='center', fontsize=13, color='white', transform=axes[0].transAxes)
+
+    return add_watermark(fig) if watermark else fig
 
 
 
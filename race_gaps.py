@@ -0,0 +1,150 @@
+import os
+import numpy as np
+import pandas as pd
+
+import data_access
+
+
+GAPS_FILE = "race_gaps.parquet"
+
+LAP_COLUMNS = ["Driver", "Team", "LapNumber", "Time", "LapTime", "LapStartTime", "PitInTime", "PitOutTime"]
+
+
+
+def build_gap_matrix(laps: pd.DataFrame) -> pd.DataFrame:
+    """
+    Lines up every driver's lap end times by lap number and derives, lap by lap, the race time,
+    gap to the leader, interval to the car ahead, position and laps down.
+
+    Arguments:
+    - laps (pd.DataFrame): laps of a race or sprint, see LAP_COLUMNS
+
+    Return:
+    - One row per driver and completed lap (the drivers x laps matrix in long form) with
+      RaceTime, GapToLeader, Interval (s), Position, LapsDown and PitLap (pd.DataFrame)
+    """
+
+    laps = laps[laps["LapNumber"].notna()]
+
+    # Lap end in session time, laps without it end one lap time after their start
+    end_time = laps["Time"].fillna(laps["LapStartTime"] + laps["LapTime"]).dt.total_seconds().to_numpy()
+
+    codes, drivers = pd.factorize(laps["Driver"], sort=True)
+    lap_index = laps["LapNumber"].to_numpy(dtype=int) - 1
+    n_drivers, n_laps = len(drivers), lap_index.max() + 1
+
+    times = np.full((n_drivers, n_laps), np.nan)
+    times[codes, lap_index] = end_time
+
+    pit = np.zeros((n_drivers, n_laps), dtype=bool)
+    pit[codes, lap_index] = (laps["PitInTime"].notna() | laps["PitOutTime"].notna()).to_numpy()
+
+    # Race time runs from the start of lap 1 (lights out)
+    lap_1 = laps[laps["LapNumber"] == 1]
+    race_start = lap_1["LapStartTime"].fillna(lap_1["Time"] - lap_1["LapTime"]).min()
+    race_start = race_start.total_seconds() if pd.notna(race_start) else 0.0
+    race_time = times - race_start
+
+    # The leader of a lap is the first car to complete it, cars that haven't completed it sort last
+    leader_time = np.nanmin(np.where(np.isnan(times), np.inf, times), axis=0)
+    leader_time[np.isinf(leader_time)] = np.nan
+    gap = times - leader_time
+
+    order = np.argsort(np.where(np.isnan(times), np.inf, times), axis=0, kind="stable")
+    sorted_times = np.take_along_axis(times, order, axis=0)
+
+    position = np.empty_like(times)
+    np.put_along_axis(position, order, np.arange(1, n_drivers + 1, dtype=float)[:, None].repeat(n_laps, axis=1), axis=0)
+    position[np.isnan(times)] = np.nan
+
+    interval_sorted = np.diff(sorted_times, axis=0, prepend=np.nan)
+    interval_sorted[0] = 0
+    interval = np.empty_like(times)
+    np.put_along_axis(interval, order, interval_sorted, axis=0)
+    interval[np.isnan(times)] = np.nan
+
+    # Laps the leader had completed when the car finished this lap, beyond this lap
+    leader_progress = np.fmax.accumulate(np.nan_to_num(leader_time, nan=-np.inf))
+    laps_down = np.searchsorted(leader_progress, np.nan_to_num(times, nan=np.inf).ravel(), side="left").reshape(times.shape) - 1
+    laps_down = np.clip(laps_down - np.arange(n_laps)[None, :], 0, None).astype(float)
+    laps_down[np.isnan(times)] = np.nan
+
+    completed = ~np.isnan(times)
+    driver_idx, lap_idx = np.nonzero(completed)
+
+    teams = laps.groupby("Driver")["Team"].last().reindex(drivers).to_numpy() if "Team" in laps.columns else None
+
+    gaps = pd.DataFrame({
+        "Driver": drivers[driver_idx],
+        "LapNumber": lap_idx + 1,
+        "RaceTime": race_time[completed],
+        "GapToLeader": gap[completed],
+        "Interval": interval[completed],
+        "Position": position[completed].astype(int),
+        "LapsDown": laps_down[completed].astype(int),
+        "PitLap": pit[completed],
+    })
+    if teams is not None:
+        gaps.insert(1, "Team", teams[driver_idx])
+
+    return gaps
+
+
+
+def finishing_order(gaps: pd.DataFrame) -> pd.Index:
+    # Classified order: most laps completed first, then earliest to finish them
+    last_lap = gaps.sort_values("LapNumber").groupby("Driver")[["LapNumber", "RaceTime"]].last()
+    return last_lap.sort_values(["LapNumber", "RaceTime"], ascending=[False, True]).index
+
+
+
+def gap_matrix(gaps: pd.DataFrame, column: str = "GapToLeader") -> pd.DataFrame:
+    # Drivers x laps view of one column, drivers in finishing order
+    return gaps.pivot(index="Driver", columns="LapNumber", values=column).reindex(finishing_order(gaps))
+
+
+
+def load_gaps(session_dir: str, persist: bool = True) -> pd.DataFrame:
+    """
+    Returns the gap matrix of a session, building and persisting it when laps.parquet is newer
+    than the stored table.
+
+    Arguments:
+    - session_dir (str): directory holding laps.parquet
+    - persist (bool): store the built table, False builds it in memory only (the dashboard)
+
+    Return:
+    - Output of build_gap_matrix (pd.DataFrame)
+    """
+
+    laps_path = f"{session_dir}/laps.parquet"
+    file_path = f"{session_dir}/{GAPS_FILE}"
+
+    if os.path.exists(file_path) and os.stat(file_path).st_mtime_ns >= os.stat(laps_path).st_mtime_ns:
+        return data_access.read_parquet(file_path)
+
+    df_gaps = build_gap_matrix(data_access.read_table(session_dir, "laps", columns=LAP_COLUMNS))
+
+    if persist:
+        with data_access.replacing(file_path) as tmp_path:
+            df_gaps.to_parquet(tmp_path, index=False)
+
+    return df_gaps
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+
+    # Positions must agree with ranking the lap end times lap by lap
+    session_dir = sys.argv[1] if len(sys.argv) > 1 else "/tmp/f1_data/2025/2025-03-23_chinese_grand_prix/race"
+    df_laps = pd.read_parquet(f"{session_dir}/laps.parquet", columns=LAP_COLUMNS)
+    df_gaps = build_gap_matrix(df_laps)
+
+    expected = df_laps.assign(Rank=df_laps.groupby("LapNumber")["Time"].rank(method="first")).set_index(["Driver", "LapNumber"])["Rank"]
+    assert (df_gaps.set_index(["Driver", "LapNumber"])["Position"] == expected.reindex(df_gaps.set_index(["Driver", "LapNumber"]).index)).all()
+    assert (df_gaps.groupby("LapNumber")["Interval"].sum().round(6) == df_gaps.groupby("LapNumber")["GapToLeader"].max().round(6)).all()
+
+    print(gap_matrix(df_gaps).iloc[:, -5:])
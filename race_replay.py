@@ -0,0 +1,207 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import data_access
+
+
+REPLAY_FILE = "replay_frames.parquet"
+
+TELEMETRY_COLUMNS = ["SessionTime", "X", "Y", "driver", "lap"]
+
+# Seconds between two frames of the replay
+FRAME_INTERVAL = 0.5
+
+# Seconds of frames stored in one row group, the unit a time window is read in
+CHUNK_SECONDS = 60
+
+# A car with no position sample for longer than this is off track (garage, red flag, retired)
+MAX_SAMPLE_GAP = 5.0
+
+
+
+def build_replay_frames(telemetry: pd.DataFrame, interval: float = FRAME_INTERVAL) -> pd.DataFrame:
+    """
+    Resamples the X/Y position of every driver onto one session timebase.
+
+    Arguments:
+    - telemetry (pd.DataFrame): telemetry of a session, see TELEMETRY_COLUMNS
+    - interval (float): seconds between frames
+
+    Return:
+    - One row per frame and driver on track, ordered by FrameTime then Driver (pd.DataFrame)
+    """
+
+    telemetry = telemetry.dropna(subset=["SessionTime", "X", "Y"])
+
+    codes, drivers = pd.factorize(telemetry["driver"], sort=True)
+    time = telemetry["SessionTime"].dt.total_seconds().to_numpy()
+    order = np.lexsort((time, codes))
+
+    codes, time = codes[order], time[order]
+    x = telemetry["X"].to_numpy(dtype=float)[order]
+    y = telemetry["Y"].to_numpy(dtype=float)[order]
+    lap = telemetry["lap"].to_numpy()[order]
+
+    start = np.floor(time.min() / interval) * interval
+    timebase = np.arange(start, time.max() + interval, interval)
+
+    # Drivers are laid end to end on one time axis, so a single interpolation covers all of them
+    span = timebase[-1] - start + 2 * MAX_SAMPLE_GAP
+    sample_axis = time - start + codes * span
+    frame_axis = (timebase - start)[None, :] + (np.arange(len(drivers)) * span)[:, None]
+    frame_axis = frame_axis.ravel()
+
+    frame_x = np.interp(frame_axis, sample_axis, x)
+    frame_y = np.interp(frame_axis, sample_axis, y)
+
+    # Frames outside a driver's samples or inside a long gap between two of them have no position
+    position = np.searchsorted(sample_axis, frame_axis, side="left")
+    after = np.clip(position, 1, len(sample_axis) - 1)
+    before = after - 1
+    frame_driver = np.repeat(np.arange(len(drivers)), len(timebase))
+    on_track = (
+        (position > 0) & (position < len(sample_axis))
+        & (codes[before] == frame_driver) & (codes[after] == frame_driver)
+        & (sample_axis[after] - sample_axis[before] <= MAX_SAMPLE_GAP)
+    )
+    # Exact hits on a driver's first or last sample
+    on_track |= (sample_axis[before] == frame_axis) & (codes[before] == frame_driver)
+    on_track |= (sample_axis[after] == frame_axis) & (codes[after] == frame_driver)
+
+    # Lap of the sample at or before the frame
+    lap_sample = np.where((sample_axis[after] == frame_axis) & (codes[after] == frame_driver), after, before)
+
+    # Time major order: (driver, frame) -> (frame, driver)
+    shape = (len(drivers), len(timebase))
+    time_major = np.arange(np.prod(shape)).reshape(shape).T.ravel()
+    keep = time_major[on_track[time_major]]
+
+    return pd.DataFrame({
+        "FrameTime": np.tile(timebase, len(drivers))[keep],
+        "Driver": pd.Categorical.from_codes(frame_driver[keep], categories=drivers),
+        "X": frame_x[keep].astype(np.float32),
+        "Y": frame_y[keep].astype(np.float32),
+        "LapNumber": lap[lap_sample][keep].astype(np.int16),
+    })
+
+
+
+def _write_frames(frames: pd.DataFrame, file_path: str, interval: float) -> None:
+    table = pa.Table.from_pandas(frames, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, b"frame_interval": str(interval).encode()})
+
+    # Row groups hold CHUNK_SECONDS of frames, time window reads skip the others by their statistics
+    drivers_on_track = max(frames.groupby("FrameTime", observed=True).size().max(), 1) if len(frames) else 1
+    row_group_size = int(drivers_on_track * CHUNK_SECONDS / interval)
+
+    with data_access.replacing(file_path) as tmp_path:
+        pq.write_table(table, tmp_path, row_group_size=row_group_size)
+
+
+
+def update_replay(session_dir: str, interval: float = FRAME_INTERVAL) -> None:
+    """
+    Builds the replay frames of a session when telemetry_data.parquet is newer than the stored
+    frames. The track under the cars is the circuit outline, see circuits.py.
+
+    Arguments:
+    - session_dir (str): directory holding telemetry_data.parquet
+    - interval (float): seconds between frames
+    """
+
+    telemetry_path = f"{session_dir}/telemetry_data.parquet"
+    file_path = f"{session_dir}/{REPLAY_FILE}"
+
+    if os.path.exists(file_path) and os.stat(file_path).st_mtime_ns >= os.stat(telemetry_path).st_mtime_ns:
+        return
+
+    df_telemetry = data_access.read_table(session_dir, "telemetry", columns=TELEMETRY_COLUMNS)
+    frames = build_replay_frames(df_telemetry, interval)
+    del df_telemetry
+
+    _write_frames(frames, file_path, interval)
+
+
+
+def has_replay(session_dir: str) -> bool:
+    # Present and at least as new as the telemetry it was built from
+    file_path = f"{session_dir}/{REPLAY_FILE}"
+    return os.path.exists(file_path) and os.stat(file_path).st_mtime_ns >= os.stat(f"{session_dir}/telemetry_data.parquet").st_mtime_ns
+
+
+
+def replay_time_range(session_dir: str, persist: bool = True) -> tuple:
+    """
+    Returns the first and last frame time and the frame interval from the file metadata,
+    without reading any frames. The frames are built first unless persist is False, then they
+    must exist already (has_replay).
+    """
+
+    if persist:
+        update_replay(session_dir)
+
+    parquet_file = pq.ParquetFile(f"{session_dir}/{REPLAY_FILE}")
+    metadata = parquet_file.metadata
+    column = parquet_file.schema_arrow.get_field_index("FrameTime")
+    interval = float(parquet_file.schema_arrow.metadata[b"frame_interval"])
+
+    if metadata.num_row_groups == 0 or metadata.num_rows == 0:
+        return 0.0, 0.0, interval
+
+    first = metadata.row_group(0).column(column).statistics.min
+    last = metadata.row_group(metadata.num_row_groups - 1).column(column).statistics.max
+
+    return float(first), float(last), interval
+
+
+
+def load_replay_frames(session_dir: str, start: float = None, end: float = None, persist: bool = True) -> pd.DataFrame:
+    """
+    Reads the frames of a time window, only the row groups overlapping it are read.
+
+    Arguments:
+    - session_dir (str): session directory
+    - start (float): first session time in seconds, from the start when None
+    - end (float): last session time in seconds, to the end when None
+    - persist (bool): build the frames first when they are out of date, False only reads them
+
+    Return:
+    - Frames with FrameTime, Driver, X, Y and LapNumber (pd.DataFrame)
+    """
+
+    if persist:
+        update_replay(session_dir)
+
+    filters = []
+    if start is not None:
+        filters.append(("FrameTime", ">=", float(start)))
+    if end is not None:
+        filters.append(("FrameTime", "<=", float(end)))
+
+    return data_access.read_parquet(f"{session_dir}/{REPLAY_FILE}", filters=filters)
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    # Frames must match a per driver np.interp on the synthetic season
+    import sys
+    import time
+
+    session_dir = sys.argv[1] if len(sys.argv) > 1 else "/tmp/f1_data/2025/2025-03-23_chinese_grand_prix/race"
+
+    df_telemetry = pd.read_parquet(f"{session_dir}/telemetry_data.parquet", columns=TELEMETRY_COLUMNS)
+    start = time.perf_counter()
+    frames = build_replay_frames(df_telemetry)
+    print(f"{len(frames)} frames rows in {time.perf_counter() - start:.3f}s")
+
+    for driver, df_driver in df_telemetry.groupby("driver"):
+        t = df_driver["SessionTime"].dt.total_seconds().to_numpy()
+        frame_driver = frames[frames["Driver"] == driver]
+        expected = np.interp(frame_driver["FrameTime"], np.sort(t), df_driver["X"].to_numpy()[np.argsort(t)])
+        assert np.allclose(frame_driver["X"], expected, atol=0.01), driver
+        assert frame_driver["FrameTime"].between(t.min(), t.max()).all(), driver
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+import data_access
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard_app.py")
+
+# Page pickers of the Visuals (tab1) and Circuits (tab6) tabs
+PAGE_PICKERS = ["Select Graphics", "Select Graphics:"]
+
+
+
+def collect_reads(data_dir: str) -> tuple:
+    """
+    Opens the app and shows every Visuals and Circuits page once, with the reads of every run
+    booked per page.
+
+    Arguments:
+    - data_dir (str): data tree the app reads
+
+    Return:
+    - reads of every run with a Step column (pd.DataFrame), exceptions of the runs (list)
+    """
+
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["F1_DATA_DIR"] = data_dir
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    frames, exceptions = [], []
+
+    def run(step):
+        data_access.clear_reads()
+        at.run()
+        frames.append(data_access.reads().assign(Step=step))
+        exceptions.extend(f"{step}: {exception.message}" for exception in at.exception)
+
+    run("open")
+    for label in PAGE_PICKERS:
+        picker = [selectbox for selectbox in at.selectbox if selectbox.label == label][0]
+        for option in picker.options:
+            [selectbox for selectbox in at.selectbox if selectbox.label == label][0].set_value(option)
+            run(f"{label} {option}")
+
+    return pd.concat(frames, ignore_index=True), exceptions
+
+
+
+def page_report(df_reads: pd.DataFrame) -> pd.DataFrame:
+    # Every page's heaviest run, with the flags of all its runs
+    reports = [data_access.reads_report(df_step).assign(Step=step) for step, df_step in df_reads.groupby("Step", sort=False)]
+    df_report = pd.concat(reports, ignore_index=True)
+
+    flags = df_report.groupby("page")["flags"].agg(lambda runs: sorted({flag for run in runs for flag in run}))
+    df_report = df_report.sort_values("mb", ascending=False).drop_duplicates("page")
+    df_report["flags"] = df_report["page"].map(flags)
+
+    return df_report.reset_index(drop=True)
+
+
+
+def check_schemas(data_dir: str) -> list:
+    # Files of the tree against the declared schemas of their tables
+    files = {spec["file"]: table for table, spec in data_access.TABLES.items() if spec["columns"] is not None}
+
+    failures = []
+    for root, _, names in os.walk(data_dir):
+        for name in names:
+            if name in files:
+                failures += data_access.check_schema(f"{root}/{name}", files[name])
+
+    return failures
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the parquet reads of every dashboard page and flag pages reading more than they use.")
+    parser.add_argument("--data-dir", default=None, help="Data tree to run against, two synthetic seasons are generated when omitted")
+    parser.add_argument("--output", default=None, help="JSON file the report is written to")
+    args = parser.parse_args()
+
+    if args.data_dir is None:
+        import synthetic_data
+        from datetime import datetime
+
+        # The app opens on the current season and reads today's drivers lists
+        args.data_dir = tempfile.mkdtemp(prefix="f1_reads_")
+        for year in [datetime.today().year - 1, datetime.today().year]:
+            synthetic_data.write_tree(args.data_dir, year)
+        synthetic_data.write_drivers_wiki(args.data_dir)
+        print(f"Synthetic data written to {args.data_dir}")
+
+    df_reads, exceptions = collect_reads(args.data_dir)
+    df_report = page_report(df_reads)
+
+    print(f"{'page':<42} {'reads':>5} {'rows':>9} {'row groups':>10} {'MB read':>8} {'MB files':>8} {'seconds':>8}")
+    for row in df_report.itertuples(index=False):
+        print(f"{row.page:<42} {row.reads:>5} {row.rows:>9} {row.row_groups:>10} {row.mb:>8.2f} {row.file_mb:>8.2f} {row.seconds:>8.3f}")
+
+    failures = [f"{row.page}: {flag}" for row in df_report.itertuples(index=False) for flag in row.flags]
+    failures += check_schemas(args.data_dir) + exceptions
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"pages": df_report.to_dict(orient="records"), "failures": failures}, f, indent=2, default=str)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+
+if __name__ == "__main__":
+    main()
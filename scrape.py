@@ -1,40 +1,144 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import re
 from datetime import datetime
 import os
 from typing import List
 
 
+# Pages of the drivers lists, the drivers table is the second wikitable on each of them
+WIKI_URLS = {
+    "f1": "https://en.wikipedia.org/wiki/List_of_Formula_One_drivers",
+    "f2": "https://en.wikipedia.org/wiki/List_of_FIA_Formula_2_Championship_drivers",
+    "f3": "https://en.wikipedia.org/wiki/List_of_FIA_Formula_3_Championship_drivers"
+}
+
+WIKI_FILE_NAMES = {
+    "f1": "f1_drivers_wiki",
+    "f2": "f2_drivers_wiki",
+    "f3": "f3_drivers_wiki"
+}
+
+WIKI_TABLE_INDEX = 1
+
+# Header texts with line breaks or footnote marks in them
+WIKI_RENAMES = {
+    "f1": {"Points[a]": "Points"},
+    "f2": {"Championshiptitles": "Championship titles", "Fastestlaps[a]": "Fastest laps"},
+    "f3": {"Championshiptitles": "Championship titles", "Fastestlaps[a]": "Fastest laps"},
+}
+
+# Numeric columns of every list and their stored type, each keeps the leading digits of its cells
+# (footnotes and years follow the numbers). Columns missing from a page are skipped
+WIKI_NUMERIC_COLUMNS = {
+    "f1": {
+        "Race entries": "int64", "Race starts": "int64", "Pole positions": "int64", "Race wins": "int64",
+        "Podiums": "int64", "Fastest laps": "int64", "Points": "float64", "Drivers' Championships": "int64"
+    },
+    "f2": {
+        "Entries": "Int64", "Starts": "Int64", "Poles": "Int64", "Sprint wins": "Int64", "Feature Wins": "Int64",
+        "Total wins": "Int64", "Podiums": "Int64", "Fastest laps": "Int64", "Points": "Int64"
+    },
+}
+WIKI_NUMERIC_COLUMNS["f3"] = WIKI_NUMERIC_COLUMNS["f2"]
+
+# Whole cell matched and replaced by its number, the leading digits ('' when there are none).
+# The championships cell is the number of titles followed by the years they were won in
+LEADING_DIGITS = r"(?s)^(\d*).*$"
+WIKI_PATTERNS = {"Drivers' Championships": r"(?s)^\D*(\d)?.*$"}
+
+_WIKITABLE_START = re.compile(r"""<table\b[^>]*\bclass\s*=\s*["'][^"']*\bwikitable\b""", re.IGNORECASE)
+
+
+
 def extract_leading_digits(input_string):
     match = re.match(r'^\d+', input_string)
     return match.group(0) if match else ''
 
+
+
+def parse_wiki_table(html: str, table_index: int = WIKI_TABLE_INDEX) -> pd.DataFrame:
+    """
+    Reads one wikitable of a page into a DataFrame of cell texts, header cells of the first row
+    are the columns. Only the markup of that table is parsed.
+
+    Arguments:
+    - html (str): page source
+    - table_index (int): position of the table among the page's wikitables
+
+    Return:
+    - one row per table row with data cells (pd.DataFrame)
+    """
+
+    from lxml import html as lxml_html
+
+    # Wikitables are not nested, the target ends before the next one starts
+    starts = [match.start() for match in _WIKITABLE_START.finditer(html)]
+    end = starts[table_index + 1] if len(starts) > table_index + 1 else len(html)
+    table = lxml_html.fragment_fromstring(html[starts[table_index]:end], create_parent="div").find(".//table")
+
+    rows = table.iter("tr")
+    headers = [cell.text_content().strip() for cell in next(rows).iter("th")]
+
+    data = []
+    for row in rows:
+        cells = [cell.text_content().strip() for cell in row.iter("td")]
+        if cells:
+            data.append(cells)
+
+    return pd.DataFrame(data, columns=headers)
+
+
+
+def clean_drivers_table(df: pd.DataFrame, category: str = "f1") -> pd.DataFrame:
+    """
+    Renames the columns of a parsed drivers list and converts its numeric columns, one Arrow
+    regex pass and cast per pattern over all of them.
+
+    Arguments:
+    - df (pd.DataFrame): output of parse_wiki_table
+    - category (str): "f1", "f2" or "f3"
+
+    Return:
+    - cleaned copy (pd.DataFrame)
+    """
+
+    renames = WIKI_RENAMES[category]
+    df = df.set_axis([renames.get(column, column) for column in df.columns], axis=1)
+
+    types = {column: dtype for column, dtype in WIKI_NUMERIC_COLUMNS[category].items() if column in df.columns}
+    patterns = {column: WIKI_PATTERNS.get(column, LEADING_DIGITS) for column in types}
+
+    numbers = {}
+    for pattern in set(patterns.values()):
+        columns = [column for column in types if patterns[column] == pattern]
+        digits = pc.replace_substring_regex(pa.chunked_array([pa.array(df[column], pa.string()) for column in columns]), pattern, r"\1")
+        digits = pc.cast(pc.if_else(pc.equal(digits, ""), None, digits), pa.int64())
+        for i, column in enumerate(columns):
+            numbers[column] = pd.array(digits.slice(i * len(df), len(df)), dtype=types[column])
+
+    df = df.assign(**numbers)
+
+    if category == "f1" and "Driver name" in df.columns:
+        df["Driver name"] = df["Driver name"].str.replace(r'[~*^]|\[.*?\]', '', regex=True).str.strip()
+
+    return df
+
+
+
 def scrape_drivers_wiki(
         output_dir: str = "/Users/bartosz/f1_data",
         category: str = "f1",
         ):
-    
-    file_name_mapping = {
-        "f1":"f1_drivers_wiki",
-        "f2":"f2_drivers_wiki",
-        "f3":"f3_drivers_wiki"
-    }
-
-    url_mapping = {
-        "f1":"https://en.wikipedia.org/wiki/List_of_Formula_One_drivers",
-        "f2":"https://en.wikipedia.org/wiki/List_of_FIA_Formula_2_Championship_drivers",
-        "f3":"https://en.wikipedia.org/wiki/List_of_FIA_Formula_3_Championship_drivers"
-    }
 
     today_date = datetime.today().strftime('%d-%m-%Y')
     
-    file_path = f"{output_dir}/{file_name_mapping[category]}_{today_date}.parquet"
+    file_path = f"{output_dir}/{WIKI_FILE_NAMES[category]}_{today_date}.parquet"
     
     # Remove files that match 'f1_drivers_wiki_' but have a date other than today's
     for file in os.listdir(output_dir):
-        if file.endswith(".parquet") and file_name_mapping[category] in file:
+        if file.endswith(".parquet") and WIKI_FILE_NAMES[category] in file:
             if today_date not in file:
                 os.remove(os.path.join(output_dir, file))
                 print(f"Removed outdated file: {file}")
@@ -45,71 +149,11 @@ def scrape_drivers_wiki(
         return
     
 
-    url = url_mapping[category]
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    tables = soup.find_all('table', {'class': 'wikitable'})
-    driver_table = tables[1]
-    
-    # Extract headers
-    header_row = driver_table.find('tr')
-    headers = [cell.text.strip() for cell in header_row.find_all('th')]
-    
-    # Extract data
-    data = []
-    for row in driver_table.find_all('tr')[1:]:
-        cells = row.find_all('td')
-        if cells:
-            driver_data = [cell.text.strip() for cell in cells]
-            data.append(driver_data)
-    
-    # Create DataFrame
-    df = pd.DataFrame(data, columns=headers)
-    
-    # Function to extract leading digits
-
-    
-    if category == "f1":
-        df = df.rename(columns={"Points[a]": "Points"})
-        
-        columns_to_clean = [
-            "Race entries", "Race starts", "Pole positions", "Race wins", 
-            "Podiums", "Fastest laps", "Points", "Drivers' Championships"
-        ]
-
-        for column in columns_to_clean:
-            if column in df.columns:
-                if column == "Drivers' Championships":
-                    df[column] = df[column].str.extract(r'(\d)')
-                df[column] = df[column].apply(extract_leading_digits)
-        if "Driver name" in df.columns:
-            df["Driver name"] = df["Driver name"].str.replace(r'[~*^]', '', regex=True)
-            df["Driver name"] = df["Driver name"].str.replace(r'\[.*?\]', '', regex=True)
-            df["Driver name"] = df["Driver name"].str.strip()
-        
-        df['Race entries'] = df['Race entries'].astype(int)
-        df['Race starts'] = df['Race starts'].astype(int)
-        df['Pole positions'] = df['Pole positions'].astype(int)
-        df['Race wins'] = df['Race wins'].astype(int)
-        df['Podiums'] = df['Podiums'].astype(int)
-        df['Fastest laps'] = df['Fastest laps'].astype(int)
-        df['Points'] = df['Points'].astype(float)
-        df["Drivers' Championships"] = df["Drivers' Championships"].astype(int)
-        
-
-    
-    if category == "f2":
-        df = df.rename(columns={"Championshiptitles": "Championship titles", "Fastestlaps[a]":"Fastest laps"})
-
-        columns_to_clean = ["Entries", "Starts", "Poles", "Sprint wins", "Feature Wins", "Total wins", "Podiums", "Fastest laps", "Points"]
-
-        for column in columns_to_clean:
-            if column in df.columns:
-                df[column] = df[column].apply(extract_leading_digits)
+    # Only needed when a scrape actually happens
+    import requests
 
-
-    
+    response = requests.get(WIKI_URLS[category])
+    df = clean_drivers_table(parse_wiki_table(response.text), category)
     
     # Save to parquet
     df.to_parquet(file_path)
@@ -132,4 +176,9 @@ def scrape_f1_standings(
     }
     pass
 
-scrape_drivers_wiki()
\ No newline at end of file
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    scrape_drivers_wiki()
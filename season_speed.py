@@ -0,0 +1,192 @@
+import json
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+
+import data_access
+
+
+SPEEDS_FILE = "speeds.parquet"
+
+TELEMETRY_COLUMNS = ["Speed", "Team", "driver"]
+
+
+
+def speed_summary(telemetry: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mean and max speed of every driver over all their telemetry samples of a session.
+
+    Arguments:
+    - telemetry (pd.DataFrame): telemetry of a session, see TELEMETRY_COLUMNS
+
+    Return:
+    - Driver, Team, Samples, MeanSpeed and MaxSpeed, fastest top speed first (pd.DataFrame)
+    """
+
+    telemetry = telemetry.dropna(subset=["Speed"])
+
+    df_speeds = telemetry.groupby("driver").agg(
+        Team=("Team", "first"),
+        Samples=("Speed", "size"),
+        MeanSpeed=("Speed", "mean"),
+        MaxSpeed=("Speed", "max")).reset_index().rename(columns={"driver": "Driver"})
+
+    return df_speeds.sort_values("MaxSpeed", ascending=False).reset_index(drop=True)
+
+
+
+def team_speeds(speeds: pd.DataFrame) -> pd.DataFrame:
+    # Driver rows to team rows, the mean weighted by samples so it is the mean over all the team's samples
+    keys = [column for column in ["RoundNumber", "EventName"] if column in speeds.columns] + ["Team"]
+
+    df_teams = speeds.assign(SpeedSum=speeds["MeanSpeed"] * speeds["Samples"]).groupby(keys, sort=False).agg(
+        Samples=("Samples", "sum"),
+        SpeedSum=("SpeedSum", "sum"),
+        MaxSpeed=("MaxSpeed", "max")).reset_index()
+    df_teams["MeanSpeed"] = df_teams["SpeedSum"] / df_teams["Samples"]
+
+    return df_teams.drop(columns="SpeedSum")
+
+
+
+def load_speed_summary(session_dir: str, persist: bool = True) -> pd.DataFrame:
+    """
+    Returns the speed summary of a session, building and persisting it when telemetry_data.parquet
+    is newer than the stored table.
+
+    Arguments:
+    - session_dir (str): directory holding telemetry_data.parquet
+    - persist (bool): store the built table, False builds it in memory only (the dashboard)
+
+    Return:
+    - Output of speed_summary (pd.DataFrame)
+    """
+
+    telemetry_path = f"{session_dir}/telemetry_data.parquet"
+    file_path = f"{session_dir}/{SPEEDS_FILE}"
+
+    if os.path.exists(file_path) and os.stat(file_path).st_mtime_ns >= os.stat(telemetry_path).st_mtime_ns:
+        return data_access.read_parquet(file_path)
+
+    df_speeds = speed_summary(data_access.read_table(session_dir, "telemetry", columns=TELEMETRY_COLUMNS))
+
+    if persist:
+        with data_access.replacing(file_path) as tmp_path:
+            df_speeds.to_parquet(tmp_path, index=False)
+
+    return df_speeds
+
+
+
+def _season_sessions(dir: str, year: int, session: str) -> list:
+    # (session directory, round number, event) of every event of a season with the session's telemetry on disk
+    df_schedule = data_access.read_table(f"{dir}/{year}", "schedule", columns=["RoundNumber", "EventName", "DirName"])
+    df_schedule = df_schedule[df_schedule["RoundNumber"] > 0]
+
+    return [
+        (f"{dir}/{year}/{dir_name}/{session}", int(round_number), event)
+        for round_number, event, dir_name in df_schedule[["RoundNumber", "EventName", "DirName"]].itertuples(index=False)
+        if os.path.exists(f"{dir}/{year}/{dir_name}/{session}/telemetry_data.parquet")
+    ]
+
+
+
+def _load_event_speeds(args):
+    session_dir, round_number, event, persist = args
+    df_speeds = load_speed_summary(session_dir, persist)
+    df_speeds.insert(0, "RoundNumber", round_number)
+    df_speeds.insert(1, "EventName", event)
+    return df_speeds
+
+
+
+def scan_season_speeds(
+        dir: str,
+        year: int,
+        session: str = "race",
+        workers: int = None,
+        persist: bool = True) -> pd.DataFrame:
+    """
+    Summarises the speeds of one session type of every event of a season in parallel and stores
+    the combined table next to the schedule.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - session (str): session directory name, e.g. "race" or "qualifying"
+    - workers (int): number of processes, defaults to the number of CPUs, 1 runs in this process
+    - persist (bool): store the season and session tables, False builds them in memory only
+
+    Return:
+    - Speeds of every driver at every event with RoundNumber and EventName (pd.DataFrame)
+    """
+
+    tasks = _season_sessions(dir, year, session)
+
+    if not tasks:
+        return pd.DataFrame()
+
+    tasks = [task + (persist,) for task in tasks]
+    if workers == 1:
+        df_season = pd.concat(map(_load_event_speeds, tasks), ignore_index=True)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            df_season = pd.concat(list(executor.map(_load_event_speeds, tasks)), ignore_index=True)
+
+    if not persist:
+        return df_season
+
+    file_path = f"{dir}/{year}/{session}_{SPEEDS_FILE}"
+    # The rounds scanned go with the table, events published later with older files are still picked up
+    table = pa.Table.from_pandas(df_season, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, b"rounds": json.dumps([task[1] for task in tasks]).encode()})
+    with data_access.replacing(file_path) as tmp_path:
+        pq.write_table(table, tmp_path)
+
+    return df_season
+
+
+
+def load_season_speeds(
+        dir: str,
+        year: int,
+        session: str = "race",
+        workers: int = None,
+        persist: bool = True) -> pd.DataFrame:
+    """
+    Returns the stored season speeds table, scanning the season again when a session's telemetry
+    is newer than the table or the rounds with telemetry on disk are not the ones it was built from.
+    The scan is stored unless persist is False.
+    """
+
+    file_path = f"{dir}/{year}/{session}_{SPEEDS_FILE}"
+    if not os.path.exists(file_path):
+        return scan_season_speeds(dir, year, session, workers, persist)
+
+    tasks = _season_sessions(dir, year, session)
+    latest = max((os.stat(f"{session_dir}/telemetry_data.parquet").st_mtime_ns for session_dir, _, _ in tasks), default=0)
+
+    # Published copies keep the mtime of their source, so an event can arrive older than the table
+    metadata = pq.read_schema(file_path).metadata or {}
+    stored_rounds = json.loads(metadata.get(b"rounds", b"null"))
+
+    if os.stat(file_path).st_mtime_ns < latest or stored_rounds != [task[1] for task in tasks]:
+        return scan_season_speeds(dir, year, session, workers, persist)
+
+    return data_access.read_parquet(file_path)
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+
+    dir = sys.argv[1] if len(sys.argv) > 1 else "/tmp/f1_data"
+    year = int(sys.argv[2]) if len(sys.argv) > 2 else 2025
+
+    df_season = load_season_speeds(dir, year)
+    print(df_season)
+    print(team_speeds(df_season))
@@ -0,0 +1,127 @@
+import argparse
+import gc
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+from ingest import rss_mb
+
+
+# Visuals pages the soak run cycles through, every rerun also draws the other tabs
+PAGES = ["Lap Time Distributions", "Pace Comparisons", "Tyre Degradation", "Weather Data"]
+
+# Reruns before the baseline is taken, caches and lazy imports fill up during them
+WARMUP_RERUNS = 20
+
+# Allowed RSS growth after the warm up, in MB
+MAX_GROWTH_MB = 100
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard_app.py")
+
+
+
+def live_figures() -> int:
+    # Figures still referenced anywhere, Streamlit's own close("all") after a run hides the ones
+    # only pyplot's registry holds but not the ones kept alive elsewhere
+    from matplotlib.figure import Figure
+    return sum(isinstance(obj, Figure) for obj in gc.get_objects())
+
+
+
+def soak(
+        reruns: int,
+        warmup: int = WARMUP_RERUNS,
+        max_growth_mb: float = MAX_GROWTH_MB) -> list:
+    """
+    Drives the dashboard through simulated reruns across pages in this process and checks that
+    memory, open and live figures stay bounded. F1_DATA_DIR must point at the data tree.
+
+    Arguments:
+    - reruns (int): number of reruns after the warm up
+    - warmup (int): reruns before the baseline is measured
+    - max_growth_mb (float): allowed RSS growth over the measured reruns
+
+    Return:
+    - failure messages, empty when the run passed (list)
+    """
+
+    from streamlit.testing.v1 import AppTest
+    import figures
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+
+    failures = [f"exception on first run: {exception.message}" for exception in at.exception]
+    if failures:
+        return failures
+
+    pages = itertools.cycle(PAGES)
+    samples = []
+    start = time.perf_counter()
+
+    for i in range(warmup + reruns):
+        page = next(pages)
+        [selectbox for selectbox in at.selectbox if selectbox.label == "Select Graphics"][0].set_value(page)
+        at.run()
+
+        for exception in at.exception:
+            failures.append(f"rerun {i} ({page}): {exception.message}")
+
+        if i >= warmup - 1:
+            gc.collect()
+            samples.append((rss_mb(), figures.open_figures(), live_figures()))
+
+        if (i + 1) % 50 == 0:
+            print(f"{i + 1:>5} reruns  {rss_mb():8.1f} MB  {figures.open_figures()} open figures  {time.perf_counter() - start:7.1f}s")
+
+    baseline = samples[0][0]
+    peak = max(rss for rss, _, _ in samples)
+    final_rss, final_figures, final_live = samples[-1]
+
+    print(f"RSS after warm up {baseline:.1f} MB, peak {peak:.1f} MB, final {final_rss:.1f} MB")
+    print(f"Figures at the end: {final_figures} open in pyplot, {final_live} alive")
+
+    if final_rss - baseline > max_growth_mb:
+        failures.append(f"RSS grew {final_rss - baseline:.1f} MB over {reruns} reruns, limit is {max_growth_mb:.1f} MB")
+    if final_figures > 0:
+        failures.append(f"{final_figures} figures left open in pyplot")
+    if final_live > samples[0][2]:
+        failures.append(f"{final_live - samples[0][2]} more figures alive than after the warm up")
+
+    return failures
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test the dashboard for memory growth over many reruns.")
+    parser.add_argument("--reruns", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=WARMUP_RERUNS)
+    parser.add_argument("--max-growth-mb", type=float, default=MAX_GROWTH_MB)
+    parser.add_argument("--data-dir", default=None, help="Data tree to run against, a synthetic season is generated when omitted")
+    args = parser.parse_args()
+
+    if args.data_dir is None:
+        import synthetic_data
+        from datetime import datetime
+
+        # The app opens on the current season and reads today's drivers lists
+        args.data_dir = tempfile.mkdtemp(prefix="f1_soak_")
+        synthetic_data.write_tree(args.data_dir, datetime.today().year)
+        synthetic_data.write_drivers_wiki(args.data_dir)
+        print(f"Synthetic data written to {args.data_dir}")
+
+    os.environ["F1_DATA_DIR"] = args.data_dir
+
+    failures = soak(args.reruns, args.warmup, args.max_growth_mb)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+
+if __name__ == "__main__":
+    main()
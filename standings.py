@@ -0,0 +1,195 @@
+import os
+import pandas as pd
+
+import data_access
+
+
+# Sessions that award championship points, in the order they run during a weekend
+POINTS_SESSIONS = ["sprint", "race"]
+
+STANDINGS_FILE = "standings.parquet"
+
+
+
+def _points_sessions_on_disk(dir: str, year: int) -> pd.DataFrame:
+    """
+    Lists every points-scoring session of a season for which results are saved locally.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+
+    Return:
+    - DataFrame with RoundNumber, EventName, Session, SessionOrder, Path and ResultsMtime (pd.DataFrame)
+    """
+
+    df_schedule = data_access.read_table(f"{dir}/{year}", "schedule", columns=["RoundNumber", "EventName", "DirName"])
+
+    # Round 0 is pre-season testing
+    df_schedule = df_schedule[df_schedule["RoundNumber"] > 0]
+
+    rows = []
+    for round_number, event, dir_name in df_schedule[["RoundNumber", "EventName", "DirName"]].itertuples(index=False):
+        for order, session in enumerate(POINTS_SESSIONS):
+            path = f"{dir}/{year}/{dir_name}/{session}/results.parquet"
+            if os.path.exists(path):
+                rows.append({
+                    "RoundNumber": int(round_number),
+                    "EventName": event,
+                    "Session": session,
+                    "SessionOrder": order,
+                    "Path": path,
+                    "ResultsMtime": os.stat(path).st_mtime_ns
+                })
+
+    return pd.DataFrame(rows, columns=["RoundNumber", "EventName", "Session", "SessionOrder", "Path", "ResultsMtime"])
+
+
+
+def _read_session_points(session_row) -> pd.DataFrame:
+    df_results = data_access.read_parquet(session_row.Path, columns=["Abbreviation", "FullName", "TeamName", "Points"], table="results")
+    df_results["Points"] = df_results["Points"].fillna(0).astype(float)
+
+    df_results["RoundNumber"] = session_row.RoundNumber
+    df_results["EventName"] = session_row.EventName
+    df_results["Session"] = session_row.Session
+    df_results["SessionOrder"] = session_row.SessionOrder
+    df_results["ResultsMtime"] = session_row.ResultsMtime
+
+    return df_results
+
+
+
+def update_standings(dir: str, year: int, persist: bool = True) -> pd.DataFrame:
+    """
+    Brings the persisted standings table of a season up to date with the results on disk.
+    Only results files that are new or changed since the last update are read.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - persist (bool): store the updated table, False updates it in memory only (the dashboard)
+
+    Return:
+    - Drivers' standings progression, one row per driver per points-scoring session (pd.DataFrame)
+    """
+
+    file_path = f"{dir}/{year}/{STANDINGS_FILE}"
+    sort_keys = ["RoundNumber", "SessionOrder"]
+
+    df_on_disk = _points_sessions_on_disk(dir, year)
+
+    if os.path.exists(file_path):
+        df_standings = data_access.read_parquet(file_path)
+    else:
+        df_standings = pd.DataFrame(columns=[
+            "RoundNumber", "EventName", "Session", "SessionOrder", "ResultsMtime",
+            "Abbreviation", "FullName", "TeamName", "Points", "CumulativePoints"
+        ])
+
+    # Sessions already applied, with the version of the results file they were built from
+    applied = df_standings[sort_keys + ["ResultsMtime"]].drop_duplicates()
+    merged = df_on_disk.merge(applied, on=sort_keys, how="left", suffixes=("", "Applied"))
+    df_delta = merged[merged["ResultsMtime"] != merged["ResultsMtimeApplied"]]
+
+    # Drop sessions whose results file disappeared or was rewritten
+    keep = df_standings.merge(df_on_disk[sort_keys + ["ResultsMtime"]], on=sort_keys + ["ResultsMtime"], how="inner")
+    removed = len(keep) != len(df_standings)
+
+    if df_delta.empty and not removed:
+        return df_standings
+
+    df_new = pd.concat([_read_session_points(row) for row in df_delta.itertuples(index=False)], ignore_index=True) \
+        if not df_delta.empty else keep.iloc[:0]
+
+    last_applied = tuple(keep[sort_keys].max()) if not keep.empty else None
+    first_new = tuple(df_new[sort_keys].min()) if not df_new.empty else None
+
+    if not removed and (last_applied is None or first_new > last_applied):
+        # New sessions come after everything already applied, so carry the totals forward
+        df_new = df_new.sort_values(sort_keys, kind="stable")
+        carried = keep.sort_values(sort_keys).groupby("Abbreviation")["CumulativePoints"].last()
+        df_new["CumulativePoints"] = (
+            df_new.groupby("Abbreviation")["Points"].cumsum()
+            + df_new["Abbreviation"].map(carried).fillna(0)
+        )
+        df_standings = pd.concat([keep, df_new], ignore_index=True) if not keep.empty else df_new
+    else:
+        # A session was corrected or arrived out of order, recompute the running totals in memory
+        df_standings = pd.concat([df for df in [keep, df_new] if not df.empty], ignore_index=True).sort_values(sort_keys, kind="stable")
+        df_standings["CumulativePoints"] = df_standings.groupby("Abbreviation")["Points"].cumsum()
+
+    df_standings = df_standings.sort_values(
+        sort_keys + ["CumulativePoints", "Abbreviation"], ascending=[True, True, False, True]
+    ).reset_index(drop=True)
+    df_standings["RoundNumber"] = df_standings["RoundNumber"].astype(int)
+    df_standings["SessionOrder"] = df_standings["SessionOrder"].astype(int)
+    df_standings["ResultsMtime"] = df_standings["ResultsMtime"].astype("int64")
+    df_standings["Points"] = df_standings["Points"].astype(float)
+    df_standings["CumulativePoints"] = df_standings["CumulativePoints"].astype(float)
+
+    if not persist:
+        return df_standings
+
+    # Write next to the target and swap, so readers never see a half-written table
+    with data_access.replacing(file_path) as tmp_path:
+        df_standings.to_parquet(tmp_path, index=False)
+
+    return df_standings
+
+
+
+def get_constructors_standings(standings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates the drivers' standings progression into the constructors' progression.
+
+    Arguments:
+    - standings (pd.DataFrame): output of update_standings
+
+    Return:
+    - Constructors' standings progression, one row per team per points-scoring session (pd.DataFrame)
+    """
+
+    sort_keys = ["RoundNumber", "SessionOrder"]
+
+    df_teams = (
+        standings.groupby(sort_keys + ["EventName", "Session", "TeamName"], as_index=False)["Points"].sum()
+        .sort_values(sort_keys, kind="stable")
+    )
+    df_teams["CumulativePoints"] = df_teams.groupby("TeamName")["Points"].cumsum()
+
+    return df_teams.sort_values(
+        sort_keys + ["CumulativePoints", "TeamName"], ascending=[True, True, False, True]
+    ).reset_index(drop=True)
+
+
+
+def get_final_standings(standings: pd.DataFrame, by: str = "Abbreviation") -> pd.DataFrame:
+    """
+    Returns the latest championship table from a standings progression.
+
+    Arguments:
+    - standings (pd.DataFrame): drivers' or constructors' standings progression
+    - by (str): "Abbreviation" for drivers, "TeamName" for constructors
+
+    Return:
+    - Championship table sorted by points (pd.DataFrame)
+    """
+
+    df_final = (
+        standings.sort_values(["RoundNumber", "SessionOrder"], kind="stable")
+        .groupby(by, as_index=False).last()
+        .sort_values(["CumulativePoints", by], ascending=[False, True])
+        .reset_index(drop=True)
+    )
+    df_final.insert(0, "Position", range(1, len(df_final) + 1))
+
+    return df_final
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    # print(update_standings("/Users/bartosz/f1_data", 2025))
+    pass
@@ -0,0 +1,357 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+import ingest
+import track_status
+
+
+# Small but complete parquet tree in the layout of the converted FastF1 sessions, used to run the
+# dashboard, the exporter and the soak harness without the real data
+
+
+TEAMS = {
+    "McLaren": ("ff8000", "FF8000", ["NOR", "PIA"]),
+    "Red Bull Racing": ("0600ef", "3671C6", ["VER", "TSU"]),
+    "Mercedes": ("27f4d2", "27F4D2", ["RUS", "ANT"]),
+    "Ferrari": ("e80020", "E8002D", ["LEC", "HAM"]),
+    "Williams": ("00a0dd", "64C4FF", ["ALB", "SAI"]),
+    "Aston Martin": ("00665f", "229971", ["ALO", "STR"]),
+    "Alpine": ("ff87bc", "0093CC", ["GAS", "DOO"]),
+    "Racing Bulls": ("fcd700", "6692FF", ["LAW", "HAD"]),
+    "Kick Sauber": ("00e700", "52E252", ["HUL", "BOR"]),
+    "Haas F1 Team": ("b6babd", "B6BABD", ["OCO", "BEA"]),
+}
+
+COMPOUND_COLORS = {"SOFT": "#da291c", "MEDIUM": "#ffd12e", "HARD": "#f0f0ec"}
+RACE_POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+SPRINT_POINTS = [8, 7, 6, 5, 4, 3, 2, 1]
+
+# Events of the generated season, dates are month-day of the chosen year
+EVENTS = [
+    ("Australian Grand Prix", "Australia", "Melbourne", "03-16", "conventional"),
+    ("Chinese Grand Prix", "China", "Shanghai", "03-23", "sprint_qualifying"),
+    ("Japanese Grand Prix", "Japan", "Suzuka", "04-06", "conventional"),
+]
+
+
+
+def _track(n: int, seed: int):
+    # Closed, randomly rotated circuit outline
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    a, b, c = rng.uniform(0.15, 0.35, 3)
+    r = 1 + a * np.cos(2 * t + 1) + b * np.sin(3 * t) + c * np.cos(5 * t + 2) * 0.3
+    x = 4000 * r * np.cos(t)
+    y = 2000 * r * np.sin(t)
+    angle = rng.uniform(0, np.pi)
+    xr = x * np.cos(angle) - y * np.sin(angle)
+    yr = x * np.sin(angle) + y * np.cos(angle)
+    return xr, yr
+
+
+
+def write_session(
+        path: str,
+        year: int,
+        event_idx: int,
+        session: str,
+        n_laps: int,
+        samples_per_lap: int,
+        seed: int,
+        telemetry: bool = True) -> None:
+
+    rng = np.random.default_rng(seed)
+    os.makedirs(path, exist_ok=True)
+    drivers = [(d, team) for team, (_, _, ds) in TEAMS.items() for d in ds]
+    pace = {d: rng.normal(90, 0.6) for d, _ in drivers}
+    order = sorted(pace, key=pace.get)
+    start = pd.Timestamp(f"{year}-{EVENTS[event_idx][3]}") + pd.Timedelta(hours=14)
+    session_offset = pd.Timedelta(minutes=55)
+
+    # Results
+    points_table = SPRINT_POINTS if session == "sprint" else RACE_POINTS if session == "race" else []
+    results = pd.DataFrame({
+        "DriverNumber": [str(i + 1) for i in range(len(order))],
+        "Abbreviation": order,
+        "FullName": [f"Driver {d.title()}" for d in order],
+        "TeamName": [dict(drivers)[d] for d in order],
+        "TeamColorFastf1": ["#" + TEAMS[dict(drivers)[d]][0] for d in order],
+        "TeamColorOfficial": ["#" + TEAMS[dict(drivers)[d]][1] for d in order],
+        "Position": np.arange(1, len(order) + 1, dtype=float),
+        "ClassifiedPosition": [str(i) for i in range(1, len(order) + 1)],
+        "GridPosition": rng.permutation(len(order)).astype(float) + 1,
+        "Status": "Finished",
+        "Points": [float(points_table[i]) if i < len(points_table) else 0.0 for i in range(len(order))],
+    })
+    results.to_parquet(f"{path}/results.parquet")
+
+    # Laps
+    rows = []
+    sc_lap = n_laps // 2
+    for d, team in drivers:
+        t = session_offset
+        pit_lap = int(rng.integers(n_laps // 3, 2 * n_laps // 3))
+        for lap in range(1, n_laps + 1):
+            stint = 1 if lap <= pit_lap else 2
+            compound = "MEDIUM" if stint == 1 else "HARD"
+            tyre_life = lap if stint == 1 else lap - pit_lap
+            lt = pace[d] + 0.05 * tyre_life + rng.normal(0, 0.3)
+            if lap == 1:
+                lt += 5
+            if lap in (sc_lap, sc_lap + 1):
+                lt += 30
+            if lap == pit_lap:
+                lt += 20
+            lap_start = t
+            t = t + pd.Timedelta(seconds=lt)
+            rows.append({
+                "Time": t,
+                "Driver": d,
+                "DriverNumber": str(order.index(d) + 1),
+                "LapTime": pd.Timedelta(seconds=lt),
+                "LapNumber": float(lap),
+                "Stint": float(stint),
+                "PitOutTime": lap_start if lap == pit_lap + 1 else pd.NaT,
+                "PitInTime": t if lap == pit_lap else pd.NaT,
+                "Compound": compound,
+                "CompoundColor": COMPOUND_COLORS[compound],
+                "TyreLife": float(tyre_life),
+                "Team": team,
+                "LapStartTime": lap_start,
+                "LapStartDate": start + lap_start,
+                "TrackStatus": "4" if lap in (sc_lap, sc_lap + 1) else "1",
+                "IsAccurate": lap not in (1, pit_lap, pit_lap + 1),
+            })
+    laps = pd.DataFrame(rows)
+    laps["Position"] = laps.groupby("LapNumber")["Time"].rank().astype(float)
+
+    # Weather
+    end = laps["Time"].max()
+    times = pd.timedelta_range(pd.Timedelta(0), end + pd.Timedelta(minutes=1), freq="60s")
+    weather = pd.DataFrame({
+        "Time": times,
+        "AirTemp": 20 + np.cumsum(rng.normal(0, 0.1, len(times))),
+        "Humidity": 50 + rng.normal(0, 1, len(times)),
+        "Pressure": 1012 + rng.normal(0, 0.2, len(times)),
+        "Rainfall": False,
+        "TrackTemp": 35 + np.cumsum(rng.normal(0, 0.2, len(times))),
+        "WindDirection": rng.integers(0, 360, len(times)),
+        "WindSpeed": np.abs(rng.normal(2, 0.5, len(times))),
+    })
+    weather.to_parquet(f"{path}/weather.parquet")
+
+    # Race control and session status
+    sc_start = laps[laps["LapNumber"] == sc_lap]["LapStartDate"].min()
+    sc_end = laps[laps["LapNumber"] == sc_lap + 1]["LapStartDate"].max() + pd.Timedelta(seconds=100)
+    rcm = pd.DataFrame({
+        "Time": [start, sc_start, sc_end, start + end],
+        "Category": ["Flag", "SafetyCar", "SafetyCar", "Flag"],
+        "Message": ["GREEN LIGHT - PIT EXIT OPEN", "SAFETY CAR DEPLOYED", "SAFETY CAR IN THIS LAP", "CHEQUERED FLAG"],
+        "Status": [None, "DEPLOYED", "IN THIS LAP", None],
+        "Flag": ["GREEN", None, None, "CHEQUERED"],
+        "Scope": ["Track", None, None, "Track"],
+        "Sector": np.nan,
+        "RacingNumber": None,
+        "Lap": [1, sc_lap, sc_lap + 1, n_laps],
+    })
+    rcm.to_parquet(f"{path}/race_control_messages.parquet")
+
+    # Track status feed, the Safety Car is out from its first lap until the leader ends its second
+    sc_laps = laps[laps["LapNumber"].isin([sc_lap, sc_lap + 1])]
+    df_track_status = pd.DataFrame({
+        "Time": [pd.Timedelta(0), sc_laps["LapStartTime"].min(), sc_laps[sc_laps["LapNumber"] == sc_lap + 1]["Time"].min()],
+        "Status": ["1", "4", "1"],
+        "Message": ["AllClear", "SCDeployed", "AllClear"],
+    })
+    df_track_status.to_parquet(f"{path}/track_status.parquet")
+
+    # Laps with the status and weather of every lap, as ingest stores them
+    laps["LapStatus"] = track_status.classify_laps(laps, track_status.intervals_from_track_status(df_track_status, laps["Time"].max()))
+    ingest.add_lap_weather(laps, weather).to_parquet(f"{path}/laps.parquet")
+    pd.DataFrame({
+        "Time": [session_offset, end],
+        "Status": ["Started", "Finished"],
+    }).to_parquet(f"{path}/session_status.parquet")
+
+    if not telemetry:
+        return
+
+    # Telemetry
+    xs, ys = _track(samples_per_lap, event_idx)
+    seg = np.hypot(np.diff(xs, append=xs[0]), np.diff(ys, append=ys[0]))
+    dist = np.concatenate([[0], np.cumsum(seg)[:-1]])
+    heading = np.unwrap(np.arctan2(np.gradient(ys), np.gradient(xs)))
+    curvature = np.abs(np.gradient(heading))
+    base_speed = np.clip(340 - 40000 * curvature / curvature.max() * 0.006, 80, 330)
+    frames = []
+    for d, team in drivers:
+        dl = laps[laps["Driver"] == d]
+        for _, lap_row in dl.iterrows():
+            speed = base_speed * (1 + rng.normal(0, 0.01)) + rng.normal(0, 2, samples_per_lap)
+            lap_secs = lap_row["LapTime"].total_seconds()
+            frac = np.cumsum(1 / speed)
+            frac = np.concatenate([[0], frac[:-1]]) / frac[-1]
+            rel = pd.to_timedelta(frac * lap_secs, unit="s")
+            gear = np.clip(np.digitize(speed, [90, 130, 170, 210, 245, 275, 300]) + 1, 1, 8)
+            frames.append(pd.DataFrame({
+                "Date": start + lap_row["LapStartTime"] + rel,
+                "SessionTime": lap_row["LapStartTime"] + rel,
+                "Time": rel,
+                "RPM": 9000 + speed * 10,
+                "Speed": speed,
+                "nGear": gear,
+                "Throttle": np.clip((speed - 100) / 2, 0, 100),
+                "Brake": np.gradient(speed) < -1.5,
+                "DRS": 0,
+                "Distance": dist,
+                "X": xs + rng.normal(0, 3, samples_per_lap),
+                "Y": ys + rng.normal(0, 3, samples_per_lap),
+                "Z": 0.0,
+                "driver": d,
+                "lap": int(lap_row["LapNumber"]),
+                "Team": team,
+            }))
+    pd.concat(frames, ignore_index=True).to_parquet(f"{path}/telemetry_data.parquet", index=False)
+
+
+
+def write_tree(
+        dir: str,
+        year: int = 2025,
+        n_laps: int = 20,
+        samples_per_lap: int = 200,
+        telemetry: bool = True) -> None:
+    """
+    Writes the schedule and the qualifying, sprint and race sessions of a synthetic season.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - n_laps (int): laps of a race, sprints run half of them
+    - samples_per_lap (int): telemetry samples of every lap
+    - telemetry (bool): also write telemetry_data.parquet (the largest file)
+    """
+
+    rows = []
+    for i, (name, country, location, date, fmt) in enumerate(EVENTS):
+        date = f"{year}-{date}"
+        dir_name = f"{date}_{name.replace(' ', '_').lower()}"
+        sessions = ["Practice 1", "Sprint Qualifying", "Sprint", "Qualifying", "Race"] if fmt != "conventional" else ["Practice 1", "Practice 2", "Practice 3", "Qualifying", "Race"]
+        rows.append({
+            "RoundNumber": i + 1, "Country": country, "Location": location,
+            "OfficialEventName": f"FORMULA 1 {name.upper()} {year}", "EventDate": pd.Timestamp(date),
+            "EventName": name, "EventFormat": fmt,
+            **{f"Session{j + 1}": s for j, s in enumerate(sessions)},
+            **{f"Session{j + 1}Date": pd.Timestamp(date) - pd.Timedelta(days=2 - j // 2) for j in range(5)},
+            "DirName": dir_name,
+        })
+        for s in sessions:
+            if s in ("Race", "Sprint", "Qualifying"):
+                key = s.lower().replace(" ", "_")
+                write_session(f"{dir}/{year}/{dir_name}/{key}", year, i, key,
+                              n_laps if s == "Race" else n_laps // 2 if s == "Sprint" else 6,
+                              samples_per_lap, seed=i * 10 + len(key), telemetry=telemetry)
+    pd.DataFrame(rows).to_parquet(f"{dir}/{year}/schedule.parquet")
+
+
+def write_drivers_wiki(dir: str) -> None:
+    # Today's drivers lists, so the app doesn't scrape Wikipedia
+    today = datetime.today().strftime('%d-%m-%Y')
+    drivers = [f"Driver {d.title()}" for _, (_, _, ds) in TEAMS.items() for d in ds] + ["Old Champion"]
+    n = len(drivers)
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "Driver name": drivers, "Nationality": "X", "Seasons competed": "2020",
+        "Drivers' Championships": rng.integers(0, 3, n), "Race entries": rng.integers(1, 300, n),
+        "Race starts": rng.integers(1, 300, n), "Pole positions": rng.integers(0, 100, n),
+        "Race wins": rng.integers(0, 100, n), "Podiums": rng.integers(0, 100, n),
+        "Fastest laps": rng.integers(0, 60, n), "Points": rng.uniform(0, 4000, n),
+    }).to_parquet(f"{dir}/f1_drivers_wiki_{today}.parquet")
+    for category in ["f2", "f3"]:
+        pd.DataFrame({"Driver name": drivers, "Entries": "10"}).to_parquet(f"{dir}/{category}_drivers_wiki_{today}.parquet")
+
+
+
+# Header cells of the drivers tables as Wikipedia marks them up, the text of each becomes a column name
+WIKI_HEADERS = {
+    "f1": ["Driver name", "Nationality", "Seasons competed", "Drivers' Championships", "Race entries", "Race starts",
+           "Pole positions", "Race wins", "Podiums", "Fastest laps", 'Points<sup class="reference"><a href="#cite_note-a">[a]</a></sup>'],
+    "f2": ["Name", "Nationality", "Seasons", "Championship<br/>titles", "Entries", "Starts", "Poles", "Sprint wins",
+           "Feature Wins", "Total wins", "Podiums", 'Fastest<br/>laps<sup class="reference"><a href="#cite_note-a">[a]</a></sup>', "Points"],
+    "f3": ["Name", "Nationality", "Seasons", "Championship<br/>titles", "Entries", "Starts", "Poles", "Sprint wins",
+           "Feature Wins", "Total wins", "Podiums", 'Fastest<br/>laps<sup class="reference"><a href="#cite_note-a">[a]</a></sup>', "Points"],
+}
+
+WIKI_ROWS = {"f1": 780, "f2": 260, "f3": 420}
+
+
+
+def _wiki_row(category: str, rng: np.random.Generator, i: int) -> str:
+    first, last = f"First{i}", f"Surname{i}"
+    marker = rng.choice(["", "", "", "<sup>~</sup>", "<sup>*</sup>", "<sup>^</sup>"])
+    note = f'<sup class="reference"><a href="#cite_note-{i}">[{i % 40 + 1}]</a></sup>' if rng.random() < 0.1 else ""
+    name = f'<span data-sort-value="{last}, {first}"><span class="vcard"><span class="fn"><a href="/wiki/{first}_{last}" title="{first} {last}">{first} {last}</a></span></span></span>{marker}{note}'
+    nationality = f'<span class="flagicon"><span class="mw-image-border"><img alt="" src="//upload.wikimedia.org/flag{i % 30}.svg" width="23" height="15"/></span></span>&nbsp;<a href="/wiki/Country{i % 30}">Country {i % 30}</a>'
+    start = int(rng.integers(1950, 2024))
+    seasons = f"{start}&#8211;{start + int(rng.integers(0, 15))}"
+
+    titles = int(rng.choice([0] * 20 + [1, 2, 3, 4, 7]))
+    titles_cell = f'{titles}<br/><span style="font-size:85%;">{", ".join(str(start + k) for k in range(titles))}</span>' if titles else "0"
+
+    def count(high, footnote=0.03):
+        value = int(rng.integers(0, high))
+        return f'{value}<sup class="reference"><a href="#cite_note-b">[b]</a></sup>' if rng.random() < footnote else str(value)
+
+    points = f"{rng.integers(0, 4000)}.5" if rng.random() < 0.2 else str(int(rng.integers(0, 400)))
+
+    if category == "f1":
+        cells = [name, nationality, seasons, titles_cell, count(400), count(400), count(100), count(100), count(200), count(70), points]
+    else:
+        cells = [name, nationality, seasons, titles_cell, count(80), count(80), count(15), count(15), count(15), count(25), count(40), count(20), points]
+
+    return "<tr>\n" + "".join(f"<td>{cell}\n</td>" for cell in cells) + "</tr>\n"
+
+
+
+def write_wiki_fixtures(output_dir: str, seed: int = 0) -> None:
+    """
+    Writes drivers list pages in the markup of the Wikipedia lists scrape.py reads (legend table,
+    drivers table, summary table, footnotes and sort keys), for parsing benchmarks without network.
+
+    Arguments:
+    - output_dir (str): directory the {category}_drivers.html files are written to
+    - seed (int): random seed
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    for category, headers in WIKI_HEADERS.items():
+        legend = '<table class="wikitable"><tbody><tr><th>Symbol</th><th>Meaning</th></tr><tr><td>~</td><td>Active driver</td></tr><tr><td>*</td><td>World champion</td></tr></tbody></table>\n'
+        header_row = "<tr>" + "".join(f"<th>{header}\n</th>" for header in headers) + "</tr>\n"
+        rows = "".join(_wiki_row(category, rng, i) for i in range(WIKI_ROWS[category]))
+        drivers = f'<table class="wikitable sortable plainrowheaders" style="font-size:85%; text-align:center;">\n<tbody>{header_row}{rows}</tbody></table>\n'
+        summary = '<table class="wikitable"><tbody><tr><th>Country</th><th>Drivers</th></tr>' + "".join(f"<tr><td>Country {k}</td><td>{k}</td></tr>" for k in range(30)) + "</tbody></table>\n"
+
+        # Navigation, scripts and prose around the tables, real pages are mostly this
+        filler = "".join(f'<p>Paragraph {k} about the championship <a href="/wiki/Link{k}">link</a>.<sup class="reference"><a href="#cite_note-{k}">[{k}]</a></sup></p>\n' for k in range(400))
+        navigation = '<div class="navbox">' + "".join(f'<li><a href="/wiki/Nav{k}">Nav {k}</a></li>' for k in range(1500)) + "</div>\n"
+
+        page = f'<!DOCTYPE html>\n<html class="client-nojs" lang="en" dir="ltr">\n<head>\n<meta charset="UTF-8">\n<title>List of drivers</title>\n<script>var config = {{}};</script>\n</head>\n<body>\n{filler}{legend}{drivers}{summary}{navigation}</body>\n</html>\n'
+
+        with open(f"{output_dir}/{category}_drivers.html", "w", encoding="utf-8") as f:
+            f.write(page)
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+
+    # python synthetic_data.py /tmp/f1_data 2026
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else "/tmp/f1_data"
+    write_tree(output_dir, int(sys.argv[2]) if len(sys.argv) > 2 else datetime.today().year)
+    write_drivers_wiki(output_dir)
@@ -0,0 +1,271 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import data_access
+
+
+# FastF1 session.track_status: Time (session time), Status code and Message of every change
+TRACK_STATUS_FILE = "track_status.parquet"
+RACE_CONTROL_FILE = "race_control_messages.parquet"
+
+# Track status codes that neutralise the race, 1 (green), 2 (yellow) and 3 are racing laps
+STATUS_CODES = {"4": "Safety Car", "5": "Red Flag", "6": "VSC", "7": "VSC"}
+
+# Every lap gets the first status of this list it has any part of, a lap the Safety Car came
+# out in is a Safety Car lap even if it ended under VSC
+LAP_STATUSES = ["Red Flag", "Safety Car", "VSC", "Pit In", "Pit Out", "Green"]
+
+# Laps that are not run at racing speed whoever drives them
+NEUTRALISED_STATUSES = ["Red Flag", "Safety Car", "VSC"]
+
+
+
+def _lap_windows(laps: pd.DataFrame) -> tuple:
+    # Session time every lap starts and ends at, laps missing one take it from the lap time
+    start = laps["LapStartTime"].fillna(laps["Time"] - laps["LapTime"])
+    end = laps["Time"].fillna(laps["LapStartTime"] + laps["LapTime"])
+    return start.to_numpy(dtype="timedelta64[ns]"), end.to_numpy(dtype="timedelta64[ns]")
+
+
+
+def intervals_from_track_status(track_status: pd.DataFrame, session_end: pd.Timedelta) -> pd.DataFrame:
+    """
+    Neutralised intervals from the track status feed, every status lasts until the next one.
+
+    Arguments:
+    - track_status (pd.DataFrame): Time and Status of every status change
+    - session_end (pd.Timedelta): end of the last status
+
+    Return:
+    - Status, Start and End (session time) of every Safety Car, VSC and red flag period (pd.DataFrame)
+    """
+
+    track_status = track_status.dropna(subset=["Time"]).sort_values("Time", kind="stable")
+    start = track_status["Time"].reset_index(drop=True)
+    end = start.shift(-1).fillna(max(session_end, start.max()) if len(start) else session_end)
+
+    df_intervals = pd.DataFrame({
+        "Status": track_status["Status"].astype(str).str.strip().map(STATUS_CODES).to_numpy(),
+        "Start": start,
+        "End": end,
+    })
+
+    return df_intervals.dropna(subset=["Status"]).reset_index(drop=True)
+
+
+
+def intervals_from_race_control(messages: pd.DataFrame, laps: pd.DataFrame) -> pd.DataFrame:
+    """
+    Neutralised intervals rebuilt from race control messages, for sessions stored without the
+    track status feed. A Safety Car period ends when the leader crosses the line after "IN THIS
+    LAP", a VSC at "ENDING" and a red flag at the next green flag.
+
+    Arguments:
+    - messages (pd.DataFrame): race control messages, Time is wall clock time
+    - laps (pd.DataFrame): laps of the session, LapStartDate - LapStartTime gives the session start
+
+    Return:
+    - Status, Start and End (session time) of every Safety Car, VSC and red flag period (pd.DataFrame)
+    """
+
+    empty = pd.DataFrame({"Status": pd.Series(dtype=object), "Start": pd.Series(dtype="timedelta64[ns]"), "End": pd.Series(dtype="timedelta64[ns]")})
+    if not len(messages) or "LapStartDate" not in laps.columns:
+        return empty
+
+    # Wall clock times to session time
+    t0 = (laps["LapStartDate"] - laps["LapStartTime"]).median()
+    if pd.isna(t0):
+        return empty
+
+    messages = messages.dropna(subset=["Time"]).sort_values("Time", kind="stable")
+    time = (messages["Time"] - t0).to_numpy(dtype="timedelta64[ns]")
+    message = messages["Message"].fillna("").astype(str).str.upper()
+    flag = messages["Flag"].fillna("").astype(str).str.upper() if "Flag" in messages.columns else pd.Series("", index=messages.index)
+
+    _, lap_end = _lap_windows(laps)
+    crossings = np.sort(lap_end[~np.isnat(lap_end)])
+    session_end = crossings[-1] if len(crossings) else np.timedelta64(0, "ns")
+
+    safety_car = message.str.contains("SAFETY CAR") & ~message.str.contains("VIRTUAL")
+    virtual = message.str.contains("VIRTUAL SAFETY CAR")
+
+    events = {
+        # Status: (starts, ends)
+        "Safety Car": (safety_car & message.str.contains("DEPLOYED"), safety_car & message.str.contains("IN THIS LAP")),
+        "VSC": (virtual & message.str.contains("DEPLOYED"), virtual & message.str.contains("ENDING")),
+        "Red Flag": (flag == "RED", flag.isin(["GREEN", "CHEQUERED"])),
+    }
+
+    frames = []
+    for status, (is_start, is_end) in events.items():
+        starts, ends = time[is_start.to_numpy()], time[is_end.to_numpy()]
+        if status == "Safety Car":
+            # The field is released at the leader's next line crossing
+            ends = np.r_[crossings, session_end][np.searchsorted(crossings, ends, side="right")]
+
+        # Every start is closed by the first end after it, periods still open end with the session
+        ends = np.sort(ends)
+        frames.append(pd.DataFrame({
+            "Status": status,
+            "Start": starts,
+            "End": np.r_[ends, session_end][np.searchsorted(ends, starts, side="right")],
+        }))
+
+    return pd.concat([empty] + frames, ignore_index=True)
+
+
+
+def classify_laps(laps: pd.DataFrame, intervals: pd.DataFrame) -> pd.Series:
+    """
+    Status of every lap from an interval join of the lap windows against the neutralised periods,
+    one sorted search per status rather than a loop over laps.
+
+    Arguments:
+    - laps (pd.DataFrame): laps with LapStartTime, Time, LapTime, PitInTime and PitOutTime
+    - intervals (pd.DataFrame): output of intervals_from_track_status or intervals_from_race_control
+
+    Return:
+    - one of LAP_STATUSES per lap, None for laps that can't be placed in the session (pd.Series)
+    """
+
+    lap_start, lap_end = _lap_windows(laps)
+    placed = ~np.isnat(lap_start) & ~np.isnat(lap_end)
+
+    found = {}
+    for status in NEUTRALISED_STATUSES:
+        periods = intervals[intervals["Status"] == status].sort_values("Start")
+        starts = periods["Start"].to_numpy(dtype="timedelta64[ns]")
+
+        # Overlapping periods merged by carrying the latest end forward, starts and ends are both
+        # sorted and a lap touches a period when fewer periods ended before it than started
+        ends = np.maximum.accumulate(periods["End"].to_numpy(dtype="timedelta64[ns]")) if len(periods) else starts
+        found[status] = np.searchsorted(starts, lap_end, side="left") > np.searchsorted(ends, lap_start, side="right")
+
+    found["Pit In"] = laps["PitInTime"].notna().to_numpy() if "PitInTime" in laps.columns else np.zeros(len(laps), dtype=bool)
+    found["Pit Out"] = laps["PitOutTime"].notna().to_numpy() if "PitOutTime" in laps.columns else np.zeros(len(laps), dtype=bool)
+    found["Green"] = np.ones(len(laps), dtype=bool)
+
+    # First matching status in priority order
+    statuses = np.array(LAP_STATUSES, dtype=object)
+    status = statuses[np.argmax(np.column_stack([found[status] for status in LAP_STATUSES]), axis=1)]
+
+    return pd.Series(np.where(placed, status, None), index=laps.index, name="LapStatus")
+
+
+
+def session_intervals(session_dir: str, laps: pd.DataFrame) -> pd.DataFrame:
+    # Track status feed when the session has it, race control messages otherwise, None without either
+    track_status_path = f"{session_dir}/{TRACK_STATUS_FILE}"
+    race_control_path = f"{session_dir}/{RACE_CONTROL_FILE}"
+
+    if os.path.exists(track_status_path):
+        _, lap_end = _lap_windows(laps)
+        session_end = pd.Timedelta(np.max(lap_end[~np.isnat(lap_end)], initial=np.timedelta64(0, "ns")))
+        return intervals_from_track_status(data_access.read_table(session_dir, "track_status", columns=["Time", "Status"]), session_end)
+
+    if os.path.exists(race_control_path):
+        return intervals_from_race_control(data_access.read_table(session_dir, "race_control_messages", columns=["Time", "Message"], optional=["Flag"]), laps)
+
+    return None
+
+
+
+def filter_laps_by_status(laps: pd.DataFrame, statuses: list) -> pd.DataFrame:
+    # Laps without a materialized status are kept as they are
+    if "LapStatus" not in laps.columns:
+        return laps
+    return laps[laps["LapStatus"].isin(statuses)]
+
+
+
+def has_lap_status(session_dir: str) -> bool:
+    # Present and at least as new as the status data it was classified from
+    laps_path = f"{session_dir}/laps.parquet"
+    if "LapStatus" not in pq.read_schema(laps_path).names:
+        return False
+
+    sources = [f"{session_dir}/{name}" for name in [TRACK_STATUS_FILE, RACE_CONTROL_FILE] if os.path.exists(f"{session_dir}/{name}")]
+    return all(os.stat(laps_path).st_mtime_ns >= os.stat(source).st_mtime_ns for source in sources)
+
+
+
+def materialize_lap_status(session_dir: str) -> None:
+    """
+    Rewrites laps.parquet of a session with the LapStatus of every lap, so plots can leave out
+    neutralised and pit laps with a column filter.
+
+    Arguments:
+    - session_dir (str): directory holding laps.parquet and track_status.parquet or
+      race_control_messages.parquet
+    """
+
+    # Every column, the laps are written back whole
+    laps_path = f"{session_dir}/laps.parquet"
+    df_laps = pd.read_parquet(laps_path)
+
+    intervals = session_intervals(session_dir, df_laps)
+    if intervals is None:
+        print(f"No track status or race control data for {session_dir}, skipping.")
+        return
+
+    df_laps["LapStatus"] = classify_laps(df_laps, intervals)
+
+    # Write next to the target and swap, so readers never see a half-written file
+    with data_access.replacing(laps_path) as tmp_path:
+        df_laps.to_parquet(tmp_path)
+
+
+
+def backfill_lap_status(dir: str, year: int) -> None:
+    """
+    Materializes the lap status for every session of a season that does not have an up to date one.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    """
+
+    df_schedule = pd.read_parquet(f"{dir}/{year}/schedule.parquet", columns=["DirName"])
+
+    for dir_name in df_schedule["DirName"]:
+        event_dir = f"{dir}/{year}/{dir_name}"
+        if not os.path.isdir(event_dir):
+            continue
+
+        for session in sorted(os.listdir(event_dir)):
+            session_dir = f"{event_dir}/{session}"
+            if os.path.exists(f"{session_dir}/laps.parquet") and not has_lap_status(session_dir):
+                materialize_lap_status(session_dir)
+                print(f"Lap status added: {session_dir}")
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+
+    session_dir = sys.argv[1] if len(sys.argv) > 1 else "/tmp/f1_data/2025/2025-03-23_chinese_grand_prix/race"
+    df_laps = pd.read_parquet(f"{session_dir}/laps.parquet")
+
+    intervals = session_intervals(session_dir, df_laps)
+    print(intervals)
+
+    lap_status = classify_laps(df_laps, intervals)
+    print(lap_status.value_counts(dropna=False))
+
+    # Same classification lap by lap, the slow way
+    lap_start, lap_end = _lap_windows(df_laps)
+    for i in range(len(df_laps)):
+        expected = "Green"
+        if pd.notna(df_laps["PitOutTime"].iloc[i]):
+            expected = "Pit Out"
+        if pd.notna(df_laps["PitInTime"].iloc[i]):
+            expected = "Pit In"
+        for status in NEUTRALISED_STATUSES[::-1]:
+            periods = intervals[intervals["Status"] == status]
+            if ((periods["Start"] < lap_end[i]) & (periods["End"] > lap_start[i])).any():
+                expected = status
+        assert lap_status.iloc[i] == expected, (i, lap_status.iloc[i], expected)
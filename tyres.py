@@ -0,0 +1,283 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+
+import data_access
+
+
+DEGRADATION_FILE = "tyre_degradation.parquet"
+
+LAP_COLUMNS = [
+    "Driver", "Team", "LapNumber", "LapTime", "Compound", "CompoundColor",
+    "Stint", "TyreLife", "PitInTime", "PitOutTime", "TrackStatus", "LapStatus"
+]
+
+# Track status codes of laps run behind the Safety Car or under VSC/red flag
+NEUTRALISED_STATUS = r"[4567]"
+
+# Laps slower than this share of the stint median are traffic, mistakes or cool down laps
+SLOW_LAP_THRESHOLD = 1.07
+
+
+
+def detect_stints(laps: pd.DataFrame) -> pd.DataFrame:
+    """
+    Numbers the tyre stints of every driver. A new stint starts on a driver's first lap, on a
+    pit out lap, when the compound changes or when the Stint counter changes.
+
+    Arguments:
+    - laps (pd.DataFrame): laps of a session with Driver, LapNumber and Compound
+
+    Return:
+    - Copy of laps sorted by driver and lap with StintNumber and StintLap columns (pd.DataFrame)
+    """
+
+    laps = laps.sort_values(["Driver", "LapNumber"]).reset_index(drop=True)
+
+    new_driver = laps["Driver"].ne(laps["Driver"].shift())
+    # Missing compounds compare equal to each other, NaN != NaN would start a stint on every such lap
+    compound = laps["Compound"].astype(object).fillna("UNKNOWN")
+    new_stint = new_driver | compound.ne(compound.shift())
+
+    if "PitOutTime" in laps.columns:
+        new_stint |= laps["PitOutTime"].notna()
+    if "Stint" in laps.columns:
+        new_stint |= laps["Stint"].ne(laps["Stint"].shift()) & laps["Stint"].notna()
+
+    laps["StintNumber"] = new_stint.astype(int).groupby(laps["Driver"]).cumsum()
+    laps["StintLap"] = laps.groupby(["Driver", "StintNumber"]).cumcount() + 1
+
+    return laps
+
+
+
+def fit_degradation(laps: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fits lap time against tyre age for every stint of a session at once (batched least squares).
+
+    Arguments:
+    - laps (pd.DataFrame): laps of a session, see LAP_COLUMNS
+
+    Return:
+    - One row per stint with its compound, laps, degradation slope (s/lap) and fit quality (pd.DataFrame)
+    """
+
+    laps = detect_stints(laps)
+    laps["Lap Time (s)"] = laps["LapTime"].dt.total_seconds()
+
+    tyre_age = laps["TyreLife"] if "TyreLife" in laps.columns else laps["StintLap"]
+    laps["TyreAge"] = tyre_age.fillna(laps["StintLap"]).astype(float)
+
+    # Representative laps only: timed, not the first lap, no pit in/out, not neutralised
+    fit = laps["Lap Time (s)"].notna() & (laps["LapNumber"] > 1)
+    if "PitInTime" in laps.columns:
+        fit &= laps["PitInTime"].isna()
+    if "PitOutTime" in laps.columns:
+        fit &= laps["PitOutTime"].isna()
+    if "LapStatus" in laps.columns:
+        fit &= laps["LapStatus"] == "Green"
+    elif "TrackStatus" in laps.columns:
+        fit &= ~laps["TrackStatus"].astype(str).str.contains(NEUTRALISED_STATUS, regex=True, na=False)
+
+    stint_keys = ["Driver", "StintNumber"]
+    stint_median = laps["Lap Time (s)"].where(fit).groupby([laps[k] for k in stint_keys]).transform("median")
+    fit &= laps["Lap Time (s)"] <= stint_median * SLOW_LAP_THRESHOLD
+
+    # Per stint sums of a straight line fit, accumulated for all stints in one pass
+    codes, _ = pd.factorize(pd.MultiIndex.from_frame(laps[stint_keys]))
+    n_stints = codes.max() + 1
+    w = fit.to_numpy(dtype=float)
+    x = laps["TyreAge"].to_numpy()
+    y = np.nan_to_num(laps["Lap Time (s)"].to_numpy())
+
+    n = np.bincount(codes, weights=w, minlength=n_stints)
+    sx = np.bincount(codes, weights=w * x, minlength=n_stints)
+    sy = np.bincount(codes, weights=w * y, minlength=n_stints)
+    sxx = np.bincount(codes, weights=w * x * x, minlength=n_stints)
+    sxy = np.bincount(codes, weights=w * x * y, minlength=n_stints)
+    syy = np.bincount(codes, weights=w * y * y, minlength=n_stints)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_x = n * sxx - sx ** 2
+        var_y = n * syy - sy ** 2
+        cov_xy = n * sxy - sx * sy
+        slope = np.where((n >= 3) & (var_x > 0), cov_xy / var_x, np.nan)
+        intercept = (sy - slope * sx) / n
+        r2 = np.where(var_y > 0, cov_xy ** 2 / (var_x * var_y), np.nan)
+
+    laps["_code"] = codes
+    agg = {
+        "Driver": ("Driver", "first"),
+        "Team": ("Team", "first"),
+        "StintNumber": ("StintNumber", "first"),
+        "Compound": ("Compound", "first"),
+        "StartLap": ("LapNumber", "min"),
+        "EndLap": ("LapNumber", "max"),
+        "Laps": ("LapNumber", "size"),
+        "StartTyreAge": ("TyreAge", "min"),
+    }
+    if "CompoundColor" in laps.columns:
+        agg["CompoundColor"] = ("CompoundColor", "first")
+
+    stints = laps.groupby("_code").agg(**agg).sort_index()
+    stints["FitLaps"] = n.astype(int)
+    stints["MeanLapTime"] = np.where(n > 0, sy / np.where(n > 0, n, 1), np.nan)
+    stints["Degradation"] = slope
+    stints["Intercept"] = intercept
+    stints["R2"] = r2
+
+    return stints.reset_index(drop=True)
+
+
+
+def _session_laps(session_dir: str) -> pd.DataFrame:
+    return data_access.read_table(session_dir, "laps", optional=LAP_COLUMNS)
+
+
+
+def load_degradation(session_dir: str, persist: bool = True) -> pd.DataFrame:
+    """
+    Returns the stint degradation table of a session, fitting and persisting it when laps.parquet
+    is newer than the stored table.
+
+    Arguments:
+    - session_dir (str): directory holding laps.parquet
+    - persist (bool): store the fitted table, False fits it in memory only (the dashboard)
+
+    Return:
+    - Output of fit_degradation (pd.DataFrame)
+    """
+
+    laps_path = f"{session_dir}/laps.parquet"
+    file_path = f"{session_dir}/{DEGRADATION_FILE}"
+
+    if os.path.exists(file_path) and os.stat(file_path).st_mtime_ns >= os.stat(laps_path).st_mtime_ns:
+        return data_access.read_parquet(file_path)
+
+    df_stints = fit_degradation(_session_laps(session_dir))
+
+    if persist:
+        with data_access.replacing(file_path) as tmp_path:
+            df_stints.to_parquet(tmp_path, index=False)
+
+    return df_stints
+
+
+
+def _season_sessions(dir: str, year: int, session: str) -> list:
+    # (session directory, round number, event) of every event of a season with the session's laps on disk
+    df_schedule = data_access.read_table(f"{dir}/{year}", "schedule", columns=["RoundNumber", "EventName", "DirName"])
+    df_schedule = df_schedule[df_schedule["RoundNumber"] > 0]
+
+    return [
+        (f"{dir}/{year}/{dir_name}/{session}", int(round_number), event)
+        for round_number, event, dir_name in df_schedule[["RoundNumber", "EventName", "DirName"]].itertuples(index=False)
+        if os.path.exists(f"{dir}/{year}/{dir_name}/{session}/laps.parquet")
+    ]
+
+
+
+def _load_event_degradation(args):
+    session_dir, round_number, event, persist = args
+    df_stints = load_degradation(session_dir, persist)
+    df_stints.insert(0, "RoundNumber", round_number)
+    df_stints.insert(1, "EventName", event)
+    return df_stints
+
+
+
+def scan_season_degradation(
+        dir: str,
+        year: int,
+        session: str = "race",
+        workers: int = None,
+        persist: bool = True) -> pd.DataFrame:
+    """
+    Fits tyre degradation for one session type of every event of a season in parallel and
+    stores the combined table next to the schedule.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - session (str): session directory name, e.g. "race" or "sprint"
+    - workers (int): number of processes, defaults to the number of CPUs, 1 runs in this process
+    - persist (bool): store the season and session tables, False fits them in memory only
+
+    Return:
+    - Stints of the whole season with RoundNumber and EventName (pd.DataFrame)
+    """
+
+    tasks = _season_sessions(dir, year, session)
+
+    if not tasks:
+        return pd.DataFrame()
+
+    tasks = [task + (persist,) for task in tasks]
+    if workers == 1:
+        df_season = pd.concat(map(_load_event_degradation, tasks), ignore_index=True)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            df_season = pd.concat(list(executor.map(_load_event_degradation, tasks)), ignore_index=True)
+
+    if not persist:
+        return df_season
+
+    file_path = f"{dir}/{year}/{session}_{DEGRADATION_FILE}"
+    # The rounds scanned go with the table, events published later with older files are still picked up
+    table = pa.Table.from_pandas(df_season, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, b"rounds": json.dumps([task[1] for task in tasks]).encode()})
+    with data_access.replacing(file_path) as tmp_path:
+        pq.write_table(table, tmp_path)
+
+    return df_season
+
+
+
+def load_season_degradation(
+        dir: str,
+        year: int,
+        session: str = "race",
+        workers: int = None,
+        persist: bool = True) -> pd.DataFrame:
+    """
+    Returns the stored season degradation table, scanning the season again when a session's laps
+    are newer than the table or the rounds with laps on disk are not the ones it was built from.
+    The scan is stored unless persist is False.
+    """
+
+    file_path = f"{dir}/{year}/{session}_{DEGRADATION_FILE}"
+    if not os.path.exists(file_path):
+        return scan_season_degradation(dir, year, session, workers, persist)
+
+    tasks = _season_sessions(dir, year, session)
+    latest = max((os.stat(f"{session_dir}/laps.parquet").st_mtime_ns for session_dir, _, _ in tasks), default=0)
+
+    # Published copies keep the mtime of their source, so an event can arrive older than the table
+    metadata = pq.read_schema(file_path).metadata or {}
+    stored_rounds = json.loads(metadata.get(b"rounds", b"null"))
+
+    if os.stat(file_path).st_mtime_ns < latest or stored_rounds != [task[1] for task in tasks]:
+        return scan_season_degradation(dir, year, session, workers, persist)
+
+    return data_access.read_parquet(file_path)
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    # Two stints per driver, one of them without a compound recorded
+    df_laps = pd.DataFrame({
+        "Driver": ["VER"] * 6 + ["HAM"] * 4,
+        "LapNumber": [1, 2, 3, 4, 5, 6, 1, 2, 3, 4],
+        "Compound": [None, None, None, "HARD", "HARD", "HARD", "MEDIUM", "MEDIUM", np.nan, np.nan],
+    })
+    df_stints = detect_stints(df_laps)
+    assert df_stints.groupby("Driver")["StintNumber"].max().to_dict() == {"HAM": 2, "VER": 2}, df_stints
+    assert df_stints[df_stints["Driver"] == "VER"]["StintLap"].tolist() == [1, 2, 3, 1, 2, 3], df_stints
+
+    # print(scan_season_degradation("/Users/bartosz/f1_data", 2025))
@@ -0,0 +1,446 @@
+import argparse
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+
+import circuits
+import data_access
+import export_plots
+import plotting as fsp
+
+
+dir = "/Users/bartosz/f1_data"
+
+TELEMETRY_COLUMNS = ["driver", "lap", "Time", "Distance", "X", "Y", "Speed"]
+
+# Same fixed speed range and colour map as the speed over lap track map
+SPEED_RANGE = (50, 350)
+SPEED_CMAP = "plasma"
+
+# Seconds of track behind a ghost car drawn as its trail
+TRAIL_SECONDS = 1.5
+
+# Pixels kept free around the track and for the text at the top
+MARGIN = 40
+HUD_HEIGHT = 70
+
+# Codec written for every container, MPEG-1 program streams (.mpg) play back to back when their
+# bytes are appended so their parts are joined without decoding. Other containers are joined
+# with ffmpeg's concat demuxer when ffmpeg is installed, and decoded and written again otherwise
+FOURCC = {".mp4": "mp4v", ".avi": "MJPG", ".mpg": "PIM1"}
+CONCATENABLE = [".mpg"]
+
+# Containers without codec tags, OpenCV warns about the fourcc on every writer it opens for them
+UNTAGGED = [".mpg"]
+
+# Background and cars of the video a worker process renders, set once per process
+_video = {}
+
+
+
+def _bgr(hex_color: str) -> tuple:
+    # "#RRGGBB" to the blue, green, red order OpenCV draws in
+    hex_color = hex_color.lstrip("#")
+    return tuple(int(hex_color[i:i + 2], 16) for i in (4, 2, 0))
+
+
+
+def _speed_colors(speed: np.ndarray) -> np.ndarray:
+    # BGR colour of every speed from a 256 entry lookup table of the colour map
+    lut = (colormaps[SPEED_CMAP](np.linspace(0, 1, 256))[:, 2::-1] * 255).astype(np.uint8)
+    index = np.clip((speed - SPEED_RANGE[0]) / (SPEED_RANGE[1] - SPEED_RANGE[0]) * 255, 0, 255).astype(int)
+    return lut[index]
+
+
+
+def lap_frames(telemetry: pd.DataFrame, fps: int) -> pd.DataFrame:
+    """
+    Position, speed and distance of a car at every video frame of one lap, interpolated from the
+    telemetry samples in one pass.
+
+    Arguments:
+    - telemetry (pd.DataFrame): Time, Distance, X, Y and Speed of one lap
+    - fps (int): frames per second of the video
+
+    Return:
+    - FrameTime (s from the start of the lap), X, Y, Speed and Distance of every frame (pd.DataFrame)
+    """
+
+    telemetry = telemetry.dropna(subset=["Time", "X", "Y"]).sort_values("Time", kind="stable")
+    elapsed = (telemetry["Time"] - telemetry["Time"].iloc[0]).dt.total_seconds().to_numpy()
+    frame_time = np.arange(0, elapsed[-1], 1 / fps)
+
+    return pd.DataFrame({
+        "FrameTime": frame_time,
+        **{column: np.interp(frame_time, elapsed, telemetry[column].to_numpy(dtype=float)) for column in ["X", "Y", "Speed", "Distance"]},
+    })
+
+
+
+def _projection(outline: np.ndarray, size: tuple) -> tuple:
+    # Scale and offset fitting the rotated outline into the frame below the text, y pointing down
+    width, height = size
+    low, high = outline.min(axis=0), outline.max(axis=0)
+    scale = min((width - 2 * MARGIN) / max(high[0] - low[0], 1), (height - 2 * MARGIN - HUD_HEIGHT) / max(high[1] - low[1], 1))
+    offset = np.array([(width - (high[0] - low[0]) * scale) / 2, HUD_HEIGHT + (height - HUD_HEIGHT + (high[1] - low[1]) * scale) / 2])
+    return scale, low, offset
+
+
+
+def _to_pixels(points: np.ndarray, projection: tuple) -> np.ndarray:
+    scale, low, offset = projection
+    pixels = (points - low) * scale * np.array([1, -1]) + offset
+    return np.round(pixels).astype(np.int32)
+
+
+
+def track_background(outline: np.ndarray, projection: tuple, size: tuple, title: str) -> np.ndarray:
+    """
+    The still part of every frame, rasterised once: the track outline and the title.
+
+    Arguments:
+    - outline (np.ndarray): rotated X, Y of the circuit outline
+    - projection (tuple): output of _projection
+    - size (tuple): width and height of the video
+    - title (str): text at the top left
+
+    Return:
+    - BGR image (np.ndarray)
+    """
+
+    import cv2
+
+    width, height = size
+    background = np.zeros((height, width, 3), dtype=np.uint8)
+
+    pixels = _to_pixels(outline, projection).reshape(-1, 1, 2)
+    cv2.polylines(background, [pixels], isClosed=True, color=(70, 70, 70), thickness=14, lineType=cv2.LINE_AA)
+    cv2.putText(background, title, (MARGIN, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2, cv2.LINE_AA)
+
+    return background
+
+
+
+def open_writer(path: str, fps: int, size: tuple):
+    """
+    Opens an OpenCV video writer with the codec of the file's extension, see FOURCC.
+
+    Arguments:
+    - path (str): video file
+    - fps (int): frames per second
+    - size (tuple): width and height in pixels
+
+    Return:
+    - cv2.VideoWriter
+    """
+
+    import cv2
+
+    extension = os.path.splitext(path)[1].lower()
+    fourcc = cv2.VideoWriter_fourcc(*FOURCC[extension])
+
+    if extension in UNTAGGED:
+        # The tag warning is printed by OpenCV's C++ code straight to the stderr file descriptor
+        sys.stderr.flush()
+        stderr = os.dup(2)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 2)
+        try:
+            writer = cv2.VideoWriter(path, fourcc, fps, size)
+        finally:
+            os.dup2(stderr, 2)
+            os.close(stderr)
+            os.close(devnull)
+    else:
+        writer = cv2.VideoWriter(path, fourcc, fps, size)
+
+    if not writer.isOpened():
+        raise RuntimeError(f"Can't open a video writer for {path}")
+
+    return writer
+
+
+
+def _init_worker(background: np.ndarray, cars: list) -> None:
+    import cv2
+
+    # One thread per process, the pool already keeps every CPU busy
+    cv2.setNumThreads(1)
+
+    # Sent once per process instead of with every chunk
+    _video["background"], _video["cars"] = background, cars
+
+
+
+def _render_chunk(args) -> dict:
+    """
+    Draws frames start to stop of a video onto copies of the background and writes them to a
+    part file. Runs inside a worker process.
+    """
+
+    import cv2
+
+    start, stop, fps, path = args
+    background, cars = _video["background"], _video["cars"]
+    chunk_start = time.perf_counter()
+    height, width = background.shape[:2]
+    trail = max(int(TRAIL_SECONDS * fps), 1)
+
+    writer = open_writer(path, fps, (width, height))
+
+    # Cars leaving a speed coloured trace draw it onto a layer kept across frames, the segments
+    # before this chunk are drawn once up front
+    layer = background.copy()
+    for car in cars:
+        if car["trace"]:
+            for i in range(1, min(start, len(car["points"]))):
+                cv2.line(layer, car["points"][i - 1], car["points"][i], car["colors"][i], 5, cv2.LINE_AA)
+
+    for frame_index in range(start, stop):
+        hud = []
+        for car in cars:
+            if car["trace"] and 0 < frame_index < len(car["points"]):
+                cv2.line(layer, car["points"][frame_index - 1], car["points"][frame_index], car["colors"][frame_index], 5, cv2.LINE_AA)
+
+        frame = layer.copy()
+        for n, car in enumerate(cars):
+            i = min(frame_index, len(car["points"]) - 1)
+            position = car["points"][i]
+
+            if not car["trace"]:
+                cv2.polylines(frame, [car["pixels"][max(i - trail, 0):i + 1].reshape(-1, 1, 2)], isClosed=False, color=car["color"], thickness=4, lineType=cv2.LINE_AA)
+
+            cv2.circle(frame, position, 9, car["color"], -1, cv2.LINE_AA)
+            cv2.circle(frame, position, 9, (255, 255, 255), 1, cv2.LINE_AA)
+            # Labels above the first car and below the second, left of the car near the right edge
+            label_x = position[0] + 12 if position[0] < width - 130 else position[0] - 110
+            cv2.putText(frame, car["label"], (label_x, position[1] + (-12 if n == 0 else 28)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, car["color"], 2, cv2.LINE_AA)
+
+            hud.append(f"{car['label']} {car['speed'][i]:.0f} km/h")
+
+        seconds = frame_index / fps
+        hud.insert(0, f"{int(seconds // 60)}:{seconds % 60:06.3f}")
+        if len(cars) == 2:
+            # Metres the first car is ahead of the second at the same time into their laps
+            gap = cars[0]["distance"][min(frame_index, len(cars[0]["distance"]) - 1)] - cars[1]["distance"][min(frame_index, len(cars[1]["distance"]) - 1)]
+            hud.append(f"Gap {gap:+.0f} m")
+
+        cv2.putText(frame, " | ".join(hud), (MARGIN, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
+        writer.write(frame)
+
+    writer.release()
+
+    return {"path": path, "frames": stop - start, "seconds": time.perf_counter() - chunk_start}
+
+
+
+def stitch(parts, output: str, fps: int, size: tuple) -> None:
+    """
+    Joins part files into one video, written next to the target and swapped in. Parts can be a
+    generator, .mpg parts are appended as soon as they are yielded. Other containers are joined
+    without re-encoding by ffmpeg when it is installed, and decoded and written again otherwise.
+
+    Arguments:
+    - parts (iterable): part files in order
+    - output (str): video file, its extension picks the codec from FOURCC
+    - fps (int): frames per second
+    - size (tuple): width and height in pixels
+    """
+
+    import cv2
+
+    extension = os.path.splitext(output)[1].lower()
+    tmp_path = f"{os.path.splitext(output)[0]}.tmp{extension}"
+
+    if extension in CONCATENABLE:
+        with open(tmp_path, "wb") as f:
+            for path in parts:
+                with open(path, "rb") as part:
+                    shutil.copyfileobj(part, f)
+    elif shutil.which("ffmpeg"):
+        # Other containers have one header and index for the whole file, ffmpeg writes them for
+        # the copied packets of every part
+        list_path = f"{os.path.splitext(output)[0]}.parts.txt"
+        with open(list_path, "w") as f:
+            for path in parts:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            subprocess.run(
+                ["ffmpeg", "-v", "error", "-y", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", tmp_path],
+                check=True)
+        finally:
+            os.remove(list_path)
+    else:
+        # Without ffmpeg every frame is decoded and written again, serially
+        writer = open_writer(tmp_path, fps, size)
+        for path in parts:
+            capture = cv2.VideoCapture(path)
+            ok, frame = capture.read()
+            while ok:
+                writer.write(frame)
+                ok, frame = capture.read()
+            capture.release()
+        writer.release()
+
+    os.replace(tmp_path, output)
+
+
+
+def export_video(
+        dir: str,
+        year: int,
+        event: str,
+        session: str,
+        laps: list,
+        output: str,
+        fps: int = 30,
+        size: tuple = (1280, 720),
+        workers: int = None,
+        chunk_seconds: float = 5) -> dict:
+    """
+    Renders a video of one lap traced in speed colours, or of two laps as ghost cars racing each
+    other on the track map. Frame chunks are drawn with OpenCV across a process pool and stitched
+    into one file.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - event (str): EventName in the schedule
+    - session (str): session directory name, e.g. "race" or "qualifying"
+    - laps (list): (driver, lap) pairs, one for a lap replay, two for a ghost car comparison
+    - output (str): video file, one of the extensions of FOURCC, e.g. "lap.mpg"
+    - fps (int): frames per second
+    - size (tuple): width and height in pixels
+    - workers (int): number of processes, defaults to the number of CPUs
+    - chunk_seconds (float): seconds of video every task renders
+
+    Return:
+    - frames, seconds (wall time), render_seconds (summed over the workers) and fps (frames
+      written per second of wall time) (dict)
+    """
+
+    if os.path.splitext(output)[1].lower() not in FOURCC:
+        raise ValueError(f"Unsupported video format: {output}, expected one of {list(FOURCC)}")
+
+    session_dir = data_access.find_session_dir(dir, year, event, session)
+    telemetry = data_access.read_table(
+        session_dir, "telemetry",
+        columns=TELEMETRY_COLUMNS,
+        filters=[[("driver", "=", driver), ("lap", "=", int(lap))] for driver, lap in laps])
+
+    df_results = data_access.read_table(session_dir, "results", columns=["Abbreviation", "TeamName"])
+    teams_colors = fsp.get_teams_colors(dir, year, event, session)
+    drivers_teams = dict(zip(df_results["Abbreviation"], df_results["TeamName"]))
+
+    outline, _, rotation_angle = circuits.load_circuit(dir, year, event)
+
+    # Same counter-clockwise rotation as the track maps
+    angle_rad = np.deg2rad(rotation_angle)
+    rotation_matrix = np.array([[np.cos(angle_rad), -np.sin(angle_rad)],
+                                [np.sin(angle_rad), np.cos(angle_rad)]])
+
+    frames = [lap_frames(telemetry[(telemetry["driver"] == driver) & (telemetry["lap"] == lap)], fps) for driver, lap in laps]
+    if not len(outline):
+        outline = frames[0]
+
+    projection = _projection(outline[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix, size)
+
+    cars, colors_used = [], set()
+    for (driver, lap), df_frames in zip(laps, frames):
+        color = _bgr(teams_colors.get(drivers_teams.get(driver), "#FFFFFF"))
+        # Teammates in a ghost comparison would share a colour
+        color = (255, 255, 255) if color in colors_used else color
+        colors_used.add(color)
+
+        # Points and colours as tuples of ints, the form OpenCV's drawing functions take
+        pixels = _to_pixels(df_frames[["X", "Y"]].to_numpy() @ rotation_matrix, projection)
+        cars.append({
+            "label": f"{driver} L{lap}",
+            "color": color,
+            "trace": len(laps) == 1,
+            "pixels": pixels,
+            "points": [tuple(point) for point in pixels.tolist()],
+            "colors": [tuple(bgr) for bgr in _speed_colors(df_frames["Speed"].to_numpy()).tolist()],
+            "speed": df_frames["Speed"].to_numpy(),
+            "distance": df_frames["Distance"].to_numpy(),
+        })
+
+    laps_title = " vs ".join(f"{driver} lap {lap}" for driver, lap in laps)
+    background = track_background(outline[["X", "Y"]].to_numpy(dtype=float) @ rotation_matrix, projection, size, f"{year} {event} | {session.replace('_', ' ').title()} | {laps_title}")
+
+    n_frames = max(len(df_frames) for df_frames in frames)
+    chunk = max(int(chunk_seconds * fps), 1)
+    parts_dir = tempfile.mkdtemp(prefix=".video_parts_", dir=os.path.dirname(os.path.abspath(output)))
+    tasks = [
+        (start, min(start + chunk, n_frames), fps, f"{parts_dir}/part_{i:05d}{os.path.splitext(output)[1]}")
+        for i, start in enumerate(range(0, n_frames, chunk))
+    ]
+
+    outcomes = []
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(background, cars)) as executor:
+            def rendered_parts():
+                # Chunks come back in order and are stitched while the later ones are still rendering
+                for outcome in executor.map(_render_chunk, tasks):
+                    outcomes.append(outcome)
+                    yield outcome["path"]
+
+            stitch(rendered_parts(), output, fps, size)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    seconds = time.perf_counter() - start
+
+    return {
+        "frames": n_frames,
+        "seconds": seconds,
+        "render_seconds": sum(outcome["seconds"] for outcome in outcomes),
+        "fps": n_frames / seconds if seconds > 0 else math.inf,
+    }
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a lap replay coloured by speed, or two laps as ghost cars, as a video.")
+    parser.add_argument("year", type=int)
+    parser.add_argument("event", help="event name, e.g. \"Chinese Grand Prix\"")
+    parser.add_argument("session", help="session, e.g. Race or Qualifying")
+    parser.add_argument("--laps", nargs="+", default=["fastest"],
+                        help="one lap to replay or two to compare: fastest, DRIVER:fastest, DRIVER:LAP or LAP (default: fastest)")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--size", default="1280x720", help="WIDTHxHEIGHT in pixels")
+    parser.add_argument("--data-dir", default=dir)
+    parser.add_argument("--output", default="lap.mpg", help="video file, .mpg, .mp4 or .avi (default: lap.mpg, joined without re-encoding)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    session = args.session.replace(" ", "_").lower()
+    session_dir = data_access.find_session_dir(args.data_dir, args.year, args.event, session)
+    laps = export_plots.resolve_laps(session_dir, args.laps)
+
+    if len(laps) not in [1, 2] or len(laps) != len(args.laps):
+        print(f"Expected one or two laps that exist in the session, got {args.laps}")
+        sys.exit(1)
+
+    width, height = (int(value) for value in args.size.lower().split("x"))
+    summary = export_video(args.data_dir, args.year, args.event, session, laps, args.output, args.fps, (width, height), args.workers)
+
+    print(
+        f"{args.output}: {summary['frames']} frames ({summary['frames'] / args.fps:.1f}s at {args.fps} fps) | "
+        f"{summary['seconds']:.1f}s ({summary['fps']:.0f} frames/s), {summary['render_seconds']:.1f}s of rendering across the workers"
+    )
+
+
+
+if __name__ == "__main__":
+    main()
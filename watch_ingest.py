@@ -0,0 +1,508 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+import circuits
+import data_access
+import driving_events
+import ingest
+import minisectors
+import race_gaps
+import race_replay
+import season_speed
+import standings
+import track_status
+import tyres
+
+
+# Published sessions are version directories the dashboard only reads, every derived table it
+# shows is built in staging before the version is published. The session path the app reads is
+# a symlink swapped in one rename:
+#   {dir}/{year}/{dir_name}/{session} -> {dir}/.published/{year}/{dir_name}/{session}/v{n}
+# Only the backfills (backfill_tables, ingest.py) add tables to versions published before a table existed.
+PUBLISHED_DIR = ".published"
+STAGING_DIR = ".staging"
+MANIFEST_FILE = "manifest.json"
+
+# Versions kept per session, readers still on the previous one finish their reads
+KEEP_VERSIONS = 2
+
+# A session directory must be untouched for this long before it is converted, in seconds
+SETTLE_SECONDS = 120
+
+# Seconds between two scans of the watched directory
+POLL_SECONDS = 60
+
+# Files a FastF1 cache holds for a session once its timing data has been loaded
+FASTF1_REQUIRED = ["session_info.ff1pkl", "session_status_data.ff1pkl", "timing_app_data.ff1pkl", "_extended_timing_data.ff1pkl"]
+
+# Files a converted session copied in from elsewhere must have
+PARQUET_REQUIRED = ["laps.parquet", "results.parquet"]
+
+
+
+def read_manifest(dir: str) -> dict:
+    path = f"{dir}/{MANIFEST_FILE}"
+    if not os.path.exists(path):
+        return {"version": 0, "updated": None, "sessions": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+
+def manifest_version(dir: str) -> int:
+    # Bumped on every publish, the app keys its caches on it to pick up new sessions
+    return read_manifest(dir)["version"]
+
+
+
+def _write_manifest(dir: str, manifest: dict) -> None:
+    path = f"{dir}/{MANIFEST_FILE}"
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(f"{path}.tmp", path)
+
+
+
+def directory_signature(path: str) -> tuple:
+    """
+    Identifies the state of a directory by the names, sizes and modification times of its files.
+
+    Return:
+    - signature (str), newest modification time in seconds (float)
+    """
+
+    state = []
+    newest = 0.0
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            state.append((os.path.relpath(os.path.join(root, name), path), stat.st_size, stat.st_mtime_ns))
+            newest = max(newest, stat.st_mtime)
+
+    return hashlib.sha1(json.dumps(sorted(state)).encode()).hexdigest(), newest
+
+
+
+def _event_name(name: str) -> str:
+    # FastF1 cache directories are "2025-03-23_Chinese_Grand_Prix", "2025-03-23_Race"
+    return re.sub(r"^\d{4}-\d{2}-\d{2}_", "", name).replace("_", " ")
+
+
+
+def find_fastf1_sessions(cache_dir: str) -> list:
+    """
+    Sessions in a FastF1 cache, laid out as {cache}/{year}/{date}_{Event_Name}/{date}_{Session_Name}.
+
+    Return:
+    - dicts with year, event, session, dir_name, path and required files (list)
+    """
+
+    found = []
+    for year in sorted(os.listdir(cache_dir)):
+        if not year.isdigit() or not os.path.isdir(f"{cache_dir}/{year}"):
+            continue
+        for event_dir in sorted(os.listdir(f"{cache_dir}/{year}")):
+            if not os.path.isdir(f"{cache_dir}/{year}/{event_dir}"):
+                continue
+            for session_dir in sorted(os.listdir(f"{cache_dir}/{year}/{event_dir}")):
+                path = f"{cache_dir}/{year}/{event_dir}/{session_dir}"
+                if os.path.isdir(path):
+                    found.append({
+                        "year": int(year), "event": _event_name(event_dir), "session": _event_name(session_dir),
+                        "dir_name": event_dir.lower(), "path": path, "required": FASTF1_REQUIRED,
+                    })
+
+    return found
+
+
+
+def find_parquet_sessions(source_dir: str) -> list:
+    # Sessions already converted elsewhere, in the data tree layout {source}/{year}/{dir_name}/{session}
+    found = []
+    for year in sorted(os.listdir(source_dir)):
+        if not year.isdigit() or not os.path.isdir(f"{source_dir}/{year}"):
+            continue
+        for dir_name in sorted(os.listdir(f"{source_dir}/{year}")):
+            if not os.path.isdir(f"{source_dir}/{year}/{dir_name}"):
+                continue
+            for session in sorted(os.listdir(f"{source_dir}/{year}/{dir_name}")):
+                path = f"{source_dir}/{year}/{dir_name}/{session}"
+                if os.path.isdir(path):
+                    found.append({
+                        "year": int(year), "event": _event_name(dir_name).title(), "session": session,
+                        "dir_name": dir_name, "path": path, "required": PARQUET_REQUIRED,
+                    })
+
+    return found
+
+
+
+def copy_parquet_session(found: dict, output_dir: str, cache_dir: str) -> list:
+    # Parquet files as they are, laps get the lap weather and status and telemetry its fastest lap sidecar
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for name in sorted(os.listdir(found["path"])):
+        if name.endswith(".parquet"):
+            shutil.copy2(f"{found['path']}/{name}", f"{output_dir}/{name}")
+            written.append(name)
+
+    if "weather.parquet" in written:
+        ingest.materialize_lap_weather(output_dir)
+    if not track_status.has_lap_status(output_dir):
+        track_status.materialize_lap_status(output_dir)
+    if "telemetry_data.parquet" in written:
+        ingest.materialize_fastest_laps(output_dir)
+        written = sorted(set(written) | {ingest.FASTEST_LAPS_FILE})
+
+    return written
+
+
+
+def convert_fastf1(found: dict, output_dir: str, cache_dir: str) -> list:
+    return ingest.convert_fastf1_session(cache_dir, found["year"], found["event"], found["session"], output_dir)
+
+
+
+SOURCES = {
+    "fastf1": (find_fastf1_sessions, convert_fastf1),
+    "parquet": (find_parquet_sessions, copy_parquet_session),
+}
+
+
+
+def _dir_name(dir: str, found: dict) -> str:
+    # The schedule's DirName when the season has one, so published sessions land next to the existing ones
+    schedule_path = f"{dir}/{found['year']}/schedule.parquet"
+    if os.path.exists(schedule_path):
+        df_schedule = pd.read_parquet(schedule_path, columns=["EventName", "DirName"])
+        match = df_schedule[df_schedule["EventName"].str.lower() == found["event"].lower()]
+        if not match.empty:
+            return match["DirName"].iloc[0]
+    return found["dir_name"]
+
+
+
+def _location(dir: str, year: int, dir_name: str) -> str:
+    # Location of an event in the season's schedule, the circuit key, None when the event is not in it
+    schedule_path = f"{dir}/{year}/schedule.parquet"
+    if not os.path.exists(schedule_path):
+        return None
+    df_schedule = data_access.read_table(f"{dir}/{year}", "schedule", columns=["Location", "DirName"])
+    match = df_schedule[df_schedule["DirName"] == dir_name]
+    return None if match.empty else match["Location"].iloc[0]
+
+
+
+def build_session_tables(dir: str, year: int, dir_name: str, session: str, session_dir: str = None) -> list:
+    """
+    Builds every derived table the dashboard reads for a session: tyre degradation, gaps, speeds,
+    replay frames, minisectors and driving features, and the venue's circuit when it has none yet.
+    Tables already up to date are left as they are.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - dir_name (str): directory of the event
+    - session (str): directory name of the session
+    - session_dir (str): where the session's files are, the staging directory before publishing
+
+    Return:
+    - names of the derived files of the session (list)
+    """
+
+    session_dir = session_dir or f"{dir}/{year}/{dir_name}/{session}"
+    written = []
+
+    if os.path.exists(f"{session_dir}/laps.parquet"):
+        tyres.load_degradation(session_dir)
+        race_gaps.load_gaps(session_dir)
+        written += [tyres.DEGRADATION_FILE, race_gaps.GAPS_FILE]
+
+    if os.path.exists(f"{session_dir}/telemetry_data.parquet"):
+        season_speed.load_speed_summary(session_dir)
+        race_replay.update_replay(session_dir)
+        minisectors.load_minisectors(session_dir)
+
+        # Corners of the layout the event was run on, matched from the event's published sessions or
+        # from this one when none of them has telemetry (the second call returns at once otherwise)
+        markers = None
+        location = _location(dir, year, dir_name)
+        if location is not None:
+            circuits.update_circuit(dir, year, dir_name, location)
+            circuits.update_circuit(dir, year, dir_name, location, session=session, session_dir=session_dir)
+            path = circuits.layout_dir(dir, year, dir_name, location)
+            if path is not None:
+                markers = data_access.read_parquet(f"{path}/{circuits.MARKERS_FILE}")
+        driving_events.load_driving_features(session_dir, markers)
+
+        written += [
+            season_speed.SPEEDS_FILE, race_replay.REPLAY_FILE, driving_events.FEATURES_FILE,
+            minisectors.MINISECTORS_FILE.format(n=minisectors.N_MINISECTORS), minisectors.REFERENCE_FILE.format(n=minisectors.N_MINISECTORS),
+        ]
+
+    return written
+
+
+
+def build_season_tables(dir: str, year: int, session: str) -> None:
+    """
+    Brings the tables of a season the dashboard reads up to date after one of its sessions
+    changed: the standings and the tyre degradation and speeds of the session type.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - session (str): directory name of the session type
+    """
+
+    # Seasons without a schedule are not shown by the dashboard yet
+    if not os.path.exists(f"{dir}/{year}/schedule.parquet"):
+        return
+
+    standings.update_standings(dir, year)
+    tyres.load_season_degradation(dir, year, session)
+    season_speed.load_season_speeds(dir, year, session)
+
+
+
+def backfill_tables(dir: str, year: int) -> None:
+    """
+    Builds the derived tables of every session of a season published without them, then the
+    season tables of every session type.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    """
+
+    df_schedule = data_access.read_table(f"{dir}/{year}", "schedule", columns=["DirName"])
+
+    session_types = set()
+    for dir_name in df_schedule["DirName"]:
+        event_dir = f"{dir}/{year}/{dir_name}"
+        if not os.path.isdir(event_dir):
+            continue
+
+        for session in sorted(os.listdir(event_dir)):
+            if os.path.isdir(f"{event_dir}/{session}"):
+                if build_session_tables(dir, year, dir_name, session):
+                    print(f"Derived tables: {event_dir}/{session}")
+                session_types.add(session)
+
+    for session in sorted(session_types):
+        build_season_tables(dir, year, session)
+
+
+
+def publish_session(dir: str, year: int, dir_name: str, session: str, staged_path: str) -> int:
+    """
+    Moves a fully written staging directory into place as the next version of a session and
+    points the session path at it with one atomic rename. Readers see the old or the new files,
+    never a mix of both or half-written ones.
+
+    Arguments:
+    - dir (str): root of the parquet data tree
+    - year (int): season
+    - dir_name (str): directory of the event
+    - session (str): directory name of the session
+    - staged_path (str): directory holding the new files, on the same file system as dir
+
+    Return:
+    - published version of the session (int)
+    """
+
+    versions_dir = f"{dir}/{PUBLISHED_DIR}/{year}/{dir_name}/{session}"
+    os.makedirs(versions_dir, exist_ok=True)
+
+    existing = sorted(int(name[1:]) for name in os.listdir(versions_dir) if re.fullmatch(r"v\d+", name))
+    version = (existing[-1] if existing else 0) + 1
+
+    version_path = f"{versions_dir}/v{version}"
+    os.rename(staged_path, version_path)
+
+    session_path = f"{dir}/{year}/{dir_name}/{session}"
+    os.makedirs(os.path.dirname(session_path), exist_ok=True)
+
+    # Sessions written before the watcher existed are plain directories, they become version 0
+    # (the session path is missing for the instant between the two renames, once per session)
+    if os.path.isdir(session_path) and not os.path.islink(session_path):
+        os.rename(session_path, f"{versions_dir}/v0")
+        existing.insert(0, 0)
+
+    link = f"{session_path}.{uuid.uuid4().hex}.tmp"
+    os.symlink(os.path.relpath(version_path, os.path.dirname(session_path)), link)
+    os.replace(link, session_path)
+
+    for old in (existing + [version])[:-KEEP_VERSIONS]:
+        shutil.rmtree(f"{versions_dir}/v{old}", ignore_errors=True)
+
+    return version
+
+
+
+def process_once(
+        watch_dir: str,
+        dir: str,
+        source: str = "fastf1",
+        settle_seconds: float = SETTLE_SECONDS,
+        failed: dict = None) -> list:
+    """
+    One scan of the watched directory: converts every session that is complete, settled and
+    changed since it was last published, then publishes it and bumps the manifest.
+
+    Arguments:
+    - watch_dir (str): FastF1 cache or directory of converted sessions
+    - dir (str): root of the parquet data tree the app reads
+    - source (str): any of SOURCES
+    - settle_seconds (float): quiet time before a session counts as complete
+    - failed (dict): signatures of sessions whose conversion failed, kept between scans
+
+    Return:
+    - keys of the published sessions (list)
+    """
+
+    find_sessions, convert = SOURCES[source]
+    failed = {} if failed is None else failed
+    manifest = read_manifest(dir)
+    published = []
+
+    for found in find_sessions(watch_dir):
+        if not all(os.path.exists(f"{found['path']}/{name}") for name in found["required"]):
+            continue
+
+        signature, newest = directory_signature(found["path"])
+        if time.time() - newest < settle_seconds:
+            continue
+
+        dir_name = _dir_name(dir, found)
+        session = ingest.session_key(found["session"])
+        key = f"{found['year']}/{dir_name}/{session}"
+
+        if manifest["sessions"].get(key, {}).get("source_signature") == signature or failed.get(key) == signature:
+            continue
+
+        staged_path = f"{dir}/{STAGING_DIR}/{key.replace('/', '__')}.{uuid.uuid4().hex}"
+        try:
+            files = convert(found, staged_path, watch_dir)
+            files = sorted(set(files) | set(build_session_tables(dir, found["year"], dir_name, session, staged_path)))
+        except ingest.SessionNotFinished as e:
+            shutil.rmtree(staged_path, ignore_errors=True)
+            print(f"Waiting: {e}")
+            continue
+        except Exception as e:
+            shutil.rmtree(staged_path, ignore_errors=True)
+            failed[key] = signature
+            print(f"Failed: {key} ({type(e).__name__}: {e})")
+            continue
+
+        version = publish_session(dir, found["year"], dir_name, session, staged_path)
+
+        # Season tables next to the schedule, before the manifest bump makes the app look for them
+        try:
+            build_season_tables(dir, found["year"], session)
+        except Exception as e:
+            print(f"Season tables not updated: {key} ({type(e).__name__}: {e})")
+
+        # Re-read in case another process published meanwhile, then bump
+        manifest = read_manifest(dir)
+        manifest["version"] += 1
+        manifest["updated"] = datetime.now().isoformat(timespec="seconds")
+        manifest["sessions"][key] = {
+            "version": version,
+            "published": manifest["updated"],
+            "source_signature": signature,
+            "files": files,
+        }
+        _write_manifest(dir, manifest)
+
+        failed.pop(key, None)
+        published.append(key)
+        print(f"Published: {key} v{version} (manifest {manifest['version']})")
+
+    return published
+
+
+
+def watch(
+        watch_dir: str,
+        dir: str,
+        source: str = "fastf1",
+        poll_seconds: float = POLL_SECONDS,
+        settle_seconds: float = SETTLE_SECONDS) -> None:
+    # Runs until interrupted, failed conversions are retried once their source changes
+    failed = {}
+    print(f"Watching {watch_dir} ({source}) every {poll_seconds:g}s, publishing to {dir}")
+
+    try:
+        while True:
+            process_once(watch_dir, dir, source, settle_seconds, failed)
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and publish newly completed sessions as they arrive.")
+    parser.add_argument("watch_dir", help="FastF1 cache directory, or a directory of converted sessions with --source parquet")
+    parser.add_argument("--data-dir", default=os.environ.get("F1_DATA_DIR", "/Users/bartosz/f1_data"))
+    parser.add_argument("--source", choices=list(SOURCES), default="fastf1")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="seconds between scans")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS, help="seconds a session must be untouched before converting")
+    parser.add_argument("--once", action="store_true", help="scan once and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        process_once(args.watch_dir, args.data_dir, args.source, args.settle)
+    else:
+        watch(args.watch_dir, args.data_dir, args.source, args.poll, args.settle)
+
+
+
+# Testing debugging
+if __name__ == "__main__":
+
+    import sys
+
+    if len(sys.argv) > 1:
+        main()
+        sys.exit(0)
+
+    # Sessions copied into a watched directory are published once settled, a second copy becomes version 2
+    import tempfile
+    import synthetic_data
+
+    root = tempfile.mkdtemp(prefix="f1_watch_")
+    incoming, data = f"{root}/incoming", f"{root}/data"
+    synthetic_data.write_tree(f"{root}/source", 2025, n_laps=6, samples_per_lap=20)
+
+    os.makedirs(f"{data}/2025")
+    shutil.copy2(f"{root}/source/2025/schedule.parquet", f"{data}/2025/schedule.parquet")
+    shutil.copytree(f"{root}/source/2025/2025-03-23_chinese_grand_prix/race", f"{incoming}/2025/2025-03-23_chinese_grand_prix/race")
+    assert process_once(incoming, data, "parquet", settle_seconds=60) == []
+    assert process_once(incoming, data, "parquet", settle_seconds=0) == ["2025/2025-03-23_chinese_grand_prix/race"]
+    assert process_once(incoming, data, "parquet", settle_seconds=0) == []
+
+    session_path = f"{data}/2025/2025-03-23_chinese_grand_prix/race"
+    assert os.path.islink(session_path) and "TrackTemp" in pd.read_parquet(f"{session_path}/laps.parquet").columns
+
+    # The version is published with every derived table the dashboard reads, the season tables sit next to it
+    files = read_manifest(data)["sessions"]["2025/2025-03-23_chinese_grand_prix/race"]["files"]
+    assert all(os.path.exists(f"{session_path}/{name}") for name in files) and race_replay.REPLAY_FILE in files, files
+    assert race_replay.has_replay(session_path) and os.path.exists(f"{data}/2025/race_{tyres.DEGRADATION_FILE}")
+
+    shutil.copy2(f"{root}/source/2025/2025-03-23_chinese_grand_prix/sprint/laps.parquet", f"{incoming}/2025/2025-03-23_chinese_grand_prix/race/laps.parquet")
+    process_once(incoming, data, "parquet", settle_seconds=0)
+
+    assert os.readlink(session_path).endswith("v2") and manifest_version(data) == 2
+    print(json.dumps(read_manifest(data), indent=2)[:400])
+    shutil.rmtree(root)